@@ -0,0 +1,117 @@
+# database/asignacion.py - Asignación de ubicaciones para salidas
+"""
+Reparte una cantidad pedida entre las ubicaciones que tienen el producto.
+Solo decide; las escrituras (un movimiento o reserva por ubicación, en una
+transacción) las hacen registrar_movimientos_lote y registrar_orden_venta.
+
+Estrategias:
+- menos_ubicaciones: las de más disponible primero, así se visita el mínimo
+  de ubicaciones; la última es la más chica que alcance para el resto, así
+  se vacían ubicaciones en vez de dejar restos en todas.
+- fifo: la mercancía recibida antes sale primero (inventario.fecha_recepcion:
+  cuándo se llenó la ubicación desde cero; sin fecha cuenta como la más antigua).
+- cercania_despacho: las más cercanas a la ubicación de despacho
+  (configuración 'ubicacion_despacho'): mismo pasillo, luego estante, y los
+  niveles bajos primero. Sin despacho configurado, el pasillo 1 es el más cercano.
+
+La estrategia por defecto se lee de la configuración 'estrategia_asignacion'.
+"""
+from dataclasses import dataclass
+from typing import Any, List, Literal, Optional, Tuple
+
+EstrategiaAsignacion = Literal["menos_ubicaciones", "fifo", "cercania_despacho"]
+ESTRATEGIAS: Tuple[str, ...] = ("menos_ubicaciones", "fifo", "cercania_despacho")
+ESTRATEGIA_PREDETERMINADA: str = "menos_ubicaciones"
+
+# Distancia de pasillos o estantes no numéricos y distintos
+_LEJOS: int = 10 ** 6
+
+
+@dataclass
+class Existencia:
+    """Stock de un producto en una ubicación, tal como lo ve la asignación."""
+    ubicacion_id: int
+    disponible: int  # cantidad - reservado
+    cantidad: int    # stock físico
+    fecha_recepcion: Optional[str] = None
+    pasillo: Optional[str] = None
+    estante: Optional[str] = None
+    nivel: Optional[str] = None
+
+
+# (pasillo, estante, nivel) del punto de despacho
+Despacho = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def _coordenada(valor: Optional[str]) -> Tuple[int, Any]:
+    """Valor ordenable: primero los números (por valor), después el texto."""
+    try:
+        return (0, int(valor or ""))
+    except ValueError:
+        return (1, valor or "")
+
+
+def _distancia(valor: Optional[str], referencia: Optional[str]) -> int:
+    if valor == referencia:
+        return 0
+    try:
+        return abs(int(valor or "") - int(referencia or ""))
+    except ValueError:
+        return _LEJOS
+
+
+def _clave_cercania(existencia: Existencia, despacho: Optional[Despacho]) -> Tuple[Any, ...]:
+    nivel = _coordenada(existencia.nivel)
+    if despacho is None:
+        return (_coordenada(existencia.pasillo), _coordenada(existencia.estante), nivel, existencia.ubicacion_id)
+    return (
+        _distancia(existencia.pasillo, despacho[0]),
+        _distancia(existencia.estante, despacho[1]),
+        nivel,
+        existencia.ubicacion_id
+    )
+
+
+def asignar(
+    existencias: List[Existencia],
+    cantidad: int,
+    estrategia: str = ESTRATEGIA_PREDETERMINADA,
+    despacho: Optional[Despacho] = None
+) -> List[Tuple[Existencia, int]]:
+    """
+    Elige de qué ubicaciones sale 'cantidad': [(existencia, cantidad tomada), ...]
+    en orden de recolección. No modifica las existencias.
+    Si el disponible total no alcanza retorna [] (el llamador informa el faltante).
+
+    Raises:
+        ValueError: Si la estrategia no existe
+    """
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia de asignación no válida: {estrategia}")
+
+    candidatas = [e for e in existencias if e.disponible > 0]
+    if sum(e.disponible for e in candidatas) < cantidad:
+        return []
+
+    if estrategia == "fifo":
+        candidatas.sort(key=lambda e: (e.fecha_recepcion or "", e.ubicacion_id))
+    elif estrategia == "cercania_despacho":
+        candidatas.sort(key=lambda e: _clave_cercania(e, despacho))
+    else:
+        candidatas.sort(key=lambda e: (-e.disponible, e.ubicacion_id))
+
+    tomadas: List[Tuple[Existencia, int]] = []
+    pendiente = cantidad
+    for i, existencia in enumerate(candidatas):
+        if pendiente == 0:
+            break
+        if estrategia == "menos_ubicaciones" and existencia.disponible >= pendiente:
+            # Mismo número de ubicaciones, pero la más chica que alcance
+            existencia = min(
+                (e for e in candidatas[i:] if e.disponible >= pendiente),
+                key=lambda e: (e.disponible, e.ubicacion_id)
+            )
+        tomado = min(pendiente, existencia.disponible)
+        tomadas.append((existencia, tomado))
+        pendiente -= tomado
+    return tomadas
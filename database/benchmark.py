@@ -0,0 +1,459 @@
+# database/benchmark.py - Mediciones de rendimiento de la capa de datos
+"""
+Benchmarks de la base de datos. Cada escenario trabaja sobre una BD temporal,
+nunca sobre data/almacen.db.
+
+Uso:
+    python -m database.benchmark perfiles [--operaciones 2000]
+    python -m database.benchmark catalogo [--productos 100000]
+    python -m database.benchmark importacion [--movimientos 1000000]
+    python -m database.benchmark busqueda [--productos 200000]
+    python -m database.benchmark fechas [--movimientos 5000000]
+    python -m database.benchmark filas [--movimientos 200000]
+    python -m database.benchmark streaming [--movimientos 1000000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import connection
+from .connection import PERFILES_RENDIMIENTO, initialize_db, set_database_path, set_performance_profile
+
+
+def _medir(funcion: Callable[[], None]) -> float:
+    """Ejecuta la función y retorna los segundos transcurridos."""
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def _preparar_bd(directorio: str, perfil: str) -> None:
+    """Crea una BD vacía en el directorio indicado usando el perfil dado."""
+    set_database_path(os.path.join(directorio, 'almacen.db'))
+    set_performance_profile(perfil)
+    initialize_db()
+
+
+def benchmark_perfiles(operaciones: int) -> List[Tuple[str, float, float]]:
+    """
+    Compara el rendimiento de cada perfil con la carga típica de un turno:
+    movimientos individuales (un commit por movimiento) y lecturas de stock.
+    Retorna [(perfil, escrituras/s, lecturas/s)].
+    """
+    from .queries import ajustar_stock, get_product_stock, insert_product, obtener_ubicacion_predeterminada
+
+    resultados: List[Tuple[str, float, float]] = []
+    for perfil in PERFILES_RENDIMIENTO:
+        directorio = tempfile.mkdtemp(prefix=f"almacen_bench_{perfil}_")
+        try:
+            _preparar_bd(directorio, perfil)
+            producto_id = insert_product(("Bench", f"BENCH-{perfil}", "Bench", 1.0, "", "Units", 0, ""))
+            ubicacion_id = obtener_ubicacion_predeterminada()
+            if producto_id is None or ubicacion_id is None:
+                raise RuntimeError("No se pudo preparar la BD de prueba")
+
+            def escribir() -> None:
+                for _ in range(operaciones):
+                    ajustar_stock(producto_id, ubicacion_id, 1, 'IN', 'recepcion', None, 1)
+
+            def leer() -> None:
+                for _ in range(operaciones):
+                    get_product_stock(producto_id, ubicacion_id)
+
+            t_escritura = _medir(escribir)
+            t_lectura = _medir(leer)
+            resultados.append((perfil, operaciones / t_escritura, operaciones / t_lectura))
+        finally:
+            connection.get_manager().close_all()
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    set_performance_profile(None)
+    return resultados
+
+
+def _imprimir_perfiles(resultados: List[Tuple[str, float, float]]) -> None:
+    print(f"{'PERFIL':<12} {'ESCRITURAS/s':>14} {'LECTURAS/s':>14}")
+    for perfil, escrituras, lecturas in resultados:
+        print(f"{perfil:<12} {escrituras:>14,.0f} {lecturas:>14,.0f}")
+
+
+def benchmark_catalogo(productos: int, repeticiones: int = 5) -> Tuple[float, float]:
+    """
+    Mide el listado completo del catálogo (get_all_products) con N productos,
+    cada uno con stock en una ubicación. Retorna (segundos de carga, segundos por listado).
+    """
+    from .queries import get_all_products
+
+    directorio = tempfile.mkdtemp(prefix="almacen_bench_catalogo_")
+    try:
+        _preparar_bd(directorio, "bulk-load")
+        with connection.managed_connection() as conn:
+            inicio = time.perf_counter()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO productos (sku, nombre, categoria, precio, stock_minimo) VALUES (?, ?, 'Bench', 1, 5)",
+                ((f"SKU-{n:07d}", f"Producto {n:07d}") for n in range(productos))
+            )
+            conn.execute(
+                "INSERT INTO inventario (producto_id, ubicacion_id, cantidad) "
+                "SELECT id, (SELECT MIN(id) FROM ubicaciones), id % 50 FROM productos"
+            )
+            conn.commit()
+            t_carga = time.perf_counter() - inicio
+
+        t_listado = _medir(lambda: [get_all_products() for _ in range(repeticiones)]) / repeticiones
+        return t_carga, t_listado
+    finally:
+        connection.get_manager().close_all()
+        set_performance_profile(None)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir_catalogo(productos: int, t_carga: float, t_listado: float) -> None:
+    print(f"Catálogo de {productos:,} productos: carga {t_carga:.2f} s, "
+          f"get_all_products {t_listado * 1000:.1f} ms por listado")
+
+
+def benchmark_importacion(movimientos: int, productos: int = 1000) -> Tuple[float, bool]:
+    """
+    Importa N movimientos históricos con registrar_movimientos_bulk.
+    Retorna (segundos, inventario coherente con el neto de los movimientos).
+    """
+    from .queries import registrar_movimientos_bulk
+
+    directorio = tempfile.mkdtemp(prefix="almacen_bench_importacion_")
+    try:
+        _preparar_bd(directorio, "bulk-load")
+        with connection.managed_connection() as conn:
+            conn.executemany(
+                "INSERT INTO productos (sku, nombre, categoria, precio) VALUES (?, ?, 'Bench', 1)",
+                ((f"SKU-{n:07d}", f"Producto {n:07d}") for n in range(productos))
+            )
+            conn.commit()
+            producto_min = conn.execute("SELECT MIN(id) FROM productos").fetchone()[0]
+            ubicacion_id = conn.execute("SELECT MIN(id) FROM ubicaciones").fetchone()[0]
+
+        lineas = (
+            {
+                'tipo': 'IN' if n % 3 else 'OUT',
+                'producto_id': producto_min + n % productos,
+                'ubicacion_id': ubicacion_id,
+                'cantidad': 1 + n % 7,
+                'razon': 'importacion',
+                'usuario_id': 1,
+                'fecha_movimiento': f"2020-01-01 00:00:{n % 60:02d}",
+            }
+            for n in range(movimientos)
+        )
+        t_importacion = _medir(lambda: registrar_movimientos_bulk(lineas, tamano_lote=50000))
+
+        with connection.managed_connection() as conn:
+            descuadres = conn.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT producto_id, SUM(CASE WHEN tipo = 'IN' THEN cantidad ELSE -cantidad END) AS neto
+                    FROM movimientos GROUP BY producto_id
+                ) m
+                JOIN stock_resumen s USING (producto_id)
+                WHERE s.cantidad_total != MAX(m.neto, 0)
+            """).fetchone()[0]
+        return t_importacion, descuadres == 0
+    finally:
+        connection.get_manager().close_all()
+        set_performance_profile(None)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir_importacion(movimientos: int, segundos: float, coherente: bool) -> None:
+    estado = "inventario coherente" if coherente else "❌ inventario descuadrado"
+    print(f"Importación de {movimientos:,} movimientos: {segundos:.2f} s "
+          f"({movimientos / segundos:,.0f} mov/s), {estado}")
+
+
+def benchmark_busqueda(productos: int, repeticiones: int = 20) -> List[Tuple[str, float, float, int]]:
+    """
+    Compara buscar_productos (FTS5) con el filtro LIKE '%texto%' sobre N productos.
+    Retorna [(texto, ms FTS5, ms LIKE, resultados FTS5)].
+    """
+    from .queries import buscar_productos
+
+    palabras = ("Tornillo", "Tuerca", "Arandela", "Cable", "Brida", "Bisagra", "Taladro", "Lija")
+    directorio = tempfile.mkdtemp(prefix="almacen_bench_busqueda_")
+    try:
+        _preparar_bd(directorio, "bulk-load")
+        with connection.managed_connection() as conn:
+            conn.executemany(
+                "INSERT INTO productos (sku, nombre, categoria, proveedor, precio) VALUES (?, ?, ?, ?, 1)",
+                (
+                    (f"SKU-{n:07d}", f"{palabras[n % len(palabras)]} {n % 977} mm modelo {n}",
+                     f"Categoria {n % 40}", f"Proveedor {n % 300}")
+                    for n in range(productos)
+                )
+            )
+            conn.commit()
+
+        def buscar_like(texto: str) -> None:
+            with connection.managed_connection() as conn:
+                conn.execute(
+                    "SELECT producto_id FROM vista_inventario_completo "
+                    "WHERE nombre LIKE ? OR sku LIKE ? ORDER BY nombre LIMIT 100",
+                    (f"%{texto}%", f"%{texto}%")
+                ).fetchall()
+
+        resultados: List[Tuple[str, float, float, int]] = []
+        for texto in ("tornillo 12", "SKU-00012", "bisag", "proveedor 7"):
+            t_fts = _medir(lambda: [buscar_productos(texto) for _ in range(repeticiones)]) / repeticiones
+            t_like = _medir(lambda: [buscar_like(texto) for _ in range(repeticiones)]) / repeticiones
+            resultados.append((texto, t_fts * 1000, t_like * 1000, len(buscar_productos(texto))))
+        return resultados
+    finally:
+        connection.get_manager().close_all()
+        set_performance_profile(None)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir_busqueda(resultados: List[Tuple[str, float, float, int]]) -> None:
+    print(f"{'TEXTO':<16} {'FTS5 ms':>10} {'LIKE ms':>10} {'RESULTADOS':>11}")
+    for texto, ms_fts, ms_like, cantidad in resultados:
+        print(f"{texto:<16} {ms_fts:>10.2f} {ms_like:>10.2f} {cantidad:>11}")
+
+
+def benchmark_fechas(movimientos: int, repeticiones: int = 5) -> List[Tuple[str, float, float, int]]:
+    """
+    Compara el filtro anterior DATE(fecha_movimiento) BETWEEN ? AND ? con el rango
+    semiabierto de obtener_movimientos_por_fecha sobre N movimientos repartidos en dos años.
+    Retorna [(rango, ms DATE(), ms rango semiabierto, filas)].
+    """
+    from .queries import obtener_movimientos_por_fecha
+
+    directorio = tempfile.mkdtemp(prefix="almacen_bench_fechas_")
+    try:
+        _preparar_bd(directorio, "bulk-load")
+        with connection.managed_connection() as conn:
+            conn.execute("INSERT INTO productos (sku, nombre, categoria, precio) VALUES ('SKU-FECHAS', 'Bench', 'Bench', 1)")
+            # BD desechable: sin el trigger de stock la carga es mucho más rápida
+            conn.execute("DROP TRIGGER IF EXISTS actualizar_stock_after_movimiento")
+            conn.execute("""
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+                INSERT INTO movimientos (tipo, producto_id, ubicacion_id, cantidad, razon, usuario_id, fecha_movimiento)
+                SELECT
+                    CASE WHEN i % 3 THEN 'IN' ELSE 'OUT' END,
+                    (SELECT MIN(id) FROM productos),
+                    (SELECT MIN(id) FROM ubicaciones),
+                    1, 'bench', 1,
+                    DATETIME('2023-01-01', '+' || (i * 12.6) || ' seconds')
+                FROM n
+            """, (movimientos,))
+            conn.commit()
+
+        def filtro_anterior(inicio: str, fin: str) -> int:
+            with connection.managed_connection() as conn:
+                return len(conn.execute("""
+                    SELECT fecha_movimiento, producto, tipo, cantidad, razon, proveedor, ubicacion, observaciones
+                    FROM vista_movimientos_detallados
+                    WHERE DATE(fecha_movimiento) BETWEEN ? AND ?
+                    ORDER BY fecha_movimiento DESC
+                """, (inicio, fin)).fetchall())
+
+        resultados: List[Tuple[str, float, float, int]] = []
+        for inicio, fin in (("2023-03-01", "2023-03-01"), ("2023-03-01", "2023-03-07"), ("2023-03-01", "2023-03-31")):
+            filas = len(obtener_movimientos_por_fecha(inicio, fin))
+            if filas != filtro_anterior(inicio, fin):
+                raise RuntimeError(f"Los filtros no coinciden para {inicio}..{fin}")
+            t_anterior = _medir(lambda: [filtro_anterior(inicio, fin) for _ in range(repeticiones)]) / repeticiones
+            t_nuevo = _medir(lambda: [obtener_movimientos_por_fecha(inicio, fin) for _ in range(repeticiones)]) / repeticiones
+            resultados.append((f"{inicio}..{fin}", t_anterior * 1000, t_nuevo * 1000, filas))
+        return resultados
+    finally:
+        connection.get_manager().close_all()
+        set_performance_profile(None)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir_fechas(movimientos: int, resultados: List[Tuple[str, float, float, int]]) -> None:
+    print(f"Historial de {movimientos:,} movimientos")
+    print(f"{'RANGO':<24} {'DATE() ms':>10} {'RANGO ms':>10} {'FILAS':>8}")
+    for rango, ms_anterior, ms_nuevo, filas in resultados:
+        print(f"{rango:<24} {ms_anterior:>10.1f} {ms_nuevo:>10.1f} {filas:>8,}")
+
+
+def benchmark_filas(movimientos: int) -> List[Tuple[str, float, float, float]]:
+    """
+    Compara construir un dict por fila (como hacía queries.py) con construir
+    filas Movimiento desde la row_factory, leyendo N movimientos del historial.
+    Retorna [(método, ms, MB retenidos por la lista, MB de pico)].
+    """
+    from .modelos import Movimiento, fabrica
+
+    sql = """
+    SELECT fecha_movimiento, producto, tipo, cantidad, razon, proveedor, ubicacion, observaciones, sku, id
+    FROM vista_movimientos_detallados
+    """
+
+    def como_dicts() -> List[Dict[str, Any]]:
+        with connection.managed_connection() as conn:
+            return [
+                {
+                    'fecha_movimiento': row[0], 'producto': row[1], 'tipo': row[2],
+                    'cantidad': row[3], 'razon': row[4], 'proveedor': row[5],
+                    'ubicacion': row[6], 'observaciones': row[7], 'sku': row[8], 'id': row[9]
+                }
+                for row in conn.execute(sql).fetchall()
+            ]
+
+    def como_modelos() -> List[Movimiento]:
+        with connection.managed_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = fabrica(Movimiento)
+            return cursor.execute(sql).fetchall()
+
+    directorio = tempfile.mkdtemp(prefix="almacen_bench_filas_")
+    try:
+        _preparar_bd(directorio, "bulk-load")
+        with connection.managed_connection() as conn:
+            conn.execute("INSERT INTO productos (sku, nombre, categoria, precio) VALUES ('SKU-FILAS', 'Bench', 'Bench', 1)")
+            conn.execute("DROP TRIGGER IF EXISTS actualizar_stock_after_movimiento")
+            conn.execute("""
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+                INSERT INTO movimientos (tipo, producto_id, ubicacion_id, cantidad, razon, usuario_id, fecha_movimiento)
+                SELECT 'IN', (SELECT MIN(id) FROM productos), (SELECT MIN(id) FROM ubicaciones),
+                       1, 'bench', 1, DATETIME('2023-01-01', '+' || i || ' seconds')
+                FROM n
+            """, (movimientos,))
+            conn.commit()
+
+        resultados: List[Tuple[str, float, float, float]] = []
+        for nombre, leer in (("dict por fila", como_dicts), ("modelo (row_factory)", como_modelos)):
+            tiempo = _medir(leer)
+            tracemalloc.start()
+            filas = leer()
+            retenido, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if len(filas) != movimientos:
+                raise RuntimeError(f"{nombre}: se esperaban {movimientos} filas, hay {len(filas)}")
+            del filas
+            resultados.append((nombre, tiempo * 1000, retenido / 1024 / 1024, pico / 1024 / 1024))
+        return resultados
+    finally:
+        connection.get_manager().close_all()
+        set_performance_profile(None)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir_filas(movimientos: int, resultados: List[Tuple[str, float, float, float]]) -> None:
+    print(f"Lectura de {movimientos:,} movimientos")
+    print(f"{'MÉTODO':<22} {'ms':>10} {'RETENIDO MB':>12} {'PICO MB':>10}")
+    for nombre, ms, retenido, pico in resultados:
+        print(f"{nombre:<22} {ms:>10.1f} {retenido:>12.1f} {pico:>10.1f}")
+
+
+def benchmark_streaming(movimientos: int) -> List[Tuple[str, float, float]]:
+    """
+    Exporta N movimientos a CSV cargando todo con fetchall() y con iter_query
+    (services.reportes). Retorna [(método, segundos, MB de pico de memoria)].
+    """
+    import csv
+    from services.reportes import ENCABEZADOS_MOVIMIENTOS, exportar_movimientos_csv
+    from .modelos import Movimiento
+    from .queries import _COLUMNAS_MOVIMIENTO, execute_query
+
+    directorio = tempfile.mkdtemp(prefix="almacen_bench_streaming_")
+    ruta_csv = os.path.join(directorio, "movimientos.csv")
+
+    def con_fetchall() -> int:
+        filas = execute_query(f"""
+            SELECT {_COLUMNAS_MOVIMIENTO}
+            FROM movimientos m
+            JOIN productos p ON m.producto_id = p.id
+            LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id
+            ORDER BY m.fecha_movimiento DESC, m.id DESC
+        """, fetch=True, modelo=Movimiento)
+        with open(ruta_csv, "w", newline="", encoding="utf-8-sig") as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(ENCABEZADOS_MOVIMIENTOS)
+            escritor.writerows(filas or [])
+        return len(filas or [])
+
+    try:
+        _preparar_bd(directorio, "bulk-load")
+        with connection.managed_connection() as conn:
+            conn.execute("INSERT INTO productos (sku, nombre, categoria, precio) VALUES ('SKU-STREAM', 'Bench', 'Bench', 1)")
+            conn.execute("DROP TRIGGER IF EXISTS actualizar_stock_after_movimiento")
+            conn.execute("""
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+                INSERT INTO movimientos (tipo, producto_id, ubicacion_id, cantidad, razon, usuario_id, fecha_movimiento)
+                SELECT 'IN', (SELECT MIN(id) FROM productos), (SELECT MIN(id) FROM ubicaciones),
+                       1, 'bench', 1, DATETIME('2023-01-01', '+' || i || ' seconds')
+                FROM n
+            """, (movimientos,))
+            conn.commit()
+
+        resultados: List[Tuple[str, float, float]] = []
+        for nombre, exportar in (("fetchall", con_fetchall),
+                                 ("iter_query", lambda: exportar_movimientos_csv(ruta_csv))):
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            filas = exportar()
+            tiempo = time.perf_counter() - inicio
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if filas != movimientos:
+                raise RuntimeError(f"{nombre}: se esperaban {movimientos} filas, se exportaron {filas}")
+            resultados.append((nombre, tiempo, pico / 1024 / 1024))
+        return resultados
+    finally:
+        connection.get_manager().close_all()
+        set_performance_profile(None)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir_streaming(movimientos: int, resultados: List[Tuple[str, float, float]]) -> None:
+    print(f"Exportación CSV de {movimientos:,} movimientos (medida con tracemalloc)")
+    print(f"{'MÉTODO':<12} {'SEGUNDOS':>10} {'PICO MB':>10}")
+    for nombre, segundos, mb in resultados:
+        print(f"{nombre:<12} {segundos:>10.1f} {mb:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de la base de datos del almacén")
+    sub = parser.add_subparsers(dest="escenario", required=True)
+
+    p_perfiles = sub.add_parser("perfiles", help="Compara los perfiles de rendimiento SQLite")
+    p_perfiles.add_argument("--operaciones", type=int, default=2000)
+
+    p_catalogo = sub.add_parser("catalogo", help="Mide el listado del catálogo con muchos SKU")
+    p_catalogo.add_argument("--productos", type=int, default=100000)
+
+    p_importacion = sub.add_parser("importacion", help="Mide la importación masiva de movimientos")
+    p_importacion.add_argument("--movimientos", type=int, default=1000000)
+
+    p_busqueda = sub.add_parser("busqueda", help="Compara la búsqueda FTS5 con LIKE")
+    p_busqueda.add_argument("--productos", type=int, default=200000)
+
+    p_fechas = sub.add_parser("fechas", help="Compara el filtro de fechas con DATE() y con rango semiabierto")
+    p_fechas.add_argument("--movimientos", type=int, default=5000000)
+
+    p_filas = sub.add_parser("filas", help="Compara filas como dict con filas tipadas (modelos)")
+    p_filas.add_argument("--movimientos", type=int, default=200000)
+
+    p_streaming = sub.add_parser("streaming", help="Compara la exportación con fetchall y con iter_query")
+    p_streaming.add_argument("--movimientos", type=int, default=1000000)
+
+    args = parser.parse_args()
+    escenarios: Dict[str, Callable[[], None]] = {
+        "perfiles": lambda: _imprimir_perfiles(benchmark_perfiles(args.operaciones)),
+        "catalogo": lambda: _imprimir_catalogo(args.productos, *benchmark_catalogo(args.productos)),
+        "busqueda": lambda: _imprimir_busqueda(benchmark_busqueda(args.productos)),
+        "fechas": lambda: _imprimir_fechas(args.movimientos, benchmark_fechas(args.movimientos)),
+        "filas": lambda: _imprimir_filas(args.movimientos, benchmark_filas(args.movimientos)),
+        "streaming": lambda: _imprimir_streaming(args.movimientos, benchmark_streaming(args.movimientos)),
+        "importacion": lambda: _imprimir_importacion(args.movimientos, *benchmark_importacion(args.movimientos)),
+    }
+    escenarios[args.escenario]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# database/catalogo.py - Catálogo de productos compartido en memoria
+"""
+Catálogo de productos en memoria, compartido por todas las vistas del proceso.
+
+La lista se carga una vez con get_all_products() y se reutiliza hasta que
+otro escritor cambia la BD. Para detectarlo se usa PRAGMA data_version sobre
+una conexión propia del catálogo: su valor cambia cuando cualquier OTRA
+conexión confirma cambios (las del pool de este proceso o de otro programa),
+y consultarlo no lee ninguna tabla.
+
+La búsqueda de texto usa el índice FTS5 de buscar_productos(): la BD solo
+resuelve los IDs que coinciden y las filas salen de la lista en memoria.
+Sin FTS5 se recorre la lista en memoria (substrings), como respaldo.
+
+Al extender el texto ("torn" -> "tornillo", "tornillo" -> "tornillo 12")
+las coincidencias solo pueden achicarse, así que refinar() filtra en memoria
+el resultado anterior con el mismo criterio que FTS5 (cada término es prefijo
+de alguna palabra de nombre, SKU, categoría, proveedor o descripción), sin
+volver a la BD.
+
+Uso:
+    from database.catalogo import get_catalogo
+    filas = get_catalogo().filtrar("tornillo 12")
+"""
+import re
+import sqlite3
+import threading
+import unicodedata
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+from . import connection
+from .modelos import Producto
+from .queries import buscar_ids_productos, get_all_products, obtener_descripciones_productos
+
+
+# Resultado anterior más grande que se refina en memoria (más allá, FTS5 es más rápido)
+MAX_FILAS_REFINADAS: int = 1000
+
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos (como el tokenizador de FTS5 con remove_diacritics)."""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    # NFKD separa las tildes; el codec ascii descarta las marcas sueltas
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def _texto_busqueda(fila: Producto, descripcion: str = "") -> str:
+    """Texto normalizado en el que se buscan los términos (empieza por el nombre)."""
+    return _normalizar(
+        f"{fila.nombre} {fila.sku or ''} {fila.categoria or ''} {fila.proveedor or ''} {descripcion}"
+    )
+
+
+# Palabras como las separa el tokenizador unicode61: letras y dígitos (el '_' separa)
+_PATRON_PALABRA = re.compile(r"[^\W_]+")
+
+
+def _palabras(texto: str) -> List[str]:
+    return _PATRON_PALABRA.findall(texto)
+
+
+class CatalogoProductos:
+    """
+    Lista de productos activos en memoria con invalidación por data_version.
+    Es segura entre hilos: la recarga y las lecturas comparten un lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ruta: Optional[str] = None
+        self._version: Optional[int] = None
+        self._filas: List[Producto] = []
+        self._textos: List[str] = []
+        self._por_id: Dict[int, Producto] = {}
+        self._textos_por_id: Dict[int, str] = {}
+        self._descripciones: Dict[int, str] = {}
+        # Criterio del último filtrar(): FTS5 (prefijos de palabra) o el respaldo por substrings
+        self._con_fts: bool = True
+        self.recargas: int = 0
+
+    # --- API PÚBLICA ---
+
+    def productos(self) -> List[Producto]:
+        """Todos los productos activos, ordenados por nombre (como get_all_products())."""
+        with self._lock:
+            self._asegurar_vigente()
+            return list(self._filas)
+
+    def filtrar(
+        self,
+        texto: str = "",
+        orden: str = "nombre",
+        descendente: bool = False,
+        limite: Optional[int] = None
+    ) -> List[Producto]:
+        """
+        Productos que coinciden con el texto en el índice FTS5 (prefijos de
+        nombre, SKU, categoría, proveedor o descripción), sin distinguir
+        mayúsculas ni acentos. Sin 'orden' explícito, por relevancia.
+        """
+        terminos = _normalizar(texto).split()
+        # La consulta FTS va antes del lock: si la BD cambió mientras tanto, la lista se recarga
+        ids = buscar_ids_productos(texto) if terminos else None
+        with self._lock:
+            self._asegurar_vigente()
+            if not terminos:
+                filas = list(self._filas)
+            elif ids is not None:
+                self._con_fts = True
+                por_id = self._por_id
+                filas = [por_id[i] for i in ids if i in por_id]
+            else:
+                self._con_fts = False
+                filas = self._filtrar_en_memoria(terminos)
+
+        if orden != "nombre" or descendente:
+            campo = attrgetter(orden)  # cualquier campo de Producto
+            filas.sort(key=lambda f: (campo(f) is None, campo(f) if campo(f) is not None else 0),
+                       reverse=descendente)
+        return filas[:limite] if limite is not None else filas
+
+    def refinar(self, filas: List[Producto], texto: str) -> List[Producto]:
+        """
+        Aplica el criterio de filtrar() sobre un resultado anterior (búsqueda
+        incremental): si 'texto' extiende el texto que produjo 'filas', sus
+        coincidencias son un subconjunto de ellas y no hace falta consultar la BD.
+        Conserva el orden del resultado anterior. Con más de MAX_FILAS_REFINADAS
+        filas se busca de nuevo con filtrar().
+        """
+        terminos = _palabras(_normalizar(texto))
+        if not terminos:
+            return list(filas)
+        if len(filas) > MAX_FILAS_REFINADAS:
+            return self.filtrar(texto)
+        with self._lock:
+            textos = self._textos_por_id
+            por_id = self._por_id
+            descripciones = self._descripciones
+            con_fts = self._con_fts
+
+        refinadas: List[Producto] = []
+        for fila in filas:
+            # Filas de una carga anterior del catálogo: se normaliza su propio texto
+            contenido = (textos[fila.id] if por_id.get(fila.id) is fila
+                         else _texto_busqueda(fila, descripciones.get(fila.id, "")))
+            if con_fts:
+                palabras = _palabras(contenido)
+                coincide = all(any(p.startswith(t) for p in palabras) for t in terminos)
+            else:
+                coincide = all(t in contenido for t in terminos)
+            if coincide:
+                refinadas.append(fila)
+        return refinadas
+
+    def por_id(self, producto_id: int) -> Optional[Producto]:
+        """Fila de un producto activo o None."""
+        with self._lock:
+            self._asegurar_vigente()
+            return self._por_id.get(producto_id)
+
+    def invalidar(self) -> None:
+        """Fuerza la recarga en la próxima consulta."""
+        with self._lock:
+            self._version = None
+
+    def cerrar(self) -> None:
+        """Cierra la conexión de control y descarta los datos."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._ruta = None
+            self._version = None
+            self._filas, self._textos, self._por_id = [], [], {}
+            self._textos_por_id, self._descripciones = {}, {}
+
+    # --- INTERNOS ---
+
+    def _filtrar_en_memoria(self, terminos: List[str]) -> List[Producto]:
+        """Respaldo sin FTS5: filas que contienen todos los términos. Requiere el lock."""
+        coincidencias = [
+            (fila, contenido) for fila, contenido in zip(self._filas, self._textos)
+            if all(t in contenido for t in terminos)
+        ]
+        # El texto normalizado empieza por el nombre: prefijo del nombre primero
+        primero = terminos[0]
+        coincidencias.sort(key=lambda par: not par[1].startswith(primero))
+        return [fila for fila, _ in coincidencias]
+
+    def _asegurar_vigente(self) -> None:
+        """Recarga la lista si cambió la BD (o su ruta) desde la última carga. Requiere el lock."""
+        if self._conn is None or self._ruta != connection.DB_PATH:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = connection.get_connection()
+            self._ruta = connection.DB_PATH
+            self._version = None
+
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+
+        filas = get_all_products()
+        descripciones = obtener_descripciones_productos()
+        self._filas = filas
+        self._textos = [_texto_busqueda(f, descripciones.get(f.id, "")) for f in filas]
+        self._por_id = {f.id: f for f in filas}
+        self._textos_por_id = {f.id: t for f, t in zip(filas, self._textos)}
+        self._descripciones = descripciones
+        self._version = version
+        self.recargas += 1
+
+
+_catalogo = CatalogoProductos()
+
+
+def get_catalogo() -> CatalogoProductos:
+    """Retorna el catálogo compartido del proceso."""
+    return _catalogo
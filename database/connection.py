@@ -1,353 +1,376 @@
 # database/connection.py - VERSIÓN ACTUALIZADA Y SIMPLIFICADA
 import sqlite3
 import os
-from typing import Optional
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Optional, Iterator, List, Dict, Any
 
 DB_PATH: str = os.path.join('data', 'almacen.db')
 
+# ============================================
+# PERFILES DE RENDIMIENTO
+# ============================================
+# Se aplican a cada conexión nueva. 'page_size' solo tiene efecto al crear
+# el archivo de base de datos (en una BD existente requiere VACUUM fuera de WAL).
+PERFILES_RENDIMIENTO: Dict[str, Dict[str, Any]] = {
+    # Máxima seguridad: fsync en cada commit
+    "durable": {
+        "page_size": 4096,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,          # ~8 MB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    # Uso diario: WAL + NORMAL no pierde integridad, solo los últimos commits ante un corte de energía
+    "balanced": {
+        "page_size": 4096,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,         # ~32 MB
+        "mmap_size": 134217728,       # 128 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Cargas masivas e importaciones: sin fsync, caché grande
+    "bulk-load": {
+        "page_size": 8192,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -131072,        # ~128 MB
+        "mmap_size": 268435456,       # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+PERFIL_PREDETERMINADO: str = "balanced"
+PERFIL_ENV_VAR: str = "ALMACEN_DB_PROFILE"
+PERFIL_CLAVE_CONFIG: str = "perfil_db"
+
+# Perfil resuelto (se calcula con la primera conexión)
+_perfil_activo: Optional[str] = None
+
+# Conexiones máximas que el pool reparte entre hilos de trabajo
+POOL_MAX_CONEXIONES: int = 4
+POOL_ESPERA_SEGUNDOS: float = 30.0
+
 def get_connection() -> sqlite3.Connection:
     """
     Establece la conexión con la base de datos SQLite.
     Asegura la existencia del directorio de datos.
     """
-    if not os.path.exists('data'):
-        os.makedirs('data')
+    directorio = os.path.dirname(DB_PATH)
+    if directorio and not os.path.exists(directorio):
+        os.makedirs(directorio)
     
-    conn = sqlite3.connect(DB_PATH)
+    # check_same_thread=False: las conexiones del pool cambian de hilo
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.execute("PRAGMA foreign_keys = ON")
+    aplicar_perfil(conn, get_performance_profile(conn))
     return conn
 
+def get_performance_profile(conn: Optional[sqlite3.Connection] = None) -> str:
+    """
+    Retorna el nombre del perfil de rendimiento activo.
+    Prioridad: variable de entorno ALMACEN_DB_PROFILE > clave 'perfil_db'
+    en la tabla configuracion > perfil predeterminado.
+    """
+    global _perfil_activo
+    if _perfil_activo is not None:
+        return _perfil_activo
+
+    perfil: Optional[str] = os.environ.get(PERFIL_ENV_VAR)
+    if not perfil and conn is not None:
+        try:
+            row = conn.execute(
+                "SELECT valor FROM configuracion WHERE clave = ?",
+                (PERFIL_CLAVE_CONFIG,)
+            ).fetchone()
+            perfil = row[0] if row else None
+        except sqlite3.Error:
+            perfil = None  # BD nueva: la tabla aún no existe
+
+    if perfil not in PERFILES_RENDIMIENTO:
+        if perfil:
+            print(f"⚠ Perfil de BD desconocido '{perfil}', usando '{PERFIL_PREDETERMINADO}'")
+        perfil = PERFIL_PREDETERMINADO
+
+    _perfil_activo = perfil
+    return perfil
+
+def set_performance_profile(nombre: Optional[str]) -> None:
+    """
+    Fuerza un perfil para las conexiones nuevas (None vuelve a resolverlo).
+    Las conexiones ya abiertas se cierran para que tomen el nuevo perfil.
+    """
+    global _perfil_activo
+    if nombre is not None and nombre not in PERFILES_RENDIMIENTO:
+        raise ValueError(f"Perfil de BD desconocido: {nombre}")
+    _manager.close_all()
+    _perfil_activo = nombre
+
+def aplicar_perfil(conn: sqlite3.Connection, nombre: str) -> None:
+    """Aplica los PRAGMA de un perfil de rendimiento a la conexión."""
+    perfil = PERFILES_RENDIMIENTO[nombre]
+    # page_size debe ir antes que journal_mode para que aplique a BD nuevas
+    conn.execute(f"PRAGMA page_size = {int(perfil['page_size'])}")
+    conn.execute(f"PRAGMA journal_mode = {perfil['journal_mode']}").fetchone()
+    conn.execute(f"PRAGMA synchronous = {perfil['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(perfil['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(perfil['mmap_size'])}").fetchone()
+    conn.execute(f"PRAGMA temp_store = {perfil['temp_store']}")
+    conn.execute(f"PRAGMA busy_timeout = {int(perfil['busy_timeout'])}").fetchone()
+
+class ConnectionManager:
+    """
+    Administra conexiones SQLite reutilizables.
+
+    - El hilo principal conserva una conexión de larga duración.
+    - Los hilos de trabajo toman prestada una conexión de un pool acotado
+      y la devuelven al terminar el bloque.
+    - Tras un error la conexión se revierte (rollback); si no responde,
+      se descarta y se reemplaza por una nueva.
+    """
+
+    def __init__(self, max_conexiones: int = POOL_MAX_CONEXIONES) -> None:
+        self.max_conexiones: int = max_conexiones
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._creadas: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._local: threading.local = threading.local()
+        self._principal: Optional[sqlite3.Connection] = None
+
+    # --- API PÚBLICA ---
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Entrega la conexión del hilo actual.
+        Las llamadas anidadas dentro del mismo hilo reutilizan la misma conexión.
+        """
+        estado = self._local
+        if getattr(estado, 'profundidad', 0) > 0:
+            estado.profundidad += 1
+            try:
+                yield estado.conn
+            finally:
+                estado.profundidad -= 1
+            return
+
+        conn = self._adquirir()
+        estado.conn = conn
+        estado.profundidad = 1
+        error = False
+        try:
+            yield conn
+        except BaseException:
+            error = True
+            raise
+        finally:
+            estado.profundidad = 0
+            estado.conn = None
+            self._liberar(conn, error)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Transacción de escritura sobre la conexión del hilo actual.
+        Abre con BEGIN IMMEDIATE (toma el bloqueo de escritura antes de leer, así
+        dos terminales no pueden validar el mismo stock a la vez), confirma al
+        salir y revierte ante cualquier excepción.
+        Las transacciones anidadas se unen a la externa.
+        """
+        with self.connection() as conn:
+            estado = self._local
+            if getattr(estado, 'transacciones', 0) > 0 or conn.in_transaction:
+                estado.transacciones = getattr(estado, 'transacciones', 0) + 1
+                try:
+                    yield conn
+                finally:
+                    estado.transacciones -= 1
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            estado.transacciones = 1
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                estado.transacciones = 0
+
+    def in_transaction(self) -> bool:
+        """Indica si el hilo actual está dentro de transaction()."""
+        return getattr(self._local, 'transacciones', 0) > 0
+
+    def prestar(self) -> sqlite3.Connection:
+        """
+        Presta una conexión del pool que no se comparte con el resto del hilo
+        (tampoco en el hilo principal). Es para lecturas largas que mantienen un
+        cursor abierto entre llamadas (ver iter_query); devolver con devolver().
+        No ve los cambios aún no confirmados de la transacción del hilo.
+        """
+        return self._tomar_del_pool()
+
+    def devolver(self, conn: sqlite3.Connection, error: bool = False) -> None:
+        """Devuelve al pool una conexión obtenida con prestar()."""
+        self._devolver_al_pool(conn, self._restablecer(conn, verificar=error))
+
+    def close_all(self) -> None:
+        """Cierra todas las conexiones (al salir de la aplicación o al cambiar de BD)."""
+        with self._lock:
+            conexiones: List[sqlite3.Connection] = []
+            while True:
+                try:
+                    conexiones.append(self._pool.get_nowait())
+                except queue.Empty:
+                    break
+            if self._principal is not None:
+                conexiones.append(self._principal)
+                self._principal = None
+            self._creadas = 0
+        for conn in conexiones:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    # --- MÉTODOS PRIVADOS ---
+
+    def _es_hilo_principal(self) -> bool:
+        return threading.current_thread() is threading.main_thread()
+
+    def _adquirir(self) -> sqlite3.Connection:
+        if self._es_hilo_principal():
+            if self._principal is None:
+                self._principal = get_connection()
+            return self._principal
+        return self._tomar_del_pool()
+
+    def _tomar_del_pool(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            puede_crear = self._creadas < self.max_conexiones
+            if puede_crear:
+                self._creadas += 1
+        if puede_crear:
+            try:
+                return get_connection()
+            except sqlite3.Error:
+                with self._lock:
+                    self._creadas -= 1
+                raise
+        # Pool agotado: esperar a que otro hilo devuelva su conexión
+        try:
+            return self._pool.get(timeout=POOL_ESPERA_SEGUNDOS)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Pool de conexiones agotado") from None
+
+    def _liberar(self, conn: sqlite3.Connection, error: bool) -> None:
+        sana = self._restablecer(conn, verificar=error)
+        if self._es_hilo_principal() and conn is self._principal:
+            if not sana:
+                self._descartar(conn)
+                self._principal = None
+            return
+        self._devolver_al_pool(conn, sana)
+
+    def _devolver_al_pool(self, conn: sqlite3.Connection, sana: bool) -> None:
+        if sana:
+            self._pool.put(conn)
+        else:
+            self._descartar(conn)
+            with self._lock:
+                self._creadas -= 1
+
+    def _restablecer(self, conn: sqlite3.Connection, verificar: bool) -> bool:
+        """Deja la conexión sin transacciones abiertas. Retorna False si está dañada."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if verificar:
+                conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+# Instancia única usada por toda la capa de datos
+_manager: ConnectionManager = ConnectionManager()
+
+def get_manager() -> ConnectionManager:
+    """Retorna el administrador de conexiones compartido."""
+    return _manager
+
+def managed_connection():
+    """
+    Atajo para `get_manager().connection()`.
+    Uso: `with managed_connection() as conn: ...`
+    """
+    return _manager.connection()
+
+def managed_transaction():
+    """
+    Atajo para `get_manager().transaction()`.
+    Uso: `with managed_transaction() as conn: ...`
+    """
+    return _manager.transaction()
+
+def set_database_path(path: str) -> None:
+    """
+    Cambia la ruta de la base de datos y cierra las conexiones abiertas.
+    Útil para scripts de mantenimiento y benchmarks.
+    """
+    global DB_PATH, _perfil_activo, _inicializada
+    _manager.close_all()
+    DB_PATH = path
+    _perfil_activo = None
+    _inicializada = False
+
 def initialize_db() -> None:
     """
-    Crea las tablas necesarias según los módulos existentes.
+    Lleva el esquema a la última versión aplicando las migraciones pendientes
+    (ver database/migrations.py). Con el esquema al día solo lee PRAGMA user_version.
     """
-    conn: sqlite3.Connection = get_connection()
-    cursor: sqlite3.Cursor = conn.cursor()
-    
-    # ============================================
-    # 1. TABLAS ESENCIALES
-    # ============================================
-    
-    # Tabla usuarios
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS usuarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        usuario TEXT UNIQUE NOT NULL,
-        contrasena TEXT NOT NULL,
-        rol TEXT NOT NULL CHECK(rol IN ('Almacenero', 'Administrador', 'Consultor')),
-        activo BOOLEAN DEFAULT 1,
-        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Tabla productos (CON UBICACIÓN Y PROVEEDOR)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS productos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        sku TEXT UNIQUE NOT NULL,
-        nombre TEXT NOT NULL,
-        descripcion TEXT,
-        categoria TEXT,
-        precio DECIMAL(10,2) DEFAULT 0,
-        costo DECIMAL(10,2) DEFAULT 0,
-        proveedor TEXT,
-        unidad_medida TEXT DEFAULT 'Units',
-        stock_minimo INTEGER DEFAULT 0,
-        ubicacion TEXT DEFAULT 'Sin ubicación',
-        activo BOOLEAN DEFAULT 1,
-        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Tabla ubicaciones
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS ubicaciones (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        codigo TEXT UNIQUE NOT NULL,
-        pasillo TEXT NOT NULL,
-        estante TEXT NOT NULL,
-        nivel TEXT NOT NULL,
-        capacidad INTEGER DEFAULT 1,
-        ocupado BOOLEAN DEFAULT 0,
-        activo BOOLEAN DEFAULT 1
-    )
-    ''')
-
-    # Tabla clientes
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS clientes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT,
-        documento TEXT,
-        telefono TEXT,
-        email TEXT,
-        direccion TEXT,
-        activo BOOLEAN DEFAULT 1,
-        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Tabla configuracion
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS configuracion (
-        clave TEXT PRIMARY KEY,
-        valor TEXT,
-        descripcion TEXT
-    )
-    ''')
-
-    # Tabla inventario
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS inventario (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        producto_id INTEGER NOT NULL,
-        ubicacion_id INTEGER NOT NULL,
-        cantidad INTEGER NOT NULL DEFAULT 0,
-        FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
-        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id) ON DELETE CASCADE,
-        UNIQUE(producto_id, ubicacion_id)
-    )
-    ''')
-
-    # Tabla ordenes
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS ordenes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        numero_orden TEXT UNIQUE NOT NULL,
-        tipo_operacion TEXT NOT NULL CHECK(tipo_operacion IN ('Venta Directa', 'Pedido Web', 'Transferencia')),
-        cliente_id INTEGER,
-        total DECIMAL(10,2) DEFAULT 0,
-        estado TEXT DEFAULT 'pendiente' CHECK(estado IN ('pendiente', 'completada', 'cancelada')),
-        usuario_id INTEGER NOT NULL,
-        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        fecha_completada TIMESTAMP,
-        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-        FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-    )
-    ''')
-
-    # Tabla orden_detalles
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS orden_detalles (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        orden_id INTEGER NOT NULL,
-        producto_id INTEGER NOT NULL,
-        cantidad INTEGER NOT NULL,
-        precio_unitario DECIMAL(10,2),
-        ubicacion_id INTEGER,
-        procesado BOOLEAN DEFAULT 0,
-        FOREIGN KEY (orden_id) REFERENCES ordenes(id) ON DELETE CASCADE,
-        FOREIGN KEY (producto_id) REFERENCES productos(id),
-        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id)
-    )
-    ''')
-
-    # Tabla movimientos (ACTUALIZADA para incluir proveedor)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS movimientos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        tipo TEXT NOT NULL CHECK(tipo IN ('IN', 'OUT')),
-        producto_id INTEGER NOT NULL,
-        ubicacion_id INTEGER,
-        cantidad INTEGER NOT NULL,
-        cantidad_anterior INTEGER,
-        cantidad_nueva INTEGER,
-        razon TEXT NOT NULL,
-        razon_detalle TEXT,
-        usuario_id INTEGER NOT NULL,
-        proveedor TEXT,  -- AÑADIDO para compatibilidad con movimientos.py
-        referencia TEXT,
-        observaciones TEXT,
-        fecha_movimiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (producto_id) REFERENCES productos(id),
-        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id),
-        FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-    )
-    ''')
-
-    # ============================================
-    # 2. TRIGGERS ESENCIALES
-    # ============================================
-    
-    # Trigger para actualizar stock después de movimiento
-    cursor.execute("DROP TRIGGER IF EXISTS actualizar_stock_after_movimiento")
-    cursor.execute('''
-    CREATE TRIGGER actualizar_stock_after_movimiento
-        AFTER INSERT ON movimientos
-        FOR EACH ROW
-        BEGIN
-            -- Entrada (IN)
-            UPDATE inventario 
-            SET cantidad = cantidad + NEW.cantidad
-            WHERE producto_id = NEW.producto_id 
-            AND ubicacion_id = NEW.ubicacion_id
-            AND NEW.tipo = 'IN'
-            AND NEW.ubicacion_id IS NOT NULL;
-            
-            -- Salida (OUT)
-            UPDATE inventario 
-            SET cantidad = cantidad - NEW.cantidad
-            WHERE producto_id = NEW.producto_id 
-            AND ubicacion_id = NEW.ubicacion_id
-            AND NEW.tipo = 'OUT'
-            AND NEW.ubicacion_id IS NOT NULL
-            AND cantidad >= NEW.cantidad;
-            
-            -- Crear registro si no existe para entradas
-            INSERT OR IGNORE INTO inventario (producto_id, ubicacion_id, cantidad)
-            SELECT NEW.producto_id, NEW.ubicacion_id, NEW.cantidad
-            WHERE NEW.tipo = 'IN' 
-            AND NEW.ubicacion_id IS NOT NULL
-            AND NOT EXISTS (
-                SELECT 1 FROM inventario 
-                WHERE producto_id = NEW.producto_id 
-                AND ubicacion_id = NEW.ubicacion_id
-            );
-        END;
-    ''')
-
-    # Trigger para actualizar ocupación de ubicación
-    cursor.execute("DROP TRIGGER IF EXISTS actualizar_ocupacion_ubicacion")
-    cursor.execute('''
-    CREATE TRIGGER actualizar_ocupacion_ubicacion
-    AFTER UPDATE OF cantidad ON inventario
-    FOR EACH ROW
-    BEGIN
-        UPDATE ubicaciones
-        SET ocupado = CASE 
-            WHEN NEW.cantidad > 0 THEN 1 
-            ELSE 0 
-        END
-        WHERE id = NEW.ubicacion_id;
-    END;
-    ''')
-
-    # ============================================
-    # 3. VISTAS ESENCIALES (ACTUALIZADAS)
-    # ============================================
-    
-    # Vista inventario completo (para inventario.py)
-    cursor.execute("DROP VIEW IF EXISTS vista_inventario_completo")
-    cursor.execute('''
-    CREATE VIEW vista_inventario_completo AS
-        SELECT 
-            p.id as producto_id,
-            p.sku,
-            p.nombre,
-            p.descripcion,
-            p.categoria,
-            p.precio,
-            p.unidad_medida,
-            p.costo,
-            p.proveedor,
-            p.ubicacion,
-            
-            COALESCE(SUM(i.cantidad), 0) as cantidad_total,
-            
-            CASE 
-                WHEN COALESCE(SUM(i.cantidad), 0) <= p.stock_minimo 
-                    AND COALESCE(SUM(i.cantidad), 0) > 0 THEN 'Low Stock'
-                WHEN COALESCE(SUM(i.cantidad), 0) = 0 THEN 'Out of Stock'
-                ELSE 'In Stock'
-            END as estado
-            
-        FROM productos p
-        LEFT JOIN inventario i ON p.id = i.producto_id
-        WHERE p.activo = 1
-        GROUP BY p.id, p.sku, p.nombre, p.descripcion, p.categoria, 
-            p.precio, p.unidad_medida, p.costo, p.proveedor, p.ubicacion, p.stock_minimo;
-    ''')
-
-    # Vista movimientos detallados (ACTUALIZADA para incluir proveedor)
-    cursor.execute("DROP VIEW IF EXISTS vista_movimientos_detallados")
-    cursor.execute('''
-    CREATE VIEW vista_movimientos_detallados AS
-    SELECT 
-        m.fecha_movimiento,
-        p.nombre as producto,
-        p.sku,
-        CASE m.tipo
-            WHEN 'IN' THEN '↑ IN'
-            WHEN 'OUT' THEN '↓ OUT'
-            ELSE m.tipo
-        END as tipo,
-        m.cantidad,
-        m.razon,
-        m.razon_detalle,
-        COALESCE(m.proveedor, p.proveedor) as proveedor,  -- Prioriza proveedor del movimiento
-        u.usuario,
-        ub.codigo as ubicacion,
-        m.observaciones
-    FROM movimientos m
-    JOIN productos p ON m.producto_id = p.id
-    JOIN usuarios u ON m.usuario_id = u.id
-    LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id
-    ORDER BY m.fecha_movimiento DESC;
-    ''')
-
-    # ============================================
-    # 4. DATOS INICIALES ESENCIALES
-    # ============================================
-    
-    # Usuarios por defecto
-    cursor.execute("SELECT COUNT(*) FROM usuarios")
-    usuarios_existen = cursor.fetchone()[0] > 0
-    
-    if not usuarios_existen:
-        usuarios_iniciales = [
-            ('admin', 'admin123', 'Administrador'),
-            ('almacen', 'almacen123', 'Almacenero'),
-            ('consulta', 'consulta123', 'Consultor')
-        ]
-        
-        cursor.executemany(
-            "INSERT INTO usuarios (usuario, contrasena, rol) VALUES (?, ?, ?)",
-            usuarios_iniciales
-        )
-    
-    # Configuraciones básicas
-    configuraciones = [
-        ('empresa_nombre', 'LogiStock Pro', 'Nombre de la empresa'),
-        ('moneda', '$', 'Símbolo de moneda'),
-        ('decimales', '2', 'Decimales para precios'),
-        ('dias_alerta_caducidad', '30', 'Días para alerta de caducidad'),
-        ('porcentaje_stock_minimo', '10', 'Porcentaje para stock mínimo automático')
-    ]
-    
-    for clave, valor, descripcion in configuraciones:
-        cursor.execute(
-            "SELECT COUNT(*) FROM configuracion WHERE clave = ?",
-            (clave,)
-        )
-        if cursor.fetchone()[0] == 0:
-            cursor.execute(
-                "INSERT INTO configuracion (clave, valor, descripcion) VALUES (?, ?, ?)",
-                (clave, valor, descripcion)
-            )
-    
-    # Ubicaciones de ejemplo
-    ubicaciones_ejemplo = [
-        ('3-2-5', '3', '2', '5', 10),
-        ('7-7-7', '7', '7', '7', 10),
-        ('asd-asd-asd', 'asd', 'asd', 'asd', 10),
-        ('1-1-1', '1', '1', '1', 10),
-        ('2-2-2', '2', '2', '2', 10)
-    ]
-    
-    for codigo, pasillo, estante, nivel, capacidad in ubicaciones_ejemplo:
-        cursor.execute(
-            "SELECT COUNT(*) FROM ubicaciones WHERE codigo = ?",
-            (codigo,)
-        )
-        if cursor.fetchone()[0] == 0:
-            cursor.execute(
-                "INSERT INTO ubicaciones (codigo, pasillo, estante, nivel, capacidad) VALUES (?, ?, ?, ?, ?)",
-                (codigo, pasillo, estante, nivel, capacidad)
-            )
-
-    conn.commit()
-    conn.close()
-    print("✅ Base de datos inicializada con estructura actualizada")
+    from .migrations import aplicar_migraciones, VERSION_ESQUEMA
+
+    with managed_connection() as conn:
+        aplicadas = aplicar_migraciones(conn)
+
+    if aplicadas:
+        print(f"✅ Base de datos actualizada a la versión de esquema {VERSION_ESQUEMA}")
+
+# Se inicializa una vez por proceso (y por ruta, ver set_database_path)
+_inicializada: bool = False
+_lock_inicializacion = threading.Lock()
+
+def asegurar_inicializada() -> None:
+    """
+    Ejecuta initialize_db() si aún no se ejecutó. Si otro hilo la está
+    ejecutando (el arranque la lanza en segundo plano mientras se muestra
+    el login), espera a que termine en vez de repetirla.
+    """
+    global _inicializada
+    if _inicializada:
+        return
+    with _lock_inicializacion:
+        if not _inicializada:
+            initialize_db()
+            _inicializada = True
 
 # Función de compatibilidad (mantenida para código existente)
 def create_tables() -> None:
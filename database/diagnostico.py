@@ -0,0 +1,157 @@
+# database/diagnostico.py - Verificación de planes de consulta
+"""
+Comprueba con EXPLAIN QUERY PLAN que las consultas críticas de queries.py
+usan índices y no recorren completas las tablas grandes.
+
+Uso:
+    python -m database.diagnostico            # BD temporal con el esquema actual
+    python -m database.diagnostico --bd RUTA  # una BD existente
+
+Termina con código 1 si alguna consulta cae en un SCAN completo, o con
+código 2 si la BD indicada con --bd no tiene el esquema al día (la
+verificación no la migra: se migra al abrirla con la aplicación).
+"""
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import connection, queries
+from .connection import initialize_db, managed_connection, set_database_path
+from .migrations import VERSION_ESQUEMA, obtener_version
+
+# Tablas que no pueden recorrerse completas (con los alias usados en queries.py)
+TABLAS_VIGILADAS: Tuple[str, ...] = (
+    "movimientos", "m",
+    "inventario", "i",
+    "ordenes", "o",
+    "orden_detalles",
+    "productos", "p",
+)
+
+def _con_conexion(funcion: Callable[[Any], Any]) -> Any:
+    """Llama a una consulta interna que recibe la conexión (p. ej. las lecturas de una transacción)."""
+    with managed_connection() as conn:
+        return funcion(conn)
+
+
+# Consultas críticas: (nombre, llamada representativa)
+CONSULTAS_VIGILADAS: List[Tuple[str, Callable[[], Any]]] = [
+    ("get_movimientos_history", lambda: queries.get_movimientos_history()),
+    ("obtener_movimientos_pagina", lambda: queries.obtener_movimientos_pagina(100, "2024-06-01 00:00:00|1000")),
+    ("obtener_movimientos_pagina (fechas)", lambda: queries.obtener_movimientos_pagina(
+        100, fecha_desde="2024-01-01", fecha_hasta="2024-01-31")),
+    ("get_movimientos_por_producto", lambda: queries.get_movimientos_por_producto(1)),
+    ("get_movimientos_por_producto (fechas)", lambda: queries.get_movimientos_por_producto(1, "2024-01-01", "2024-01-31")),
+    ("obtener_resumen_movimientos", lambda: queries.obtener_resumen_movimientos("2024-01-01", "2024-01-31")),
+    ("obtener_movimientos_por_fecha", lambda: queries.obtener_movimientos_por_fecha("2024-01-01", "2024-12-31")),
+    ("obtener_ordenes_pendientes", lambda: queries.obtener_ordenes_pendientes()),
+    ("asignación de ubicaciones (existencias)", lambda: _con_conexion(
+        lambda conn: queries._leer_existencias(conn, [1, 2, 3]))),
+    ("get_all_products", lambda: queries.get_all_products()),
+    ("get_products_simple", lambda: queries.get_products_simple()),
+    ("buscar_productos", lambda: queries.buscar_productos("tornillo 12")),
+    ("buscar_ids_productos", lambda: queries.buscar_ids_productos("tornillo 12")),
+    ("buscar_producto_por_sku", lambda: queries.buscar_producto_por_sku("SKU-0001")),
+    ("get_product_stock", lambda: queries.get_product_stock(1)),
+    ("get_product_stock (ubicación)", lambda: queries.get_product_stock(1, 1)),
+    ("get_stock_detallado", lambda: queries.get_stock_detallado(1)),
+    ("obtener_disponible", lambda: queries.obtener_disponible(1)),
+    ("obtener_disponible (ubicación)", lambda: queries.obtener_disponible(1, 1)),
+    ("obtener_ubicaciones", lambda: queries.obtener_ubicaciones()),
+]
+
+# "SCAN m" / "SCAN TABLE movimientos AS m" sin "USING ... INDEX"
+_PATRON_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+
+
+def capturar_sentencias(funcion: Callable[[], Any]) -> List[str]:
+    """Ejecuta la función y retorna las sentencias SELECT que envió a SQLite (con parámetros expandidos)."""
+    sentencias: List[str] = []
+
+    def registrar(sql: str) -> None:
+        if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            sentencias.append(sql)
+
+    with managed_connection() as conn:
+        conn.set_trace_callback(registrar)
+        try:
+            funcion()
+        finally:
+            conn.set_trace_callback(None)
+    return sentencias
+
+
+def escaneos_completos(sql: str) -> List[str]:
+    """Retorna los pasos del plan que recorren completa una tabla vigilada."""
+    problemas: List[str] = []
+    with managed_connection() as conn:
+        for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+            detalle: str = fila[3]
+            coincidencia = _PATRON_SCAN.match(detalle)
+            if coincidencia and any(nombre in TABLAS_VIGILADAS for nombre in coincidencia.groups() if nombre):
+                problemas.append(detalle)
+    return problemas
+
+
+def verificar_planes_consulta() -> List[Dict[str, str]]:
+    """
+    Revisa el plan de cada consulta vigilada.
+    Retorna una lista de problemas {'consulta', 'detalle', 'sql'}; vacía si todo usa índices.
+    """
+    problemas: List[Dict[str, str]] = []
+    for nombre, funcion in CONSULTAS_VIGILADAS:
+        for sql in capturar_sentencias(funcion):
+            for detalle in escaneos_completos(sql):
+                problemas.append({'consulta': nombre, 'detalle': detalle, 'sql': " ".join(sql.split())})
+    return problemas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verifica que las consultas críticas usen índices")
+    parser.add_argument("--bd", help="Ruta de una BD existente (por defecto, una BD temporal nueva)")
+    args = parser.parse_args()
+
+    ruta_original = connection.DB_PATH
+    directorio = None
+    if args.bd:
+        if not os.path.exists(args.bd):
+            print(f"❌ No existe la base de datos: {args.bd}")
+            sys.exit(2)
+        # Solo lectura: abrirla con el pool ya cambiaría su modo de journal
+        with closing(sqlite3.connect(Path(args.bd).resolve().as_uri() + "?mode=ro", uri=True)) as conn:
+            version = obtener_version(conn)
+        if version < VERSION_ESQUEMA:
+            print(f"❌ La base de datos no está migrada: esquema {version}, se requiere {VERSION_ESQUEMA}.")
+            print("   Ábrela una vez con la aplicación (o llama a initialize_db()) y vuelve a verificar.")
+            sys.exit(2)
+        set_database_path(args.bd)
+    else:
+        directorio = tempfile.mkdtemp(prefix="almacen_planes_")
+        set_database_path(os.path.join(directorio, "almacen.db"))
+        initialize_db()
+
+    try:
+        problemas = verificar_planes_consulta()
+    finally:
+        set_database_path(ruta_original)
+        if directorio:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    if problemas:
+        print("❌ Consultas con recorrido completo de tabla:")
+        for p in problemas:
+            print(f"  • {p['consulta']}: {p['detalle']}\n      {p['sql']}")
+        sys.exit(1)
+
+    print(f"✅ {len(CONSULTAS_VIGILADAS)} consultas verificadas: todas usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,859 @@
+# database/migrations.py - Migraciones versionadas del esquema
+"""
+Cada migración tiene un número, una descripción y una función que recibe el
+cursor. La versión aplicada se guarda en PRAGMA user_version, de modo que un
+arranque con el esquema al día solo hace una lectura de esa versión.
+
+Para cambiar el esquema: agregar una función _vN_... y registrarla al final
+de MIGRACIONES. Nunca modificar una migración ya publicada.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from .connection import PERFIL_CLAVE_CONFIG, PERFIL_PREDETERMINADO
+
+Migracion = Tuple[int, str, Callable[[sqlite3.Cursor], None]]
+
+# ============================================
+# DEFINICIONES REUTILIZABLES (triggers y vistas)
+# ============================================
+
+# Trigger para actualizar stock después de movimiento
+TRIGGER_ACTUALIZAR_STOCK: str = '''
+CREATE TRIGGER actualizar_stock_after_movimiento
+    AFTER INSERT ON movimientos
+    FOR EACH ROW
+    BEGIN
+        -- Entrada (IN)
+        UPDATE inventario
+        SET cantidad = cantidad + NEW.cantidad
+        WHERE producto_id = NEW.producto_id
+        AND ubicacion_id = NEW.ubicacion_id
+        AND NEW.tipo = 'IN'
+        AND NEW.ubicacion_id IS NOT NULL;
+
+        -- Salida (OUT)
+        UPDATE inventario
+        SET cantidad = cantidad - NEW.cantidad
+        WHERE producto_id = NEW.producto_id
+        AND ubicacion_id = NEW.ubicacion_id
+        AND NEW.tipo = 'OUT'
+        AND NEW.ubicacion_id IS NOT NULL
+        AND cantidad >= NEW.cantidad;
+
+        -- Crear registro si no existe para entradas
+        INSERT OR IGNORE INTO inventario (producto_id, ubicacion_id, cantidad)
+        SELECT NEW.producto_id, NEW.ubicacion_id, NEW.cantidad
+        WHERE NEW.tipo = 'IN'
+        AND NEW.ubicacion_id IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM inventario
+            WHERE producto_id = NEW.producto_id
+            AND ubicacion_id = NEW.ubicacion_id
+        );
+    END;
+'''
+
+# Trigger para actualizar ocupación de ubicación
+TRIGGER_OCUPACION_UBICACION: str = '''
+CREATE TRIGGER actualizar_ocupacion_ubicacion
+AFTER UPDATE OF cantidad ON inventario
+FOR EACH ROW
+BEGIN
+    UPDATE ubicaciones
+    SET ocupado = CASE
+        WHEN NEW.cantidad > 0 THEN 1
+        ELSE 0
+    END
+    WHERE id = NEW.ubicacion_id;
+END;
+'''
+
+# Vista movimientos detallados (prioriza el proveedor del movimiento)
+VISTA_MOVIMIENTOS_DETALLADOS: str = '''
+CREATE VIEW vista_movimientos_detallados AS
+SELECT
+    m.id,
+    m.fecha_movimiento,
+    p.nombre as producto,
+    p.sku,
+    CASE m.tipo
+        WHEN 'IN' THEN '↑ IN'
+        WHEN 'OUT' THEN '↓ OUT'
+        ELSE m.tipo
+    END as tipo,
+    m.cantidad,
+    m.razon,
+    m.razon_detalle,
+    COALESCE(m.proveedor, p.proveedor) as proveedor,
+    u.usuario,
+    ub.codigo as ubicacion,
+    m.observaciones
+FROM movimientos m
+JOIN productos p ON m.producto_id = p.id
+JOIN usuarios u ON m.usuario_id = u.id
+LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id;
+'''
+
+# ============================================
+# MIGRACIONES
+# ============================================
+
+def _v1_esquema_base(cursor: sqlite3.Cursor) -> None:
+    """
+    Esquema original: tablas, triggers, vistas y datos iniciales.
+    Usa IF NOT EXISTS / OR IGNORE para adoptar BD creadas antes de las migraciones.
+    """
+    # --- 1. TABLAS ESENCIALES ---
+
+    # Tabla usuarios
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario TEXT UNIQUE NOT NULL,
+        contrasena TEXT NOT NULL,
+        rol TEXT NOT NULL CHECK(rol IN ('Almacenero', 'Administrador', 'Consultor')),
+        activo BOOLEAN DEFAULT 1,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Tabla productos (CON UBICACIÓN Y PROVEEDOR)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS productos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sku TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        descripcion TEXT,
+        categoria TEXT,
+        precio DECIMAL(10,2) DEFAULT 0,
+        costo DECIMAL(10,2) DEFAULT 0,
+        proveedor TEXT,
+        unidad_medida TEXT DEFAULT 'Units',
+        stock_minimo INTEGER DEFAULT 0,
+        ubicacion TEXT DEFAULT 'Sin ubicación',
+        activo BOOLEAN DEFAULT 1,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Tabla ubicaciones
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ubicaciones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        pasillo TEXT NOT NULL,
+        estante TEXT NOT NULL,
+        nivel TEXT NOT NULL,
+        capacidad INTEGER DEFAULT 1,
+        ocupado BOOLEAN DEFAULT 0,
+        activo BOOLEAN DEFAULT 1
+    )
+    ''')
+
+    # Tabla clientes
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS clientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        documento TEXT,
+        telefono TEXT,
+        email TEXT,
+        direccion TEXT,
+        activo BOOLEAN DEFAULT 1,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Tabla configuracion
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS configuracion (
+        clave TEXT PRIMARY KEY,
+        valor TEXT,
+        descripcion TEXT
+    )
+    ''')
+
+    # Tabla inventario
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS inventario (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        producto_id INTEGER NOT NULL,
+        ubicacion_id INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
+        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id) ON DELETE CASCADE,
+        UNIQUE(producto_id, ubicacion_id)
+    )
+    ''')
+
+    # Tabla ordenes
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ordenes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        numero_orden TEXT UNIQUE NOT NULL,
+        tipo_operacion TEXT NOT NULL CHECK(tipo_operacion IN ('Venta Directa', 'Pedido Web', 'Transferencia')),
+        cliente_id INTEGER,
+        total DECIMAL(10,2) DEFAULT 0,
+        estado TEXT DEFAULT 'pendiente' CHECK(estado IN ('pendiente', 'completada', 'cancelada')),
+        usuario_id INTEGER NOT NULL,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_completada TIMESTAMP,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+        FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+    )
+    ''')
+
+    # Tabla orden_detalles
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS orden_detalles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        orden_id INTEGER NOT NULL,
+        producto_id INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario DECIMAL(10,2),
+        ubicacion_id INTEGER,
+        procesado BOOLEAN DEFAULT 0,
+        FOREIGN KEY (orden_id) REFERENCES ordenes(id) ON DELETE CASCADE,
+        FOREIGN KEY (producto_id) REFERENCES productos(id),
+        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id)
+    )
+    ''')
+
+    # Tabla movimientos (incluye proveedor)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS movimientos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL CHECK(tipo IN ('IN', 'OUT')),
+        producto_id INTEGER NOT NULL,
+        ubicacion_id INTEGER,
+        cantidad INTEGER NOT NULL,
+        cantidad_anterior INTEGER,
+        cantidad_nueva INTEGER,
+        razon TEXT NOT NULL,
+        razon_detalle TEXT,
+        usuario_id INTEGER NOT NULL,
+        proveedor TEXT,
+        referencia TEXT,
+        observaciones TEXT,
+        fecha_movimiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (producto_id) REFERENCES productos(id),
+        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id),
+        FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+    )
+    ''')
+
+    # --- 2. TRIGGERS ESENCIALES ---
+    # Las BD anteriores a las migraciones ya los tienen: se recrean una única vez
+    cursor.execute("DROP TRIGGER IF EXISTS actualizar_stock_after_movimiento")
+    cursor.execute(TRIGGER_ACTUALIZAR_STOCK)
+
+    cursor.execute("DROP TRIGGER IF EXISTS actualizar_ocupacion_ubicacion")
+    cursor.execute(TRIGGER_OCUPACION_UBICACION)
+
+    # --- 3. VISTAS ESENCIALES ---
+
+    # Vista inventario completo (para inventario.py)
+    cursor.execute("DROP VIEW IF EXISTS vista_inventario_completo")
+    cursor.execute('''
+    CREATE VIEW vista_inventario_completo AS
+        SELECT
+            p.id as producto_id,
+            p.sku,
+            p.nombre,
+            p.descripcion,
+            p.categoria,
+            p.precio,
+            p.unidad_medida,
+            p.costo,
+            p.proveedor,
+            p.ubicacion,
+
+            COALESCE(SUM(i.cantidad), 0) as cantidad_total,
+
+            CASE
+                WHEN COALESCE(SUM(i.cantidad), 0) <= p.stock_minimo
+                    AND COALESCE(SUM(i.cantidad), 0) > 0 THEN 'Low Stock'
+                WHEN COALESCE(SUM(i.cantidad), 0) = 0 THEN 'Out of Stock'
+                ELSE 'In Stock'
+            END as estado
+
+        FROM productos p
+        LEFT JOIN inventario i ON p.id = i.producto_id
+        WHERE p.activo = 1
+        GROUP BY p.id, p.sku, p.nombre, p.descripcion, p.categoria,
+            p.precio, p.unidad_medida, p.costo, p.proveedor, p.ubicacion, p.stock_minimo;
+    ''')
+
+    # Vista movimientos detallados (prioriza el proveedor del movimiento)
+    cursor.execute("DROP VIEW IF EXISTS vista_movimientos_detallados")
+    cursor.execute('''
+    CREATE VIEW vista_movimientos_detallados AS
+    SELECT
+        m.fecha_movimiento,
+        p.nombre as producto,
+        p.sku,
+        CASE m.tipo
+            WHEN 'IN' THEN '↑ IN'
+            WHEN 'OUT' THEN '↓ OUT'
+            ELSE m.tipo
+        END as tipo,
+        m.cantidad,
+        m.razon,
+        m.razon_detalle,
+        COALESCE(m.proveedor, p.proveedor) as proveedor,
+        u.usuario,
+        ub.codigo as ubicacion,
+        m.observaciones
+    FROM movimientos m
+    JOIN productos p ON m.producto_id = p.id
+    JOIN usuarios u ON m.usuario_id = u.id
+    LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id
+    ORDER BY m.fecha_movimiento DESC;
+    ''')
+
+    # --- 4. DATOS INICIALES ESENCIALES ---
+
+    # Usuarios por defecto (solo en una BD sin usuarios)
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM usuarios)")
+    if not cursor.fetchone()[0]:
+        cursor.executemany(
+            "INSERT INTO usuarios (usuario, contrasena, rol) VALUES (?, ?, ?)",
+            [
+                ('admin', 'admin123', 'Administrador'),
+                ('almacen', 'almacen123', 'Almacenero'),
+                ('consulta', 'consulta123', 'Consultor')
+            ]
+        )
+
+    # Configuraciones básicas (clave es PRIMARY KEY: OR IGNORE respeta valores existentes)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO configuracion (clave, valor, descripcion) VALUES (?, ?, ?)",
+        [
+            ('empresa_nombre', 'LogiStock Pro', 'Nombre de la empresa'),
+            ('moneda', '$', 'Símbolo de moneda'),
+            ('decimales', '2', 'Decimales para precios'),
+            ('dias_alerta_caducidad', '30', 'Días para alerta de caducidad'),
+            ('porcentaje_stock_minimo', '10', 'Porcentaje para stock mínimo automático'),
+            (PERFIL_CLAVE_CONFIG, PERFIL_PREDETERMINADO, 'Perfil de rendimiento SQLite (durable, balanced, bulk-load)')
+        ]
+    )
+
+    # Ubicaciones de ejemplo (codigo es UNIQUE)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO ubicaciones (codigo, pasillo, estante, nivel, capacidad) VALUES (?, ?, ?, ?, ?)",
+        [
+            ('3-2-5', '3', '2', '5', 10),
+            ('7-7-7', '7', '7', '7', 10),
+            ('asd-asd-asd', 'asd', 'asd', 'asd', 10),
+            ('1-1-1', '1', '1', '1', 10),
+            ('2-2-2', '2', '2', '2', 10)
+        ]
+    )
+
+
+def _v2_indices_consultas(cursor: sqlite3.Cursor) -> None:
+    """
+    Índices para los caminos de acceso de movimientos, inventario, órdenes y productos.
+    El rowid (id) va implícito al final de cada índice, así que ordenar por
+    (fecha_movimiento, id) no necesita una columna extra.
+    """
+    # Historial general y filtros por fecha (ORDER BY fecha_movimiento DESC)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_movimientos_fecha
+    ON movimientos(fecha_movimiento)
+    ''')
+
+    # Historial por producto ordenado por fecha
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_movimientos_producto_fecha
+    ON movimientos(producto_id, fecha_movimiento)
+    ''')
+
+    # Órdenes por estado (pendientes más recientes primero)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_ordenes_estado_fecha
+    ON ordenes(estado, fecha_creacion)
+    ''')
+
+    # Detalles de una orden
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_orden_detalles_orden
+    ON orden_detalles(orden_id)
+    ''')
+
+    # Inventario por ubicación (UNIQUE(producto_id, ubicacion_id) ya cubre producto_id)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_inventario_ubicacion
+    ON inventario(ubicacion_id)
+    ''')
+
+    # Catálogo: solo productos activos, ordenados por nombre
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_productos_activos_nombre
+    ON productos(nombre) WHERE activo = 1
+    ''')
+
+    # Selectores de ubicación: solo activas, ordenadas por código
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_ubicaciones_activas_codigo
+    ON ubicaciones(codigo) WHERE activo = 1
+    ''')
+
+    # La vista deja de imponer su propio ORDER BY: cada consulta ordena con su índice
+    cursor.execute("DROP VIEW IF EXISTS vista_movimientos_detallados")
+    cursor.execute(VISTA_MOVIMIENTOS_DETALLADOS)
+
+
+def _estado_stock_sql(total: str, minimo: str) -> str:
+    """Expresión SQL del estado de stock (misma regla que la vista original)."""
+    return f'''CASE
+            WHEN ({total}) <= ({minimo}) AND ({total}) > 0 THEN 'Low Stock'
+            WHEN ({total}) = 0 THEN 'Out of Stock'
+            ELSE 'In Stock'
+        END'''
+
+
+def _v3_stock_resumen(cursor: sqlite3.Cursor) -> None:
+    """
+    stock_resumen guarda el total y el estado de cada producto, actualizados por
+    triggers en inventario y productos. Reemplaza el GROUP BY de vista_inventario_completo.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_resumen (
+        producto_id INTEGER PRIMARY KEY,
+        cantidad_total INTEGER NOT NULL DEFAULT 0,
+        estado TEXT NOT NULL DEFAULT 'Out of Stock'
+    )
+    ''')
+
+    minimo_nuevo = "SELECT stock_minimo FROM productos WHERE id = NEW.producto_id"
+    minimo_viejo = "SELECT stock_minimo FROM productos WHERE id = OLD.producto_id"
+
+    # --- Triggers sobre productos ---
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_producto_insert
+    AFTER INSERT ON productos
+    FOR EACH ROW
+    BEGIN
+        INSERT OR IGNORE INTO stock_resumen (producto_id, cantidad_total, estado)
+        VALUES (NEW.id, 0, {_estado_stock_sql("0", "NEW.stock_minimo")});
+    END;
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_producto_minimo
+    AFTER UPDATE OF stock_minimo ON productos
+    FOR EACH ROW
+    BEGIN
+        UPDATE stock_resumen
+        SET estado = {_estado_stock_sql("cantidad_total", "NEW.stock_minimo")}
+        WHERE producto_id = NEW.id;
+    END;
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_producto_delete
+    AFTER DELETE ON productos
+    FOR EACH ROW
+    BEGIN
+        DELETE FROM stock_resumen WHERE producto_id = OLD.id;
+    END;
+    ''')
+
+    # --- Triggers sobre inventario (suman/restan la diferencia) ---
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_inventario_insert
+    AFTER INSERT ON inventario
+    FOR EACH ROW
+    BEGIN
+        UPDATE stock_resumen
+        SET cantidad_total = cantidad_total + NEW.cantidad,
+            estado = {_estado_stock_sql("cantidad_total + NEW.cantidad", minimo_nuevo)}
+        WHERE producto_id = NEW.producto_id;
+    END;
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_inventario_update
+    AFTER UPDATE OF cantidad, producto_id ON inventario
+    FOR EACH ROW
+    BEGIN
+        UPDATE stock_resumen
+        SET cantidad_total = cantidad_total - OLD.cantidad,
+            estado = {_estado_stock_sql("cantidad_total - OLD.cantidad", minimo_viejo)}
+        WHERE producto_id = OLD.producto_id;
+
+        UPDATE stock_resumen
+        SET cantidad_total = cantidad_total + NEW.cantidad,
+            estado = {_estado_stock_sql("cantidad_total + NEW.cantidad", minimo_nuevo)}
+        WHERE producto_id = NEW.producto_id;
+    END;
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_inventario_delete
+    AFTER DELETE ON inventario
+    FOR EACH ROW
+    BEGIN
+        UPDATE stock_resumen
+        SET cantidad_total = cantidad_total - OLD.cantidad,
+            estado = {_estado_stock_sql("cantidad_total - OLD.cantidad", minimo_viejo)}
+        WHERE producto_id = OLD.producto_id;
+    END;
+    ''')
+
+    # Carga inicial desde el inventario existente
+    cursor.execute(f'''
+    INSERT OR REPLACE INTO stock_resumen (producto_id, cantidad_total, estado)
+    SELECT
+        p.id,
+        COALESCE(SUM(i.cantidad), 0),
+        {_estado_stock_sql("COALESCE(SUM(i.cantidad), 0)", "p.stock_minimo")}
+    FROM productos p
+    LEFT JOIN inventario i ON p.id = i.producto_id
+    GROUP BY p.id
+    ''')
+
+    # La vista lee el resumen: sin GROUP BY, un recorrido por índice + búsqueda por clave
+    cursor.execute("DROP VIEW IF EXISTS vista_inventario_completo")
+    cursor.execute('''
+    CREATE VIEW vista_inventario_completo AS
+        SELECT
+            p.id as producto_id,
+            p.sku,
+            p.nombre,
+            p.descripcion,
+            p.categoria,
+            p.precio,
+            p.unidad_medida,
+            p.costo,
+            p.proveedor,
+            p.ubicacion,
+            s.cantidad_total,
+            s.estado
+        FROM productos p
+        JOIN stock_resumen s ON s.producto_id = p.id
+        WHERE p.activo = 1;
+    ''')
+
+
+# Columnas de productos indexadas para búsqueda de texto (en este orden)
+COLUMNAS_FTS_PRODUCTOS: Tuple[str, ...] = ("nombre", "sku", "categoria", "proveedor", "descripcion")
+
+def _v4_productos_fts(cursor: sqlite3.Cursor) -> None:
+    """
+    Índice FTS5 'productos_fts' sobre los productos activos (contenido externo,
+    sin duplicar el texto), mantenido por triggers. Solo indexa filas con
+    activo = 1, por eso no debe usarse el comando 'rebuild' (reindexaría todo).
+    Si el SQLite instalado no trae FTS5 la migración no crea nada y la búsqueda usa LIKE.
+    """
+    columnas = ", ".join(COLUMNAS_FTS_PRODUCTOS)
+    nuevas = ", ".join(f"NEW.{c}" for c in COLUMNAS_FTS_PRODUCTOS)
+    viejas = ", ".join(f"OLD.{c}" for c in COLUMNAS_FTS_PRODUCTOS)
+
+    try:
+        cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            {columnas},
+            content='productos',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e).lower():
+            raise
+        print("  ⚠ SQLite sin FTS5: la búsqueda de productos usará LIKE")
+        return
+
+    # Relevancia: nombre y SKU pesan más que categoría, proveedor y descripción
+    cursor.execute(
+        "INSERT INTO productos_fts (productos_fts, rank) VALUES ('rank', 'bm25(10.0, 10.0, 3.0, 2.0, 1.0)')"
+    )
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS productos_fts_insert
+    AFTER INSERT ON productos
+    FOR EACH ROW WHEN NEW.activo = 1
+    BEGIN
+        INSERT INTO productos_fts (rowid, {columnas}) VALUES (NEW.id, {nuevas});
+    END;
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS productos_fts_delete
+    AFTER DELETE ON productos
+    FOR EACH ROW WHEN OLD.activo = 1
+    BEGIN
+        INSERT INTO productos_fts (productos_fts, rowid, {columnas}) VALUES ('delete', OLD.id, {viejas});
+    END;
+    ''')
+
+    # Cambios de texto o de activo: se retira la versión anterior y se indexa la nueva
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS productos_fts_update
+    AFTER UPDATE OF {columnas}, activo ON productos
+    FOR EACH ROW
+    BEGIN
+        INSERT INTO productos_fts (productos_fts, rowid, {columnas})
+        SELECT 'delete', OLD.id, {viejas} WHERE OLD.activo = 1;
+        INSERT INTO productos_fts (rowid, {columnas})
+        SELECT NEW.id, {nuevas} WHERE NEW.activo = 1;
+    END;
+    ''')
+
+    # Indexar el catálogo activo existente
+    cursor.execute(f"INSERT INTO productos_fts (rowid, {columnas}) SELECT id, {columnas} FROM productos WHERE activo = 1")
+
+
+def _v5_reservas(cursor: sqlite3.Cursor) -> None:
+    """
+    Reservas de las órdenes pendientes: un registro por detalle de orden y un
+    total 'reservado' por producto/ubicación (inventario) y por producto
+    (stock_resumen), mantenidos por triggers. Lo disponible para prometer es
+    cantidad - reservado, una lectura por clave en cualquiera de las dos tablas.
+    Al completar o cancelar la orden sus reservas se cierran solas.
+    """
+    cursor.execute("ALTER TABLE inventario ADD COLUMN reservado INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE stock_resumen ADD COLUMN reservado_total INTEGER NOT NULL DEFAULT 0")
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reservas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        orden_id INTEGER NOT NULL,
+        orden_detalle_id INTEGER NOT NULL UNIQUE,
+        producto_id INTEGER NOT NULL,
+        ubicacion_id INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL CHECK(cantidad > 0),
+        estado TEXT NOT NULL DEFAULT 'activa' CHECK(estado IN ('activa', 'consumida', 'liberada')),
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_cierre TIMESTAMP,
+        FOREIGN KEY (orden_id) REFERENCES ordenes(id) ON DELETE CASCADE,
+        FOREIGN KEY (orden_detalle_id) REFERENCES orden_detalles(id) ON DELETE CASCADE,
+        FOREIGN KEY (producto_id) REFERENCES productos(id),
+        FOREIGN KEY (ubicacion_id) REFERENCES ubicaciones(id)
+    )
+    ''')
+    # Cierre de las reservas de una orden (trigger de ordenes)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reservas_orden_activas
+    ON reservas(orden_id) WHERE estado = 'activa'
+    ''')
+
+    # --- Reservas -> inventario.reservado ---
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS reservas_insert
+    AFTER INSERT ON reservas
+    FOR EACH ROW WHEN NEW.estado = 'activa'
+    BEGIN
+        UPDATE inventario
+        SET reservado = reservado + NEW.cantidad
+        WHERE producto_id = NEW.producto_id AND ubicacion_id = NEW.ubicacion_id;
+    END;
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS reservas_cierre
+    AFTER UPDATE OF estado ON reservas
+    FOR EACH ROW WHEN OLD.estado = 'activa' AND NEW.estado <> 'activa'
+    BEGIN
+        UPDATE inventario
+        SET reservado = reservado - OLD.cantidad
+        WHERE producto_id = OLD.producto_id AND ubicacion_id = OLD.ubicacion_id;
+    END;
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS reservas_delete
+    AFTER DELETE ON reservas
+    FOR EACH ROW WHEN OLD.estado = 'activa'
+    BEGIN
+        UPDATE inventario
+        SET reservado = reservado - OLD.cantidad
+        WHERE producto_id = OLD.producto_id AND ubicacion_id = OLD.ubicacion_id;
+    END;
+    ''')
+
+    # --- Lo reservado nunca supera el stock (disponible para prometer >= 0) ---
+    # Cubre cualquier salida (ajustes, mermas, transferencias) y reservas que no
+    # pasen por la validación de queries.py.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS inventario_reservado_cubierto
+    BEFORE UPDATE OF cantidad, reservado ON inventario
+    FOR EACH ROW WHEN NEW.cantidad < NEW.reservado
+    BEGIN
+        SELECT RAISE(ABORT, 'Stock reservado: la cantidad no puede quedar por debajo de lo reservado');
+    END;
+    ''')
+
+    # --- Completar o cancelar una orden pendiente cierra sus reservas ---
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS ordenes_cierre_reservas
+    AFTER UPDATE OF estado ON ordenes
+    FOR EACH ROW WHEN OLD.estado = 'pendiente' AND NEW.estado IN ('completada', 'cancelada')
+    BEGIN
+        UPDATE reservas
+        SET estado = CASE NEW.estado WHEN 'completada' THEN 'consumida' ELSE 'liberada' END,
+            fecha_cierre = CURRENT_TIMESTAMP
+        WHERE orden_id = NEW.id AND estado = 'activa';
+    END;
+    ''')
+
+    # --- inventario.reservado -> stock_resumen.reservado_total ---
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_inventario_reservado
+    AFTER UPDATE OF reservado ON inventario
+    FOR EACH ROW
+    BEGIN
+        UPDATE stock_resumen
+        SET reservado_total = reservado_total + NEW.reservado - OLD.reservado
+        WHERE producto_id = NEW.producto_id;
+    END;
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS stock_resumen_inventario_delete_reservado
+    AFTER DELETE ON inventario
+    FOR EACH ROW WHEN OLD.reservado <> 0
+    BEGIN
+        UPDATE stock_resumen
+        SET reservado_total = reservado_total - OLD.reservado
+        WHERE producto_id = OLD.producto_id;
+    END;
+    ''')
+
+    # La vista agrega lo disponible para prometer
+    cursor.execute("DROP VIEW IF EXISTS vista_inventario_completo")
+    cursor.execute('''
+    CREATE VIEW vista_inventario_completo AS
+        SELECT
+            p.id as producto_id,
+            p.sku,
+            p.nombre,
+            p.descripcion,
+            p.categoria,
+            p.precio,
+            p.unidad_medida,
+            p.costo,
+            p.proveedor,
+            p.ubicacion,
+            s.cantidad_total,
+            s.estado,
+            s.cantidad_total - s.reservado_total as disponible
+        FROM productos p
+        JOIN stock_resumen s ON s.producto_id = p.id
+        WHERE p.activo = 1;
+    ''')
+
+
+def _v6_asignacion_ubicaciones(cursor: sqlite3.Cursor) -> None:
+    """
+    Datos para repartir una salida entre ubicaciones (ver database/asignacion.py):
+    la fecha en que cada ubicación se llenó desde cero (para FIFO) y un índice
+    parcial que cubre la lectura de existencias de un producto sin pasar por
+    las filas vacías que quedan de ubicaciones ya agotadas.
+    """
+    cursor.execute("ALTER TABLE inventario ADD COLUMN fecha_recepcion TIMESTAMP")
+
+    # Stock actual: la primera entrada después de la última vez que la ubicación quedó en cero
+    cursor.execute('''
+    UPDATE inventario
+    SET fecha_recepcion = (
+        SELECT MIN(m.fecha_movimiento)
+        FROM movimientos m
+        WHERE m.producto_id = inventario.producto_id
+        AND m.ubicacion_id = inventario.ubicacion_id
+        AND m.tipo = 'IN'
+        AND m.fecha_movimiento >= COALESCE((
+            SELECT MAX(z.fecha_movimiento)
+            FROM movimientos z
+            WHERE z.producto_id = inventario.producto_id
+            AND z.ubicacion_id = inventario.ubicacion_id
+            AND z.cantidad_nueva = 0
+        ), '')
+    )
+    WHERE cantidad > 0
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS inventario_fecha_recepcion_insert
+    AFTER INSERT ON inventario
+    FOR EACH ROW WHEN NEW.cantidad > 0
+    BEGIN
+        UPDATE inventario SET fecha_recepcion = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    END;
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS inventario_fecha_recepcion
+    AFTER UPDATE OF cantidad ON inventario
+    FOR EACH ROW WHEN OLD.cantidad <= 0 AND NEW.cantidad > 0
+    BEGIN
+        UPDATE inventario SET fecha_recepcion = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    END;
+    ''')
+
+    # Existencias de un producto (UNIQUE(producto_id, ubicacion_id) las encuentra,
+    # pero este índice además evita leer la tabla y las ubicaciones vacías)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_inventario_producto_existencias
+    ON inventario(producto_id, cantidad, reservado, fecha_recepcion, ubicacion_id)
+    WHERE cantidad > 0
+    ''')
+
+    cursor.execute('''
+    INSERT OR IGNORE INTO configuracion (clave, valor, descripcion) VALUES
+        ('estrategia_asignacion', 'menos_ubicaciones',
+         'Salidas sin ubicación: menos_ubicaciones, fifo o cercania_despacho'),
+        ('ubicacion_despacho', '', 'Código de la ubicación de despacho (para cercania_despacho)')
+    ''')
+
+
+# Registro ordenado de migraciones: (versión, descripción, función)
+MIGRACIONES: List[Migracion] = [
+    (1, "Esquema base: tablas, triggers, vistas y datos iniciales", _v1_esquema_base),
+    (2, "Índices para movimientos, inventario, órdenes y productos", _v2_indices_consultas),
+    (3, "Tabla stock_resumen mantenida por triggers", _v3_stock_resumen),
+    (4, "Índice de texto completo productos_fts", _v4_productos_fts),
+    (5, "Reservas de órdenes pendientes y stock disponible para prometer", _v5_reservas),
+    (6, "Fecha de recepción por ubicación e índice para la asignación de salidas", _v6_asignacion_ubicaciones),
+]
+
+VERSION_ESQUEMA: int = MIGRACIONES[-1][0]
+
+# ============================================
+# EJECUCIÓN
+# ============================================
+
+def obtener_version(conn: sqlite3.Connection) -> int:
+    """Retorna la versión de esquema guardada en PRAGMA user_version."""
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+def aplicar_migraciones(conn: sqlite3.Connection) -> List[int]:
+    """
+    Aplica, en orden y una sola vez, las migraciones con versión mayor a la actual.
+    Cada migración corre en su propia transacción junto con el cambio de versión.
+    Retorna la lista de versiones aplicadas (vacía si el esquema ya estaba al día).
+    """
+    if obtener_version(conn) >= VERSION_ESQUEMA:
+        return []
+
+    aplicadas: List[int] = []
+    for numero, descripcion, migracion in MIGRACIONES:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Releer dentro del bloqueo: otra instancia pudo migrar mientras tanto
+            if obtener_version(conn) >= numero:
+                conn.rollback()
+                continue
+            migracion(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {int(numero)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(numero)
+        print(f"  ↳ Migración {numero} aplicada: {descripcion}")
+    return aplicadas
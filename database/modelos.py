@@ -0,0 +1,186 @@
+# database/modelos.py - Filas tipadas de las consultas
+"""
+Modelos de fila para los resultados de queries.py.
+
+Cada modelo es un NamedTuple: sin __dict__ por instancia (ocupa lo mismo
+que una tupla), acceso por nombre (p.stock en vez de p[4]) y sigue siendo
+una tupla, así que el código que desempaqueta o indexa filas no cambia.
+
+Las filas se construyen directamente desde SQLite con una row_factory,
+sin pasar por una tupla intermedia ni por un diccionario:
+
+    cursor.row_factory = fabrica(Producto)
+    for p in cursor:          # perezoso: una fila por iteración
+        print(p.nombre, p.stock)
+
+El orden de los campos debe coincidir con el de las columnas del SELECT.
+"""
+import sqlite3
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Tuple, Type, TypeVar
+
+M = TypeVar("M", bound=Tuple[Any, ...])
+
+
+class Producto(NamedTuple):
+    """Fila de get_all_products(), buscar_productos() y del catálogo en memoria."""
+    id: int
+    nombre: str
+    sku: str
+    categoria: Optional[str]
+    stock: int
+    unidad_medida: Optional[str]
+    ubicacion: Optional[str]
+    precio: float
+    proveedor: Optional[str]
+    estado: str
+    disponible: int  # stock menos lo reservado por órdenes pendientes
+
+
+class ProductoDetalle(NamedTuple):
+    """Ficha completa de un producto (buscar_producto_por_sku)."""
+    id: int
+    sku: str
+    nombre: str
+    descripcion: Optional[str]
+    categoria: Optional[str]
+    precio: float
+    costo: float
+    proveedor: Optional[str]
+    unidad_medida: Optional[str]
+    stock_minimo: Optional[int]
+    ubicacion: Optional[str]
+    stock_actual: int
+    disponible: int
+
+
+class ProductoBajoStock(NamedTuple):
+    """Fila del reporte obtener_productos_bajo_stock()."""
+    nombre: str
+    sku: str
+    categoria: Optional[str]
+    stock_minimo: Optional[int]
+    stock_actual: int
+    ubicacion: Optional[str]
+    estado: str
+
+
+class StockUbicacion(NamedTuple):
+    """Stock de un producto en una ubicación (get_stock_detallado)."""
+    ubicacion: str
+    cantidad: int
+    pasillo: Optional[str]
+    estante: Optional[str]
+    nivel: Optional[str]
+
+
+class ProblemaInventario(NamedTuple):
+    """Inconsistencia detectada por verificar_inventario()."""
+    producto: str
+    sku: str
+    ubicacion_producto: Optional[str]
+    ubicacion_inventario: Optional[str]
+    cantidad: Optional[int]
+    estado: str
+
+
+class DiferenciaStock(NamedTuple):
+    """Par producto/ubicación cuyo stock no coincide con la suma de sus movimientos."""
+    producto_id: int
+    sku: str
+    nombre: str
+    ubicacion: Optional[str]
+    stock_registrado: int
+    stock_calculado: int
+
+    @property
+    def diferencia(self) -> int:
+        return self.stock_registrado - self.stock_calculado
+
+
+class Movimiento(NamedTuple):
+    """Fila del historial general de movimientos (tipo ya formateado: '↑ IN' / '↓ OUT')."""
+    fecha_movimiento: str
+    producto: str
+    tipo: str
+    cantidad: int
+    razon: Optional[str]
+    proveedor: Optional[str]
+    ubicacion: Optional[str]
+    observaciones: Optional[str]
+    sku: str
+    id: int
+
+
+class MovimientoProducto(NamedTuple):
+    """Fila del historial de un producto (get_movimientos_por_producto)."""
+    fecha: str
+    tipo: str
+    cantidad: int
+    cantidad_anterior: Optional[int]
+    cantidad_nueva: Optional[int]
+    razon: Optional[str]
+    razon_detalle: Optional[str]
+    usuario: str
+    ubicacion: Optional[str]
+    observaciones: Optional[str]
+
+
+class ResumenMovimiento(NamedTuple):
+    """Fila del reporte obtener_resumen_movimientos()."""
+    nombre: str
+    sku: str
+    entradas: int
+    salidas: int
+    neto: int
+    movimientos: int
+
+
+class Ubicacion(NamedTuple):
+    """Fila de obtener_ubicaciones_disponibles() (ocupado es 0/1, como en la BD)."""
+    id: int
+    codigo: str
+    pasillo: Optional[str]
+    estante: Optional[str]
+    nivel: Optional[str]
+    capacidad: Optional[int]
+    ocupado: int
+
+
+class Orden(NamedTuple):
+    """Fila de obtener_ordenes_pendientes()."""
+    id: int
+    numero_orden: str
+    tipo_operacion: str
+    cliente: Optional[str]
+    total: float
+    estado: str
+    usuario: str
+    fecha_creacion: str
+
+
+class Usuario(NamedTuple):
+    """Fila de obtener_usuarios() (activo es 0/1, como en la BD)."""
+    id: int
+    usuario: str
+    rol: str
+    activo: int
+    fecha_creacion: Optional[str]
+
+
+def fabrica(modelo: Type[M]) -> Callable[[sqlite3.Cursor, Tuple[Any, ...]], M]:
+    """
+    row_factory de sqlite3 que construye 'modelo' con cada fila.
+    Llama directamente a tuple.__new__ (lo mismo que hace _make, sin la
+    verificación de largo): el SELECT debe traer exactamente los campos del modelo.
+    """
+    nueva = tuple.__new__
+    return lambda _cursor, fila: nueva(modelo, fila)
+
+
+def filas_como(cursor: sqlite3.Cursor, modelo: Type[M]) -> Iterator[M]:
+    """
+    Recorre un cursor ya ejecutado entregando instancias de 'modelo' de a una,
+    sin materializar la lista completa.
+    """
+    cursor.row_factory = fabrica(modelo)
+    return iter(cursor)
@@ -1,8 +1,20 @@
 # queries.py - VERSIÓN LIMPIA Y ACTUALIZADA
+import re
 import sqlite3
+import threading
 import uuid
-from typing import List, Tuple, Any, Optional, Union, Iterable, Dict
-from .connection import get_connection
+from datetime import date, timedelta
+from itertools import islice
+from typing import List, Tuple, Any, Optional, Union, Iterable, Iterator, Dict, Mapping, Type
+from .asignacion import ESTRATEGIA_PREDETERMINADA, ESTRATEGIAS, Despacho, Existencia, asignar
+from .connection import managed_connection, managed_transaction, get_manager
+from .migrations import TRIGGER_ACTUALIZAR_STOCK
+from .modelos import (
+    DiferenciaStock, Movimiento, MovimientoProducto, Orden, ProblemaInventario, Producto,
+    ProductoBajoStock, ProductoDetalle, ResumenMovimiento, StockUbicacion,
+    Ubicacion, Usuario, fabrica
+)
+from .referencias import get_cache_referencias
 
 # Tipo personalizado para los resultados de la DB
 QueryResult = Union[List[Tuple[Any, ...]], int, None]
@@ -11,28 +23,165 @@ def execute_query(
     query: str, 
     params: Iterable[Any] = (), 
     fetch: bool = False,
-    fetchone: bool = False
+    fetchone: bool = False,
+    modelo: Optional[Type[Tuple[Any, ...]]] = None
 ) -> QueryResult:
     """
     Ejecuta una consulta SQL con opciones de fetch.
+    Reutiliza la conexión administrada del hilo actual (ver ConnectionManager).
+    Con 'modelo' (ver database/modelos.py) cada fila se construye como ese tipo.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute(query, params)
-        if fetchone:
-            result = cursor.fetchone()
-            return result if result else None
-        elif fetch:
-            result = cursor.fetchall()
-            return result
-        conn.commit()
-        return int(cursor.lastrowid) if cursor.lastrowid is not None else 0
+        with managed_connection() as conn:
+            cursor = conn.cursor()
+            if modelo is not None:
+                cursor.row_factory = fabrica(modelo)
+            cursor.execute(query, params)
+            if fetchone:
+                result = cursor.fetchone()
+                return result if result else None
+            elif fetch:
+                result = cursor.fetchall()
+                return result
+            # Dentro de managed_transaction() el commit lo hace la transacción externa
+            if not get_manager().in_transaction():
+                conn.commit()
+            return int(cursor.lastrowid) if cursor.lastrowid is not None else 0
     except sqlite3.Error as e:
         print(f"Error DB: {e}")
         return None
-    finally:
-        conn.close()
+
+# Filas que trae cada fetchmany() de iter_query
+TAMANO_LOTE_STREAMING: int = 1000
+
+class IteradorConsulta:
+    """
+    Recorre el resultado de una consulta por lotes (fetchmany) sin cargarlo completo.
+    
+    La consulta se ejecuta al pedir la primera fila. Mantiene una conexión
+    prestada del pool (ver ConnectionManager.prestar) mientras quedan filas; la devuelve al agotarse el resultado, con close()
+    o con cancel(). cancel() puede llamarse desde otro hilo: interrumpe la
+    lectura en curso con sqlite3_interrupt.
+    
+    Un error de BD termina el recorrido (como execute_query, se imprime) y
+    queda en 'error', para distinguir un resultado completo de uno cortado.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        params: Iterable[Any] = (),
+        tamano_lote: int = TAMANO_LOTE_STREAMING,
+        modelo: Optional[Type[Tuple[Any, ...]]] = None
+    ) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._lote: Iterator[Any] = iter(())
+        self._leyendo: bool = False
+        self._pendiente: Optional[Tuple[str, Iterable[Any]]] = (query, params)
+        self.cancelada: bool = False
+        self.error: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = get_manager().prestar()
+        self._cursor: Optional[sqlite3.Cursor] = self._conn.cursor()
+        self._cursor.arraysize = tamano_lote
+        if modelo is not None:
+            self._cursor.row_factory = fabrica(modelo)
+
+    def __iter__(self) -> "IteradorConsulta":
+        return self
+
+    def __next__(self) -> Any:
+        for fila in self._lote:
+            return fila
+        
+        with self._lock:
+            if self._cursor is None:
+                raise StopIteration
+            self._leyendo = True
+            cursor = self._cursor
+        
+        error = False
+        try:
+            if self._pendiente is not None:
+                query, params = self._pendiente
+                self._pendiente = None
+                cursor.execute(query, params)
+            filas = cursor.fetchmany()
+        except sqlite3.Error as e:
+            # Una cancelación desde otro hilo llega como "interrupted"
+            if not self.cancelada:
+                print(f"Error DB: {e}")
+                self.error = str(e)
+            filas, error = [], True
+        
+        with self._lock:
+            self._leyendo = False
+            if self.cancelada or not filas:
+                self._liberar(error)
+                raise StopIteration
+        self._lote = iter(filas)
+        return next(self._lote)
+
+    def close(self) -> None:
+        """Termina el recorrido y devuelve la conexión (idempotente)."""
+        with self._lock:
+            self._lote = iter(())
+            if not self._leyendo:
+                self._liberar()
+            else:
+                # Otro hilo está en fetchmany: libera él al volver
+                self.cancelada = True
+
+    def cancel(self) -> None:
+        """Cancela el recorrido; si hay una lectura en curso la interrumpe."""
+        with self._lock:
+            self.cancelada = True
+            self._lote = iter(())
+            if self._leyendo and self._conn is not None:
+                self._conn.interrupt()
+            elif not self._leyendo:
+                self._liberar()
+
+    def __enter__(self) -> "IteradorConsulta":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # Red de seguridad para recorridos abandonados a medias
+        if getattr(self, '_conn', None) is not None and not self._leyendo:
+            self._liberar()
+
+    def _liberar(self, error: bool = False) -> None:
+        """Cierra el cursor y devuelve la conexión al pool."""
+        conn, self._conn = self._conn, None
+        cursor, self._cursor = self._cursor, None
+        if conn is None:
+            return
+        try:
+            if cursor is not None:
+                cursor.close()
+        except sqlite3.Error:
+            error = True
+        get_manager().devolver(conn, error)
+
+def iter_query(
+    query: str,
+    params: Iterable[Any] = (),
+    tamano_lote: int = TAMANO_LOTE_STREAMING,
+    modelo: Optional[Type[Tuple[Any, ...]]] = None
+) -> IteradorConsulta:
+    """
+    Versión en streaming de execute_query(fetch=True): entrega las filas de a
+    una, leyendo 'tamano_lote' por vez, así que la memoria no depende del
+    tamaño del resultado. Solo para lecturas.
+    
+    Uso:
+        with iter_query(sql, params, modelo=Movimiento) as filas:
+            for mov in filas:
+                ...
+    """
+    return IteradorConsulta(query, params, tamano_lote, modelo)
 
 # ============================================
 # --- FUNCIONES DE AUTENTICACIÓN ---
@@ -58,10 +207,11 @@ def get_user_by_credentials(username: str, password: str) -> Optional[Tuple[int,
 # --- FUNCIONES DE PRODUCTOS ---
 # ============================================
 
-def get_all_products() -> List[Tuple[Any, ...]]:
+def get_all_products() -> List[Producto]:
     """
     Obtiene todos los productos con su stock TOTAL y ubicación.
-    Usa la vista 'vista_inventario_completo' para obtener datos consolidados.
+    Usa la vista 'vista_inventario_completo', que lee los totales ya calculados
+    de 'stock_resumen' (sin GROUP BY sobre inventario).
     """
     sql = """
     SELECT 
@@ -72,13 +222,14 @@ def get_all_products() -> List[Tuple[Any, ...]]:
         cantidad_total as total_stock,
         unidad_medida,
         ubicacion as location,
-        precio,
+        COALESCE(precio, 0) as precio,
         proveedor,
-        estado
+        estado,
+        disponible
     FROM vista_inventario_completo
     ORDER BY nombre ASC
     """
-    result = execute_query(sql, fetch=True)
+    result = execute_query(sql, fetch=True, modelo=Producto)
     return result if isinstance(result, list) else []
 
 def get_products_simple() -> List[Tuple[int, str]]:
@@ -92,6 +243,19 @@ def get_products_simple() -> List[Tuple[int, str]]:
         return result  # type: ignore
     return []
 
+def obtener_descripciones_productos() -> Dict[int, str]:
+    """
+    Descripciones no vacías de los productos activos: {producto_id: descripcion}.
+    get_all_products() no las trae; el catálogo en memoria las usa para buscar
+    en las mismas columnas que el índice FTS5.
+    """
+    sql = """
+    SELECT id, descripcion FROM productos
+    WHERE activo = 1 AND descripcion IS NOT NULL AND descripcion <> ''
+    """
+    result = execute_query(sql, fetch=True)
+    return dict(result) if isinstance(result, list) else {}
+
 def insert_product(data: Tuple[Any, ...]) -> Optional[int]:
     """
     Inserta un nuevo producto.
@@ -112,10 +276,10 @@ def insert_product(data: Tuple[Any, ...]) -> Optional[int]:
     result = execute_query(sql, params)
     return result if isinstance(result, int) else None
 
-def buscar_producto_por_sku(sku: str) -> Optional[Dict[str, Any]]:
+def buscar_producto_por_sku(sku: str) -> Optional[ProductoDetalle]:
     """
     Busca un producto por su SKU.
-    Retorna un diccionario con los datos del producto o None.
+    Retorna la ficha del producto (ProductoDetalle) o None.
     """
     sql = """
     SELECT 
@@ -124,73 +288,122 @@ def buscar_producto_por_sku(sku: str) -> Optional[Dict[str, Any]]:
         p.nombre,
         p.descripcion,
         p.categoria,
-        p.precio,
-        p.costo,
+        COALESCE(p.precio, 0),
+        COALESCE(p.costo, 0),
         p.proveedor,
         p.unidad_medida,
         p.stock_minimo,
         p.ubicacion,
-        COALESCE(i.cantidad, 0) as stock_actual
+        COALESCE(s.cantidad_total, 0) as stock_actual,
+        COALESCE(s.cantidad_total - s.reservado_total, 0) as disponible
     FROM productos p
-    LEFT JOIN inventario i ON p.id = i.producto_id
+    LEFT JOIN stock_resumen s ON s.producto_id = p.id
     WHERE p.sku = ? AND p.activo = 1
     LIMIT 1
     """
-    result = execute_query(sql, (sku,), fetchone=True)
+    result = execute_query(sql, (sku,), fetchone=True, modelo=ProductoDetalle)
+    return result if isinstance(result, ProductoDetalle) else None
+
+# Columnas de búsqueda: mismas que get_all_products()
+_COLUMNAS_BUSQUEDA: str = """
+    v.producto_id as id,
+    v.nombre as name,
+    v.sku as barcode,
+    v.categoria as category,
+    v.cantidad_total as total_stock,
+    v.unidad_medida,
+    v.ubicacion as location,
+    COALESCE(v.precio, 0) as precio,
+    v.proveedor,
+    v.estado,
+    v.disponible
+"""
+
+def _consulta_fts(texto: str) -> str:
+    """
+    Convierte el texto del usuario en una consulta FTS5 de prefijos:
+    'sku-00 lap' -> '"sku"* "00"* "lap"*' (todos los términos deben aparecer).
+    """
+    return " ".join(f'"{termino}"*' for termino in re.findall(r"\w+", texto))
+
+def buscar_productos(texto: str, limite: int = 100) -> List[Producto]:
+    """
+    Busca productos activos por nombre, SKU, categoría, proveedor o descripción.
+    Usa el índice FTS5 'productos_fts' (prefijos, ordenado por relevancia bm25);
+    si la BD no lo tiene, recurre a LIKE.
+    Retorna filas Producto, igual que get_all_products().
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
     
-    if result:
-        return {
-            'id': result[0],
-            'sku': result[1],
-            'nombre': result[2],
-            'descripcion': result[3],
-            'categoria': result[4],
-            'precio': float(result[5]) if result[5] else 0,
-            'costo': float(result[6]) if result[6] else 0,
-            'proveedor': result[7],
-            'unidad_medida': result[8],
-            'stock_minimo': result[9],
-            'ubicacion': result[10],
-            'stock_actual': result[11]
-        }
-    return None
+    # productos_fts solo contiene productos activos: el LIMIT se aplica antes del JOIN.
+    # 'rank' usa los pesos bm25 configurados en la migración 4.
+    sql_fts = f"""
+    SELECT {_COLUMNAS_BUSQUEDA}
+    FROM (
+        SELECT rowid, rank FROM productos_fts
+        WHERE productos_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    ) f
+    JOIN vista_inventario_completo v ON v.producto_id = f.rowid
+    ORDER BY f.rank
+    """
+    try:
+        with managed_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = fabrica(Producto)
+            return cursor.execute(sql_fts, (consulta, limite)).fetchall()
+    except sqlite3.OperationalError as e:
+        if "productos_fts" not in str(e):
+            print(f"Error DB: {e}")
+            return []
+    
+    # Respaldo sin FTS5
+    patron = f"%{texto.strip()}%"
+    sql_like = f"""
+    SELECT {_COLUMNAS_BUSQUEDA}
+    FROM vista_inventario_completo v
+    WHERE v.nombre LIKE ? OR v.sku LIKE ? OR v.categoria LIKE ? OR v.proveedor LIKE ?
+    ORDER BY v.nombre
+    LIMIT ?
+    """
+    result = execute_query(sql_like, (patron, patron, patron, patron, limite), fetch=True, modelo=Producto)
+    return result if isinstance(result, list) else []
 
-def buscar_producto_por_nombre(nombre: str) -> List[Dict[str, Any]]:
+def buscar_ids_productos(texto: str, limite: Optional[int] = None) -> Optional[List[int]]:
     """
-    Busca productos por nombre (búsqueda parcial).
+    IDs de los productos activos que coinciden con el texto en el índice FTS5
+    (mismo criterio que buscar_productos), de más a menos relevante.
+    Sirve para proyectar las filas desde el catálogo en memoria sin releerlas.
+    Retorna None si la BD no tiene productos_fts (el llamador decide el respaldo).
     """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
+
     sql = """
-    SELECT 
-        p.id,
-        p.sku,
-        p.nombre,
-        p.categoria,
-        p.precio,
-        p.proveedor,
-        p.ubicacion,
-        COALESCE(i.cantidad, 0) as stock_actual
-    FROM productos p
-    LEFT JOIN inventario i ON p.id = i.producto_id
-    WHERE p.nombre LIKE ? AND p.activo = 1
-    ORDER BY p.nombre
-    LIMIT 20
+    SELECT rowid FROM productos_fts
+    WHERE productos_fts MATCH ?
+    ORDER BY rank
+    LIMIT ?
     """
-    result = execute_query(sql, (f'%{nombre}%',), fetch=True)
-    
-    productos = []
-    if isinstance(result, list):
-        for row in result:
-            productos.append({
-                'id': row[0],
-                'sku': row[1],
-                'nombre': row[2],
-                'categoria': row[3],
-                'precio': float(row[4]) if row[4] else 0,
-                'proveedor': row[5],
-                'ubicacion': row[6],
-                'stock_actual': row[7]
-            })
-    return productos
+    try:
+        with managed_connection() as conn:
+            # LIMIT -1: sin límite
+            return [fila[0] for fila in conn.execute(sql, (consulta, -1 if limite is None else limite))]
+    except sqlite3.OperationalError as e:
+        if "productos_fts" not in str(e):
+            print(f"Error DB: {e}")
+            return []
+    return None
+
+def buscar_producto_por_nombre(nombre: str) -> List[Producto]:
+    """
+    Busca productos por nombre (búsqueda parcial por prefijos, ver buscar_productos).
+    """
+    return buscar_productos(nombre, limite=20)
 
 def actualizar_producto(producto_id: int, datos: dict[str, Any]) -> bool:
     """
@@ -281,45 +494,232 @@ def ajustar_stock(
     """
     Realiza un ajuste de stock registrando un movimiento.
     El trigger 'actualizar_stock_after_movimiento' actualizará automáticamente el inventario.
+    Lectura, validación y escritura ocurren en una sola transacción BEGIN IMMEDIATE,
+    por lo que dos terminales no pueden descontar el mismo stock a la vez.
     """
     try:
-        # Obtener stock actual antes del ajuste
-        stock_actual = get_product_stock(producto_id, ubicacion_id)
-        
-        # Calcular nueva cantidad
-        if tipo == 'IN':
-            cantidad_nueva = stock_actual + cantidad
-        else:  # 'OUT'
-            cantidad_nueva = stock_actual - cantidad
-            if cantidad_nueva < 0:
-                return False  # No hay suficiente stock
-        
-        # Insertar movimiento (el trigger actualizará el inventario)
-        sql = """
-        INSERT INTO movimientos 
-        (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
-         razon, razon_detalle, usuario_id, proveedor, observaciones)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        
-        # Obtener proveedor del producto
-        sql_proveedor = "SELECT proveedor FROM productos WHERE id = ?"
-        result_proveedor = execute_query(sql_proveedor, (producto_id,), fetchone=True)
-        proveedor = result_proveedor[0] if result_proveedor else None
-        
-        params = (
-            tipo, producto_id, ubicacion_id, cantidad,
-            stock_actual, cantidad_nueva,
-            razon, razon_detalle, usuario_id, proveedor, observaciones
-        )
-        
-        result = execute_query(sql, params)
-        return isinstance(result, int) and result > 0
-        
+        with managed_transaction() as conn:
+            return _registrar_movimiento(
+                conn, producto_id, ubicacion_id, cantidad, tipo,
+                razon, razon_detalle, usuario_id, observaciones
+            )
     except Exception as e:
         print(f"Error al ajustar stock: {e}")
         return False
 
+def _registrar_movimiento(
+    conn: sqlite3.Connection,
+    producto_id: int,
+    ubicacion_id: int,
+    cantidad: int,
+    tipo: str,
+    razon: str,
+    razon_detalle: Optional[str],
+    usuario_id: int,
+    observaciones: Optional[str] = None,
+    referencia: Optional[str] = None
+) -> bool:
+    """
+    Inserta un movimiento dentro de una transacción ya abierta: una lectura
+    (stock y reservado de la ubicación + proveedor) y una escritura.
+    Retorna False si el producto no existe o la salida tomaría stock que no
+    está disponible (el reservado por órdenes pendientes no se puede sacar).
+    """
+    row = conn.execute("""
+    SELECT 
+        p.proveedor,
+        COALESCE(i.cantidad, 0),
+        COALESCE(i.reservado, 0)
+    FROM productos p
+    LEFT JOIN inventario i ON i.producto_id = p.id AND i.ubicacion_id = ?
+    WHERE p.id = ?
+    """, (ubicacion_id, producto_id)).fetchone()
+    
+    if row is None:
+        return False
+    proveedor, stock_actual, reservado = row
+    
+    # Calcular nueva cantidad
+    if tipo == 'IN':
+        cantidad_nueva = stock_actual + cantidad
+    else:  # 'OUT'
+        cantidad_nueva = stock_actual - cantidad
+        if cantidad > stock_actual - reservado:
+            return False  # No hay suficiente stock disponible
+    
+    # Insertar movimiento (el trigger actualizará el inventario)
+    conn.execute("""
+    INSERT INTO movimientos 
+    (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
+     razon, razon_detalle, usuario_id, proveedor, referencia, observaciones)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        tipo, producto_id, ubicacion_id, cantidad,
+        stock_actual, cantidad_nueva,
+        razon, razon_detalle, usuario_id, proveedor, referencia, observaciones
+    ))
+    return True
+
+# Máximo de pares (producto, ubicación) por consulta de stock del lote
+_PARES_POR_CONSULTA: int = 400
+
+def _leer_stock_pares(
+    conn: sqlite3.Connection,
+    pares: List[Tuple[int, int]]
+) -> Dict[Tuple[int, int], Tuple[Optional[str], int, int]]:
+    """
+    Lee proveedor, stock y reservado de varios pares (producto, ubicación) en
+    una consulta (dividida en tramos para no superar el límite de parámetros de SQLite).
+    Los productos inexistentes no aparecen en el resultado.
+    """
+    stock: Dict[Tuple[int, int], Tuple[Optional[str], int, int]] = {}
+    for inicio in range(0, len(pares), _PARES_POR_CONSULTA):
+        tramo = pares[inicio:inicio + _PARES_POR_CONSULTA]
+        valores = ", ".join("(?, ?)" for _ in tramo)
+        sql = f"""
+        WITH pares(producto_id, ubicacion_id) AS (VALUES {valores})
+        SELECT 
+            pa.producto_id,
+            pa.ubicacion_id,
+            p.proveedor,
+            COALESCE(i.cantidad, 0),
+            COALESCE(i.reservado, 0)
+        FROM pares pa
+        JOIN productos p ON p.id = pa.producto_id
+        LEFT JOIN inventario i 
+            ON i.producto_id = pa.producto_id AND i.ubicacion_id = pa.ubicacion_id
+        """
+        parametros = [valor for par in tramo for valor in par]
+        for producto_id, ubicacion_id, proveedor, cantidad, reservado in conn.execute(sql, parametros):
+            stock[(producto_id, ubicacion_id)] = (proveedor, cantidad, reservado)
+    return stock
+
+def registrar_movimientos_lote(
+    movimientos: List[Dict[str, Any]],
+    todo_o_nada: bool = True,
+    estrategia: Optional[str] = None
+) -> Optional[List[Optional[str]]]:
+    """
+    Registra varios movimientos en una sola transacción BEGIN IMMEDIATE.
+    
+    El stock de todos los pares (producto, ubicación) se lee con una consulta y
+    las líneas se validan en orden contra ese stock (una salida ve las líneas
+    anteriores del mismo lote y no puede tomar lo reservado por órdenes pendientes). Las válidas se insertan con executemany; el
+    trigger 'actualizar_stock_after_movimiento' actualiza el inventario.
+    
+    Una salida sin 'ubicacion_id' se reparte entre las ubicaciones del producto
+    según 'estrategia' (por defecto la configurada, ver database/asignacion.py):
+    un movimiento por ubicación, sin tocar lo reservado por órdenes pendientes.
+    
+    Args:
+        movimientos: Diccionarios con tipo, producto_id, ubicacion_id, cantidad,
+            razon, usuario_id y opcionalmente razon_detalle, observaciones, referencia
+        todo_o_nada: Si alguna línea falla no se registra ninguna
+        estrategia: Estrategia de asignación de las salidas sin ubicación
+        
+    Returns:
+        Lista paralela a 'movimientos' con None (aplicada) o el motivo del rechazo.
+        None si hubo un error de base de datos (no se aplicó nada).
+    """
+    estrategia, codigo_despacho = _preferencias_asignacion(estrategia)
+    try:
+        with managed_transaction() as conn:
+            pares = list({(m['producto_id'], m['ubicacion_id']) for m in movimientos if m.get('ubicacion_id')})
+            stock = _leer_stock_pares(conn, pares)
+            
+            sin_ubicacion = list({m['producto_id'] for m in movimientos if not m.get('ubicacion_id')})
+            existencias = _leer_existencias(conn, sin_ubicacion) if sin_ubicacion else {}
+            despacho = _leer_despacho(conn, estrategia, codigo_despacho) if existencias else None
+            for producto_id, (proveedor, ubicaciones) in existencias.items():
+                for existencia in ubicaciones:
+                    stock.setdefault(
+                        (producto_id, existencia.ubicacion_id),
+                        (proveedor, existencia.cantidad, existencia.cantidad - existencia.disponible)
+                    )
+            
+            errores: List[Optional[str]] = []
+            filas: List[Tuple[Any, ...]] = []
+            for mov in movimientos:
+                if not mov.get('ubicacion_id'):
+                    if mov['tipo'] != 'OUT':
+                        errores.append("Falta la ubicación de la entrada")
+                        continue
+                    if mov['producto_id'] not in existencias:
+                        errores.append("Producto no encontrado")
+                        continue
+                    proveedor, ubicaciones = existencias[mov['producto_id']]
+                    # Las líneas anteriores del lote pudieron mover stock de estas ubicaciones
+                    for existencia in ubicaciones:
+                        stock_actual = stock[(mov['producto_id'], existencia.ubicacion_id)][1]
+                        existencia.disponible += stock_actual - existencia.cantidad
+                        existencia.cantidad = stock_actual
+                    tomadas = asignar(ubicaciones, mov['cantidad'], estrategia, despacho)
+                    if not tomadas:
+                        disponible = sum(max(e.disponible, 0) for e in ubicaciones)
+                        errores.append(f"Stock insuficiente. Disponible: {disponible}, Solicitado: {mov['cantidad']}")
+                        continue
+                    
+                    errores.append(None)
+                    for existencia, tomado in tomadas:
+                        par = (mov['producto_id'], existencia.ubicacion_id)
+                        stock[par] = (proveedor, existencia.cantidad - tomado, stock[par][2])
+                        filas.append(_fila_movimiento(
+                            mov, existencia.ubicacion_id, tomado,
+                            existencia.cantidad, existencia.cantidad - tomado, proveedor
+                        ))
+                    continue
+                
+                par = (mov['producto_id'], mov['ubicacion_id'])
+                if par not in stock:
+                    errores.append("Producto no encontrado")
+                    continue
+                proveedor, stock_actual, reservado = stock[par]
+                
+                if mov['tipo'] == 'IN':
+                    cantidad_nueva = stock_actual + mov['cantidad']
+                else:  # 'OUT'
+                    cantidad_nueva = stock_actual - mov['cantidad']
+                    disponible = max(stock_actual - reservado, 0)
+                    if mov['cantidad'] > disponible:
+                        errores.append(f"Stock insuficiente. Disponible: {disponible}, Solicitado: {mov['cantidad']}")
+                        continue
+                
+                stock[par] = (proveedor, cantidad_nueva, reservado)
+                errores.append(None)
+                filas.append(_fila_movimiento(
+                    mov, mov['ubicacion_id'], mov['cantidad'], stock_actual, cantidad_nueva, proveedor
+                ))
+            
+            if todo_o_nada and any(errores):
+                return errores
+            
+            conn.executemany("""
+            INSERT INTO movimientos 
+            (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
+             razon, razon_detalle, usuario_id, proveedor, referencia, observaciones)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, filas)
+            return errores
+    except Exception as e:
+        print(f"Error al registrar lote de movimientos: {e}")
+        return None
+
+def _fila_movimiento(
+    mov: Dict[str, Any],
+    ubicacion_id: int,
+    cantidad: int,
+    stock_actual: int,
+    cantidad_nueva: int,
+    proveedor: Optional[str]
+) -> Tuple[Any, ...]:
+    """Parámetros del INSERT de movimientos de registrar_movimientos_lote."""
+    return (
+        mov['tipo'], mov['producto_id'], ubicacion_id, cantidad,
+        stock_actual, cantidad_nueva,
+        mov['razon'], mov.get('razon_detalle'), mov['usuario_id'], proveedor,
+        mov.get('referencia'), mov.get('observaciones')
+    )
+
 def update_stock(
     product_id: int, 
     state: str, 
@@ -341,15 +741,12 @@ def update_stock(
     tipo = 'IN' if operation == '+' else 'OUT'
     
     # En la nueva estructura necesitamos una ubicación
-    # Por defecto, usar la primera ubicación disponible
-    sql = "SELECT id FROM ubicaciones WHERE activo = 1 LIMIT 1"
-    result = execute_query(sql, fetchone=True)
+    # Por defecto, usar la primera ubicación disponible (en caché)
+    ubicacion_id = obtener_ubicacion_predeterminada()
     
-    if not result:
+    if ubicacion_id is None:
         return False
     
-    ubicacion_id = result[0]
-    
     # Usar la nueva función
     return ajustar_stock(
         producto_id=product_id,
@@ -362,7 +759,7 @@ def update_stock(
         observaciones="Ajuste automático por compatibilidad"
     )
 
-def get_stock_detallado(producto_id: int) -> List[Dict[str, Any]]:
+def get_stock_detallado(producto_id: int) -> List[StockUbicacion]:
     """
     Obtiene el stock detallado de un producto por ubicación.
     """
@@ -378,25 +775,24 @@ def get_stock_detallado(producto_id: int) -> List[Dict[str, Any]]:
     WHERE i.producto_id = ? AND i.cantidad > 0
     ORDER BY u.codigo
     """
-    result = execute_query(sql, (producto_id,), fetch=True)
-    
-    stock_detallado = []
-    if isinstance(result, list):
-        for row in result:
-            stock_detallado.append({
-                'ubicacion': row[0],
-                'cantidad': row[1],
-                'pasillo': row[2],
-                'estante': row[3],
-                'nivel': row[4]
-            })
-    return stock_detallado
+    result = execute_query(sql, (producto_id,), fetch=True, modelo=StockUbicacion)
+    return result if isinstance(result, list) else []
 
 # ============================================
 # --- FUNCIONES DE MOVIMIENTOS ---
 # ============================================
 
-def get_movimientos_history() -> List[Tuple[Any, ...]]:
+def rango_fechas(fecha_inicio: str, fecha_fin: str) -> Tuple[str, str]:
+    """
+    Convierte un rango de días inclusivo ('YYYY-MM-DD') en límites semiabiertos
+    de timestamp: fecha_movimiento >= inicio AND fecha_movimiento < fin.
+    Comparar la columna sin envolverla en DATE() permite usar el índice de fecha.
+    """
+    inicio = date.fromisoformat(fecha_inicio)
+    fin = date.fromisoformat(fecha_fin) + timedelta(days=1)
+    return inicio.isoformat(), fin.isoformat()
+
+def get_movimientos_history() -> List[Movimiento]:
     """
     Obtiene el historial de movimientos.
     Usa la vista 'vista_movimientos_detallados'.
@@ -410,17 +806,19 @@ def get_movimientos_history() -> List[Tuple[Any, ...]]:
         razon,
         proveedor,
         ubicacion,
-        observaciones
+        observaciones,
+        sku,
+        id
     FROM vista_movimientos_detallados
     ORDER BY fecha_movimiento DESC
     LIMIT 100
     """
-    result = execute_query(sql, fetch=True)
+    result = execute_query(sql, fetch=True, modelo=Movimiento)
     return result if isinstance(result, list) else []
 
-def obtener_movimientos_por_fecha(fecha_inicio: str, fecha_fin: str) -> List[Tuple[Any, ...]]:
+def obtener_movimientos_por_fecha(fecha_inicio: str, fecha_fin: str) -> List[Movimiento]:
     """
-    Obtiene movimientos entre fechas específicas.
+    Obtiene movimientos entre fechas específicas ('YYYY-MM-DD', ambas inclusive).
     """
     sql = """
     SELECT 
@@ -431,14 +829,146 @@ def obtener_movimientos_por_fecha(fecha_inicio: str, fecha_fin: str) -> List[Tup
         razon,
         proveedor,
         ubicacion,
-        observaciones
+        observaciones,
+        sku,
+        id
     FROM vista_movimientos_detallados
-    WHERE DATE(fecha_movimiento) BETWEEN ? AND ?
+    WHERE fecha_movimiento >= ? AND fecha_movimiento < ?
     ORDER BY fecha_movimiento DESC
     """
-    result = execute_query(sql, (fecha_inicio, fecha_fin), fetch=True)
+    result = execute_query(sql, rango_fechas(fecha_inicio, fecha_fin), fetch=True, modelo=Movimiento)
     return result if isinstance(result, list) else []
 
+# Columnas de Movimiento sobre movimientos m / productos p / ubicaciones ub
+_COLUMNAS_MOVIMIENTO: str = """
+    m.fecha_movimiento,
+    p.nombre,
+    CASE m.tipo
+        WHEN 'IN' THEN '↑ IN'
+        WHEN 'OUT' THEN '↓ OUT'
+        ELSE m.tipo
+    END,
+    m.cantidad,
+    m.razon,
+    COALESCE(m.proveedor, p.proveedor),
+    ub.codigo,
+    m.observaciones,
+    p.sku,
+    m.id
+"""
+
+def _filtros_movimientos(
+    fecha_desde: Optional[str],
+    fecha_hasta: Optional[str],
+    tipo: Optional[str],
+    ubicacion: Optional[str],
+    texto: Optional[str]
+) -> Tuple[List[str], List[Any]]:
+    """Condiciones WHERE y parámetros de los filtros del historial de movimientos."""
+    condiciones: List[str] = []
+    params: List[Any] = []
+    
+    if fecha_desde:
+        condiciones.append("m.fecha_movimiento >= ?")
+        params.append(rango_fechas(fecha_desde, fecha_desde)[0])
+    if fecha_hasta:
+        condiciones.append("m.fecha_movimiento < ?")
+        params.append(rango_fechas(fecha_hasta, fecha_hasta)[1])
+    if tipo:
+        condiciones.append("m.tipo = ?")
+        params.append(tipo)
+    if ubicacion:
+        condiciones.append("ub.codigo = ?")
+        params.append(ubicacion)
+    if texto:
+        condiciones.append("""(
+            p.nombre LIKE ? OR m.razon LIKE ? 
+            OR COALESCE(m.proveedor, p.proveedor) LIKE ? OR m.fecha_movimiento LIKE ?
+        )""")
+        params.extend([f"%{texto}%"] * 4)
+    return condiciones, params
+
+def obtener_movimientos_pagina(
+    limite: int = 100,
+    cursor: Optional[str] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    tipo: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    texto: Optional[str] = None
+) -> Tuple[List[Movimiento], Optional[str]]:
+    """
+    Obtiene una página del historial de movimientos, del más reciente al más antiguo.
+    
+    La paginación es por clave (fecha_movimiento, id): cada página continúa
+    después de la última fila de la anterior usando el índice de fecha, así
+    que su costo no depende de cuántas páginas se hayan leído antes.
+    
+    Args:
+        limite: Filas por página
+        cursor: Token de continuación devuelto por la página anterior (None = primera)
+        fecha_desde: 'YYYY-MM-DD' inclusive
+        fecha_hasta: 'YYYY-MM-DD' inclusive (se consulta como < día siguiente)
+        tipo: 'IN' u 'OUT'
+        ubicacion: Código de ubicación
+        texto: Texto a buscar en producto, razón, proveedor o fecha
+        
+    Returns:
+        (filas, siguiente_cursor) con filas Movimiento.
+        siguiente_cursor es None cuando no hay más páginas.
+    """
+    condiciones, params = _filtros_movimientos(fecha_desde, fecha_hasta, tipo, ubicacion, texto)
+    if cursor:
+        fecha_cursor, _, id_cursor = cursor.rpartition("|")
+        condiciones.append("(m.fecha_movimiento, m.id) < (?, ?)")
+        params.extend([fecha_cursor, int(id_cursor)])
+    
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"""
+    SELECT {_COLUMNAS_MOVIMIENTO}
+    FROM movimientos m
+    JOIN productos p ON m.producto_id = p.id
+    LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id
+    {where}
+    ORDER BY m.fecha_movimiento DESC, m.id DESC
+    LIMIT ?
+    """
+    params.append(limite + 1)  # una fila extra indica si hay otra página
+    result = execute_query(sql, tuple(params), fetch=True, modelo=Movimiento)
+    filas = result if isinstance(result, list) else []
+    
+    siguiente: Optional[str] = None
+    if len(filas) > limite:
+        del filas[limite:]
+        ultima = filas[-1]
+        siguiente = f"{ultima.fecha_movimiento}|{ultima.id}"
+    return filas, siguiente
+
+def iterar_movimientos(
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    tipo: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    texto: Optional[str] = None,
+    tamano_lote: int = TAMANO_LOTE_STREAMING
+) -> IteradorConsulta:
+    """
+    Todos los movimientos que cumplen los filtros (los mismos de
+    obtener_movimientos_pagina), del más reciente al más antiguo, en streaming.
+    Cada fila es un Movimiento. Para exportaciones de cualquier tamaño.
+    """
+    condiciones, params = _filtros_movimientos(fecha_desde, fecha_hasta, tipo, ubicacion, texto)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"""
+    SELECT {_COLUMNAS_MOVIMIENTO}
+    FROM movimientos m
+    JOIN productos p ON m.producto_id = p.id
+    LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id
+    {where}
+    ORDER BY m.fecha_movimiento DESC, m.id DESC
+    """
+    return iter_query(sql, tuple(params), tamano_lote, modelo=Movimiento)
+
 def insert_movement(
     product_id: int, 
     user_id: int, 
@@ -461,12 +991,10 @@ def insert_movement(
     razon = razon_map.get(concept, 'ajuste manual')
     tipo = 'OUT' if move_type == 'SALIDA' else 'IN'
     
-    # Obtener ubicación por defecto
-    sql = "SELECT id FROM ubicaciones WHERE activo = 1 LIMIT 1"
-    result = execute_query(sql, fetchone=True)
+    # Obtener ubicación por defecto (en caché)
+    ubicacion_id = obtener_ubicacion_predeterminada()
     
-    if result:
-        ubicacion_id = result[0]
+    if ubicacion_id is not None:
         ajustar_stock(
             producto_id=product_id,
             ubicacion_id=ubicacion_id,
@@ -478,9 +1006,93 @@ def insert_movement(
             observaciones=f"Movimiento: {concept}"
         )
 
-def get_movimientos_por_producto(producto_id: int) -> List[Dict[str, Any]]:
+# Columnas aceptadas por registrar_movimientos_bulk (las ausentes van como NULL)
+_COLUMNAS_MOVIMIENTO_BULK: Tuple[str, ...] = (
+    'tipo', 'producto_id', 'ubicacion_id', 'cantidad', 'razon', 'razon_detalle',
+    'usuario_id', 'proveedor', 'referencia', 'observaciones', 'fecha_movimiento'
+)
+
+def registrar_movimientos_bulk(
+    movimientos: Iterable[Mapping[str, Any]],
+    tamano_lote: int = 10000
+) -> int:
+    """
+    Importa movimientos en masa (entregas de proveedor, respaldos históricos).
+    
+    Cada lote va en una transacción BEGIN IMMEDIATE: se desactiva el trigger
+    'actualizar_stock_after_movimiento', se insertan las filas con executemany y
+    el inventario de los pares (producto, ubicación) afectados se recalcula con
+    una sola sentencia a partir del neto del lote. El trigger se recrea antes del
+    commit, así que ninguna otra conexión llega a verlo ausente.
+    
+    Diferencias con ajustar_stock:
+    - cantidad_anterior / cantidad_nueva quedan en NULL.
+    - Las salidas se aplican por neto del lote y el resultado se acota en 0,
+      en lugar de descartar individualmente cada salida sin stock.
+    - 'fecha_movimiento' es opcional; si falta se usa la fecha actual.
+    
+    Args:
+        movimientos: Diccionarios con las claves de _COLUMNAS_MOVIMIENTO_BULK
+        tamano_lote: Filas por transacción
+        
+    Returns:
+        int: Cantidad de movimientos insertados (los lotes confirmados antes
+        de un error se conservan)
+    """
+    if tamano_lote <= 0:
+        raise ValueError("El tamaño de lote debe ser mayor a 0.")
+    
+    sql_insert = """
+    INSERT INTO movimientos 
+    (tipo, producto_id, ubicacion_id, cantidad, razon, razon_detalle,
+     usuario_id, proveedor, referencia, observaciones, fecha_movimiento)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    """
+    sql_recalcular = """
+    WITH neto AS (
+        SELECT 
+            producto_id,
+            ubicacion_id,
+            SUM(CASE WHEN tipo = 'IN' THEN cantidad ELSE -cantidad END) AS delta
+        FROM movimientos
+        WHERE id > ? AND ubicacion_id IS NOT NULL
+        GROUP BY producto_id, ubicacion_id
+    )
+    INSERT INTO inventario (producto_id, ubicacion_id, cantidad)
+    SELECT n.producto_id, n.ubicacion_id, MAX(COALESCE(i.cantidad, 0) + n.delta, 0)
+    FROM neto n
+    LEFT JOIN inventario i 
+        ON i.producto_id = n.producto_id AND i.ubicacion_id = n.ubicacion_id
+    WHERE i.id IS NOT NULL OR n.delta > 0
+    ON CONFLICT(producto_id, ubicacion_id) DO UPDATE SET cantidad = excluded.cantidad
+    """
+    
+    filas = (tuple(map(mov.get, _COLUMNAS_MOVIMIENTO_BULK)) for mov in movimientos)
+    total = 0
+    try:
+        while True:
+            lote = list(islice(filas, tamano_lote))
+            if not lote:
+                break
+            with managed_transaction() as conn:
+                ultimo_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM movimientos").fetchone()[0]
+                conn.execute("DROP TRIGGER IF EXISTS actualizar_stock_after_movimiento")
+                conn.executemany(sql_insert, lote)
+                conn.execute(sql_recalcular, (ultimo_id,))
+                conn.execute(TRIGGER_ACTUALIZAR_STOCK)
+            total += len(lote)
+    except Exception as e:
+        print(f"Error en importación masiva de movimientos ({total} registrados): {e}")
+    return total
+
+def get_movimientos_por_producto(
+    producto_id: int,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None
+) -> List[MovimientoProducto]:
     """
     Obtiene el historial de movimientos de un producto específico.
+    Con fecha_inicio y fecha_fin ('YYYY-MM-DD', inclusivas) se limita a ese rango.
     """
     sql = """
     SELECT 
@@ -497,28 +1109,17 @@ def get_movimientos_por_producto(producto_id: int) -> List[Dict[str, Any]]:
     FROM movimientos m
     JOIN usuarios u ON m.usuario_id = u.id
     LEFT JOIN ubicaciones ub ON m.ubicacion_id = ub.id
-    WHERE m.producto_id = ?
+    WHERE m.producto_id = ? {filtro_fecha}
     ORDER BY m.fecha_movimiento DESC
     LIMIT 50
     """
-    result = execute_query(sql, (producto_id,), fetch=True)
-    
-    movimientos = []
-    if isinstance(result, list):
-        for row in result:
-            movimientos.append({
-                'fecha': row[0],
-                'tipo': row[1],
-                'cantidad': row[2],
-                'cantidad_anterior': row[3],
-                'cantidad_nueva': row[4],
-                'razon': row[5],
-                'razon_detalle': row[6],
-                'usuario': row[7],
-                'ubicacion': row[8],
-                'observaciones': row[9]
-            })
-    return movimientos
+    params: Tuple[Any, ...] = (producto_id,)
+    filtro_fecha = ""
+    if fecha_inicio and fecha_fin:
+        filtro_fecha = "AND m.fecha_movimiento >= ? AND m.fecha_movimiento < ?"
+        params += rango_fechas(fecha_inicio, fecha_fin)
+    result = execute_query(sql.format(filtro_fecha=filtro_fecha), params, fetch=True, modelo=MovimientoProducto)
+    return result if isinstance(result, list) else []
 
 # ============================================
 # --- FUNCIONES DE UBICACIONES ---
@@ -526,28 +1127,36 @@ def get_movimientos_por_producto(producto_id: int) -> List[Dict[str, Any]]:
 
 def obtener_ubicaciones() -> List[Tuple[int, str]]:
     """
-    Obtiene todas las ubicaciones activas.
+    Obtiene todas las ubicaciones activas (en caché hasta la próxima escritura).
     Retorna (id, codigo).
     """
-    sql = "SELECT id, codigo FROM ubicaciones WHERE activo = 1 ORDER BY codigo"
-    result = execute_query(sql, fetch=True)
-    return result if isinstance(result, list) else []
+    def cargar() -> List[Tuple[int, str]]:
+        sql = "SELECT id, codigo FROM ubicaciones WHERE activo = 1 ORDER BY codigo"
+        result = execute_query(sql, fetch=True)
+        return result if isinstance(result, list) else []
+    
+    return list(get_cache_referencias().obtener('ubicaciones', 'activas', cargar))
 
 def obtener_ubicacion_por_codigo(codigo: str) -> Optional[int]:
     """
     Obtiene el ID de una ubicación por su código.
     """
-    sql = "SELECT id FROM ubicaciones WHERE codigo = ? AND activo = 1"
-    result = execute_query(sql, (codigo,), fetchone=True)
-    return result[0] if result else None
+    codigos: Dict[str, int] = get_cache_referencias().obtener(
+        'ubicaciones', 'por_codigo',
+        lambda: {codigo_ub: id_ub for id_ub, codigo_ub in obtener_ubicaciones()}
+    )
+    return codigos.get(codigo)
 
 def obtener_ubicacion_predeterminada() -> Optional[int]:
     """
-    Obtiene la primera ubicación activa como predeterminada.
+    Obtiene la primera ubicación activa como predeterminada (en caché).
     """
-    sql = "SELECT id FROM ubicaciones WHERE activo = 1 LIMIT 1"
-    result = execute_query(sql, fetchone=True)
-    return result[0] if result else None
+    def cargar() -> Optional[int]:
+        sql = "SELECT id FROM ubicaciones WHERE activo = 1 LIMIT 1"
+        result = execute_query(sql, fetchone=True)
+        return result[0] if result else None
+    
+    return get_cache_referencias().obtener('ubicaciones', 'predeterminada', cargar)
 
 def crear_ubicacion(pasillo: str, estante: str, nivel: str) -> Optional[int]:
     """
@@ -559,9 +1168,10 @@ def crear_ubicacion(pasillo: str, estante: str, nivel: str) -> Optional[int]:
     VALUES (?, ?, ?, ?, 1, 0, 1)
     """
     result = execute_query(sql, (codigo, pasillo, estante, nivel))
+    get_cache_referencias().invalidar('ubicaciones')
     return result if isinstance(result, int) else None
 
-def obtener_ubicaciones_disponibles() -> List[Dict[str, Any]]:
+def obtener_ubicaciones_disponibles() -> List[Ubicacion]:
     """
     Obtiene ubicaciones disponibles (con espacio).
     """
@@ -578,21 +1188,8 @@ def obtener_ubicaciones_disponibles() -> List[Dict[str, Any]]:
     WHERE activo = 1 AND (ocupado = 0 OR capacidad > 0)
     ORDER BY codigo
     """
-    result = execute_query(sql, fetch=True)
-    
-    ubicaciones = []
-    if isinstance(result, list):
-        for row in result:
-            ubicaciones.append({
-                'id': row[0],
-                'codigo': row[1],
-                'pasillo': row[2],
-                'estante': row[3],
-                'nivel': row[4],
-                'capacidad': row[5],
-                'ocupado': bool(row[6])
-            })
-    return ubicaciones
+    result = execute_query(sql, fetch=True, modelo=Ubicacion)
+    return result if isinstance(result, list) else []
 
 # ============================================
 # --- FUNCIONES DE ÓRDENES/VENTAS ---
@@ -607,45 +1204,48 @@ def crear_orden_venta(
     """
     Crea una nueva orden de venta con sus detalles.
     """
+    numero_orden: str = ""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Calcular total
-        total = sum(p['precio'] * p['cantidad'] for p in productos)
-        
-        # Generar número de orden
-        from datetime import datetime
-        
-        id_unico: str = uuid.uuid4().hex[:8].upper() # Genera algo como '4A2B91C0'
-        numero_orden: str = f"ORD-{datetime.now().strftime('%Y%m%d')}-{id_unico}"
-        
-        # Insertar orden
-        sql_orden = """
-        INSERT INTO ordenes 
-        (numero_orden, tipo_operacion, cliente_id, total, estado, usuario_id)
-        VALUES (?, ?, ?, ?, 'pendiente', ?)
-        """
-        cursor.execute(sql_orden, (numero_orden, tipo_operacion, cliente_id, total, usuario_id))
-        orden_id = cursor.lastrowid
-        
-        # Insertar detalles
-        for producto in productos:
+        with managed_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Calcular total
+            total = sum(p['precio'] * p['cantidad'] for p in productos)
+            
+            # Generar número de orden
+            from datetime import datetime
+            
+            id_unico: str = uuid.uuid4().hex[:8].upper() # Genera algo como '4A2B91C0'
+            numero_orden = f"ORD-{datetime.now().strftime('%Y%m%d')}-{id_unico}"
+            
+            # Insertar orden
+            sql_orden = """
+            INSERT INTO ordenes 
+            (numero_orden, tipo_operacion, cliente_id, total, estado, usuario_id)
+            VALUES (?, ?, ?, ?, 'pendiente', ?)
+            """
+            cursor.execute(sql_orden, (numero_orden, tipo_operacion, cliente_id, total, usuario_id))
+            orden_id = cursor.lastrowid
+            
+            # Insertar detalles
             sql_detalle = """
             INSERT INTO orden_detalles 
             (orden_id, producto_id, cantidad, precio_unitario, ubicacion_id, procesado)
             VALUES (?, ?, ?, ?, ?, 0)
             """
-            cursor.execute(sql_detalle, (
-                orden_id,
-                producto['id'],
-                producto['cantidad'],
-                producto['precio'],
-                producto.get('ubicacion_id')
-            ))
-        
-        conn.commit()
-        return orden_id
+            cursor.executemany(sql_detalle, [
+                (
+                    orden_id,
+                    producto['id'],
+                    producto['cantidad'],
+                    producto['precio'],
+                    producto.get('ubicacion_id')
+                )
+                for producto in productos
+            ])
+            
+            conn.commit()
+            return orden_id
         
     except sqlite3.IntegrityError:
         print(f"Error: El número de orden {numero_orden} ya existe.")
@@ -653,10 +1253,276 @@ def crear_orden_venta(
     except Exception as e:
         print(f"Error inesperado al crear orden: {e}")
         return None
-    finally:
-        conn.close()
 
-def obtener_ordenes_pendientes() -> List[Dict[str, Any]]:
+# Máximo de productos por consulta de existencias de una orden
+_PRODUCTOS_POR_CONSULTA: int = 500
+
+def _leer_existencias(
+    conn: sqlite3.Connection,
+    producto_ids: List[int]
+) -> Dict[int, Tuple[Optional[str], List[Existencia]]]:
+    """
+    Lee en una consulta (dividida en tramos por el límite de parámetros) el
+    proveedor y las ubicaciones con stock disponible (cantidad - reservado) de
+    varios productos activos, con lo que la asignación necesita para ordenarlas.
+    Retorna {producto_id: (proveedor, [Existencia, ...])}; los productos inexistentes no aparecen.
+    """
+    existencias: Dict[int, Tuple[Optional[str], List[Existencia]]] = {}
+    for inicio in range(0, len(producto_ids), _PRODUCTOS_POR_CONSULTA):
+        tramo = producto_ids[inicio:inicio + _PRODUCTOS_POR_CONSULTA]
+        valores = ", ".join("(?)" for _ in tramo)
+        # 'cantidad > 0' deja usar el índice parcial idx_inventario_producto_existencias
+        sql = f"""
+        WITH pedidos(producto_id) AS (VALUES {valores})
+        SELECT
+            p.id,
+            p.proveedor,
+            i.ubicacion_id,
+            i.cantidad - i.reservado,
+            i.cantidad,
+            i.fecha_recepcion,
+            u.pasillo,
+            u.estante,
+            u.nivel
+        FROM pedidos pe
+        JOIN productos p ON p.id = pe.producto_id AND p.activo = 1
+        LEFT JOIN inventario i 
+            ON i.producto_id = p.id AND i.cantidad > 0 AND i.cantidad > i.reservado
+        LEFT JOIN ubicaciones u ON u.id = i.ubicacion_id
+        """
+        for producto_id, proveedor, ubicacion_id, *datos in conn.execute(sql, tramo):
+            _proveedor, ubicaciones = existencias.setdefault(producto_id, (proveedor, []))
+            if ubicacion_id is not None:
+                ubicaciones.append(Existencia(ubicacion_id, *datos))
+    return existencias
+
+def _preferencias_asignacion(estrategia: Optional[str]) -> Tuple[str, str]:
+    """
+    Estrategia de asignación (la indicada o la configurada) y código de la
+    ubicación de despacho. Se lee antes de abrir la transacción (configuración en caché).
+    """
+    configuracion = obtener_todas_configuraciones()
+    estrategia = estrategia or configuracion.get('estrategia_asignacion') or ESTRATEGIA_PREDETERMINADA
+    if estrategia not in ESTRATEGIAS:
+        print(f"⚠️ Estrategia de asignación no válida: {estrategia}. Se usa {ESTRATEGIA_PREDETERMINADA}.")
+        estrategia = ESTRATEGIA_PREDETERMINADA
+    return estrategia, configuracion.get('ubicacion_despacho') or ""
+
+def _leer_despacho(conn: sqlite3.Connection, estrategia: str, codigo: str) -> Optional[Despacho]:
+    """(pasillo, estante, nivel) de la ubicación de despacho, solo si la estrategia lo usa."""
+    if estrategia != "cercania_despacho" or not codigo:
+        return None
+    return conn.execute(
+        "SELECT pasillo, estante, nivel FROM ubicaciones WHERE codigo = ?", (codigo,)
+    ).fetchone()
+
+def registrar_orden_venta(
+    tipo_operacion: str,
+    cliente_id: Optional[int],
+    usuario_id: int,
+    productos: List[Dict[str, Any]],
+    reservar: bool = False,
+    estrategia: Optional[str] = None
+) -> Optional[Tuple[Optional[int], str, List[Optional[str]]]]:
+    """
+    Crea una orden de venta en una sola transacción BEGIN IMMEDIATE: o queda
+    la orden completa, o no queda nada.
+
+    La disponibilidad de todas las líneas se lee con una consulta y descuenta
+    lo ya reservado por otras órdenes pendientes. Cada línea se reparte entre
+    las ubicaciones del producto según 'estrategia' (por defecto la configurada,
+    ver database/asignacion.py) o sale solo de su 'ubicacion_id' si la trae.
+    Por cada ubicación usada se inserta un detalle y:
+    - reservar=False: una salida con la referencia del número de orden (el
+      trigger 'actualizar_stock_after_movimiento' actualiza el inventario) y
+      la orden queda completada con sus detalles procesados.
+    - reservar=True: una reserva; la orden queda pendiente hasta completar_orden()
+      o cancelar_orden().
+
+    Args:
+        productos: Diccionarios con id, cantidad, precio y opcionalmente ubicacion_id
+
+    Returns:
+        (orden_id, numero_orden, errores) con 'errores' paralela a 'productos':
+        None por línea surtida o el motivo del rechazo. Si alguna línea falla,
+        orden_id es None y no se escribe nada.
+        None si hubo un error de base de datos.
+    """
+    id_unico: str = uuid.uuid4().hex[:8].upper()
+    numero_orden: str = f"ORD-{date.today().strftime('%Y%m%d')}-{id_unico}"
+    estrategia, codigo_despacho = _preferencias_asignacion(estrategia)
+    try:
+        with managed_transaction() as conn:
+            existencias = _leer_existencias(conn, list({p['id'] for p in productos}))
+            despacho = _leer_despacho(conn, estrategia, codigo_despacho)
+
+            # Asignar ubicaciones a cada línea, en orden, sobre el stock leído
+            errores: List[Optional[str]] = []
+            asignaciones: List[List[Tuple[int, int, int]]] = []
+            for producto in productos:
+                asignacion: List[Tuple[int, int, int]] = []
+                asignaciones.append(asignacion)
+                if producto['id'] not in existencias:
+                    errores.append("Producto no encontrado")
+                    continue
+                ubicaciones = existencias[producto['id']][1]
+                if producto.get('ubicacion_id'):
+                    ubicaciones = [u for u in ubicaciones if u.ubicacion_id == producto['ubicacion_id']]
+                tomadas = asignar(ubicaciones, producto['cantidad'], estrategia, despacho)
+                if not tomadas:
+                    disponible = sum(u.disponible for u in ubicaciones)
+                    errores.append(f"Stock insuficiente. Disponible: {disponible}, Solicitado: {producto['cantidad']}")
+                    continue
+
+                for existencia, tomado in tomadas:
+                    # (ubicación, cantidad, stock previo); el stock restante queda para las líneas siguientes
+                    asignacion.append((existencia.ubicacion_id, tomado, existencia.cantidad))
+                    existencia.disponible -= tomado
+                    existencia.cantidad -= tomado
+                errores.append(None)
+
+            if any(errores):
+                return None, numero_orden, errores
+
+            total = sum(p['precio'] * p['cantidad'] for p in productos)
+            cursor = conn.execute(f"""
+            INSERT INTO ordenes
+            (numero_orden, tipo_operacion, cliente_id, total, estado, usuario_id, fecha_completada)
+            VALUES (?, ?, ?, ?, ?, ?, {'NULL' if reservar else 'CURRENT_TIMESTAMP'})
+            """, (numero_orden, tipo_operacion, cliente_id, total,
+                  'pendiente' if reservar else 'completada', usuario_id))
+            orden_id = cursor.lastrowid
+            razon_detalle = f"Orden #{orden_id} ({tipo_operacion})"
+
+            detalles: List[Tuple[Any, ...]] = []
+            movimientos: List[Tuple[Any, ...]] = []
+            for producto, asignacion in zip(productos, asignaciones):
+                proveedor = existencias[producto['id']][0]
+                for ubicacion_id, cantidad, stock_previo in asignacion:
+                    detalles.append((orden_id, producto['id'], cantidad, producto['precio'], ubicacion_id))
+                    movimientos.append((
+                        producto['id'], ubicacion_id, cantidad, stock_previo, stock_previo - cantidad,
+                        razon_detalle, usuario_id, proveedor, numero_orden
+                    ))
+
+            conn.executemany(f"""
+            INSERT INTO orden_detalles
+            (orden_id, producto_id, cantidad, precio_unitario, ubicacion_id, procesado)
+            VALUES (?, ?, ?, ?, ?, {0 if reservar else 1})
+            """, detalles)
+            if reservar:
+                # Una reserva por detalle; los triggers suman 'reservado' en inventario y stock_resumen
+                conn.execute("""
+                INSERT INTO reservas (orden_id, orden_detalle_id, producto_id, ubicacion_id, cantidad)
+                SELECT orden_id, id, producto_id, ubicacion_id, cantidad
+                FROM orden_detalles
+                WHERE orden_id = ?
+                """, (orden_id,))
+                return orden_id, numero_orden, errores
+
+            conn.executemany("""
+            INSERT INTO movimientos
+            (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
+             razon, razon_detalle, usuario_id, proveedor, referencia)
+            VALUES ('OUT', ?, ?, ?, ?, ?, 'venta', ?, ?, ?, ?)
+            """, movimientos)
+            return orden_id, numero_orden, errores
+    except Exception as e:
+        print(f"Error al registrar la orden {numero_orden}: {e}")
+        return None
+
+def completar_orden(orden_id: int, usuario_id: int) -> Optional[str]:
+    """
+    Despacha una orden pendiente en una transacción: la orden completada (el
+    trigger 'ordenes_cierre_reservas' consume sus reservas), detalles
+    procesados y una salida por cada reserva que estaba activa.
+    Retorna None si se completó o el motivo por el que no se pudo.
+    """
+    try:
+        with managed_transaction() as conn:
+            orden = conn.execute(
+                "SELECT estado, tipo_operacion, numero_orden FROM ordenes WHERE id = ?", (orden_id,)
+            ).fetchone()
+            if orden is None:
+                return "La orden no existe"
+            estado, tipo_operacion, numero_orden = orden
+            if estado != 'pendiente':
+                return f"La orden está {estado}"
+
+            reservas = conn.execute("""
+            SELECT r.producto_id, r.ubicacion_id, r.cantidad, COALESCE(i.cantidad, 0), p.proveedor, p.nombre
+            FROM reservas r
+            JOIN productos p ON p.id = r.producto_id
+            LEFT JOIN inventario i ON i.producto_id = r.producto_id AND i.ubicacion_id = r.ubicacion_id
+            WHERE r.orden_id = ? AND r.estado = 'activa'
+            """, (orden_id,)).fetchall()
+
+            # El stock físico pudo bajar después de reservar (mermas, ajustes)
+            stock: Dict[Tuple[int, int], int] = {}
+            movimientos: List[Tuple[Any, ...]] = []
+            razon_detalle = f"Orden #{orden_id} ({tipo_operacion})"
+            for producto_id, ubicacion_id, cantidad, stock_fisico, proveedor, nombre in reservas:
+                stock_previo = stock.get((producto_id, ubicacion_id), stock_fisico)
+                if stock_previo < cantidad:
+                    return f"Stock insuficiente de {nombre}. Disponible: {stock_previo}, Reservado: {cantidad}"
+                stock[(producto_id, ubicacion_id)] = stock_previo - cantidad
+                movimientos.append((
+                    producto_id, ubicacion_id, cantidad, stock_previo, stock_previo - cantidad,
+                    razon_detalle, usuario_id, proveedor, numero_orden
+                ))
+
+            # Primero se consumen las reservas: el trigger 'inventario_reservado_cubierto'
+            # no deja que la salida baje la cantidad por debajo de lo reservado
+            conn.execute("UPDATE orden_detalles SET procesado = 1 WHERE orden_id = ?", (orden_id,))
+            conn.execute("""
+            UPDATE ordenes SET estado = 'completada', fecha_completada = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """, (orden_id,))
+            conn.executemany("""
+            INSERT INTO movimientos
+            (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
+             razon, razon_detalle, usuario_id, proveedor, referencia)
+            VALUES ('OUT', ?, ?, ?, ?, ?, 'venta', ?, ?, ?, ?)
+            """, movimientos)
+            return None
+    except Exception as e:
+        print(f"Error al completar la orden {orden_id}: {e}")
+        return f"Error de base de datos: {e}"
+
+def cancelar_orden(orden_id: int) -> bool:
+    """
+    Cancela una orden pendiente; el trigger 'ordenes_cierre_reservas' libera sus reservas.
+    No devuelve stock ya descontado (las órdenes despachadas no quedan pendientes).
+    """
+    try:
+        with managed_transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE ordenes SET estado = 'cancelada' WHERE id = ? AND estado = 'pendiente'", (orden_id,)
+            )
+            return cursor.rowcount == 1
+    except Exception as e:
+        print(f"Error al cancelar la orden {orden_id}: {e}")
+        return False
+
+def obtener_disponible(producto_id: int, ubicacion_id: Optional[int] = None) -> int:
+    """
+    Stock disponible para prometer (stock menos lo reservado por órdenes pendientes).
+    Una lectura por clave primaria en stock_resumen, o por la clave única
+    (producto, ubicación) de inventario si se indica la ubicación.
+    """
+    if ubicacion_id:
+        sql = "SELECT cantidad - reservado FROM inventario WHERE producto_id = ? AND ubicacion_id = ?"
+        params: Tuple[int, ...] = (producto_id, ubicacion_id)
+    else:
+        sql = "SELECT cantidad_total - reservado_total FROM stock_resumen WHERE producto_id = ?"
+        params = (producto_id,)
+
+    result = execute_query(sql, params, fetchone=True)
+    if result and result[0] is not None:
+        return int(result[0])
+    return 0
+
+def obtener_ordenes_pendientes() -> List[Orden]:
     """
     Obtiene todas las órdenes pendientes.
     """
@@ -666,7 +1532,7 @@ def obtener_ordenes_pendientes() -> List[Dict[str, Any]]:
         o.numero_orden,
         o.tipo_operacion,
         c.nombre as cliente,
-        o.total,
+        COALESCE(o.total, 0),
         o.estado,
         u.usuario,
         o.fecha_creacion
@@ -677,22 +1543,8 @@ def obtener_ordenes_pendientes() -> List[Dict[str, Any]]:
     ORDER BY o.fecha_creacion DESC
     LIMIT 50
     """
-    result = execute_query(sql, fetch=True)
-    
-    ordenes = []
-    if isinstance(result, list):
-        for row in result:
-            ordenes.append({
-                'id': row[0],
-                'numero_orden': row[1],
-                'tipo_operacion': row[2],
-                'cliente': row[3],
-                'total': float(row[4]) if row[4] else 0,
-                'estado': row[5],
-                'usuario': row[6],
-                'fecha_creacion': row[7]
-            })
-    return ordenes
+    result = execute_query(sql, fetch=True, modelo=Orden)
+    return result if isinstance(result, list) else []
 
 # ============================================
 # --- FUNCIONES DE CLIENTES ---
@@ -724,11 +1576,9 @@ def crear_cliente(nombre: str, documento: str = "", telefono: str = "",
 
 def obtener_configuracion(clave: str) -> Optional[str]:
     """
-    Obtiene un valor de configuración.
+    Obtiene un valor de configuración (de la caché de configuraciones).
     """
-    sql = "SELECT valor FROM configuracion WHERE clave = ?"
-    result = execute_query(sql, (clave,), fetchone=True)
-    return result[0] if result else None
+    return obtener_todas_configuraciones().get(clave)
 
 def actualizar_configuracion(clave: str, valor: str) -> bool:
     """
@@ -739,28 +1589,32 @@ def actualizar_configuracion(clave: str, valor: str) -> bool:
     VALUES (?, ?)
     """
     result = execute_query(sql, (clave, valor))
+    get_cache_referencias().invalidar('configuracion')
     return isinstance(result, int) and result > 0
 
 def obtener_todas_configuraciones() -> Dict[str, str]:
     """
-    Obtiene todas las configuraciones como diccionario.
+    Obtiene todas las configuraciones como diccionario (en caché hasta la próxima escritura).
     """
-    sql = "SELECT clave, valor FROM configuracion"
-    result = execute_query(sql, fetch=True)
+    def cargar() -> Dict[str, str]:
+        sql = "SELECT clave, valor FROM configuracion"
+        result = execute_query(sql, fetch=True)
+        
+        configs = {}
+        if isinstance(result, list):
+            for row in result:
+                configs[row[0]] = row[1]
+        return configs
     
-    configs = {}
-    if isinstance(result, list):
-        for row in result:
-            configs[row[0]] = row[1]
-    return configs
+    return dict(get_cache_referencias().obtener('configuracion', 'todas', cargar))
 
 # ============================================
 # --- FUNCIONES DE USUARIOS ---
 # ============================================
 
-def obtener_usuarios() -> List[Dict[str, Any]]:
+def obtener_usuarios() -> List[Usuario]:
     """
-    Obtiene todos los usuarios activos.
+    Obtiene todos los usuarios activos (en caché hasta la próxima escritura).
     """
     sql = """
     SELECT 
@@ -773,19 +1627,13 @@ def obtener_usuarios() -> List[Dict[str, Any]]:
     WHERE activo = 1
     ORDER BY usuario
     """
-    result = execute_query(sql, fetch=True)
     
-    usuarios = []
-    if isinstance(result, list):
-        for row in result:
-            usuarios.append({
-                'id': row[0],
-                'usuario': row[1],
-                'rol': row[2],
-                'activo': bool(row[3]),
-                'fecha_creacion': row[4]
-            })
-    return usuarios
+    def cargar() -> List[Usuario]:
+        result = execute_query(sql, fetch=True, modelo=Usuario)
+        return result if isinstance(result, list) else []
+    
+    # Las filas son inmutables: basta con copiar la lista
+    return list(get_cache_referencias().obtener('usuarios', 'activos', cargar))
 
 def crear_usuario(usuario: str, contrasena: str, rol: str) -> Optional[int]:
     """
@@ -796,13 +1644,14 @@ def crear_usuario(usuario: str, contrasena: str, rol: str) -> Optional[int]:
     VALUES (?, ?, ?)
     """
     result = execute_query(sql, (usuario, contrasena, rol))
+    get_cache_referencias().invalidar('usuarios')
     return result if isinstance(result, int) else None
 
 # ============================================
 # --- FUNCIONES DE REPORTES ---
 # ============================================
 
-def obtener_productos_bajo_stock() -> List[Dict[str, Any]]:
+def obtener_productos_bajo_stock() -> List[ProductoBajoStock]:
     """
     Obtiene productos con stock bajo o agotado.
     """
@@ -812,40 +1661,67 @@ def obtener_productos_bajo_stock() -> List[Dict[str, Any]]:
         p.sku,
         p.categoria,
         p.stock_minimo,
-        COALESCE(i.cantidad, 0) as stock_actual,
+        s.cantidad_total as stock_actual,
         p.ubicacion,
-        CASE 
-            WHEN COALESCE(i.cantidad, 0) <= p.stock_minimo AND COALESCE(i.cantidad, 0) > 0 THEN 'Low Stock'
-            WHEN COALESCE(i.cantidad, 0) = 0 THEN 'Out of Stock'
-            ELSE 'In Stock'
-        END as estado
-    FROM productos p
-    LEFT JOIN inventario i ON p.id = i.producto_id
+        s.estado
+    FROM stock_resumen s
+    JOIN productos p ON p.id = s.producto_id
     WHERE p.activo = 1 
-    AND (COALESCE(i.cantidad, 0) <= p.stock_minimo OR COALESCE(i.cantidad, 0) = 0)
+    AND (s.cantidad_total <= p.stock_minimo OR s.cantidad_total = 0)
     ORDER BY stock_actual ASC
     """
-    result = execute_query(sql, fetch=True)
-    
-    productos = []
-    if isinstance(result, list):
-        for row in result:
-            productos.append({
-                'nombre': row[0],
-                'sku': row[1],
-                'categoria': row[2],
-                'stock_minimo': row[3],
-                'stock_actual': row[4],
-                'ubicacion': row[5],
-                'estado': row[6]
-            })
-    return productos
+    result = execute_query(sql, fetch=True, modelo=ProductoBajoStock)
+    return result if isinstance(result, list) else []
+
+def obtener_resumen_movimientos(fecha_inicio: str, fecha_fin: str) -> List[ResumenMovimiento]:
+    """
+    Reporte de entradas y salidas por producto entre dos fechas ('YYYY-MM-DD', inclusivas).
+    """
+    sql = """
+    SELECT 
+        p.nombre,
+        p.sku,
+        SUM(CASE WHEN m.tipo = 'IN' THEN m.cantidad ELSE 0 END) as entradas,
+        SUM(CASE WHEN m.tipo = 'OUT' THEN m.cantidad ELSE 0 END) as salidas,
+        SUM(CASE m.tipo WHEN 'IN' THEN m.cantidad WHEN 'OUT' THEN -m.cantidad ELSE 0 END) as neto,
+        COUNT(*) as movimientos
+    FROM movimientos m
+    JOIN productos p ON p.id = m.producto_id
+    WHERE m.fecha_movimiento >= ? AND m.fecha_movimiento < ?
+    GROUP BY m.producto_id
+    ORDER BY salidas DESC, entradas DESC
+    """
+    result = execute_query(sql, rango_fechas(fecha_inicio, fecha_fin), fetch=True, modelo=ResumenMovimiento)
+    return result if isinstance(result, list) else []
+
+def iterar_inventario(tamano_lote: int = TAMANO_LOTE_STREAMING) -> IteradorConsulta:
+    """
+    Todos los productos activos con su stock (filas Producto, como get_all_products)
+    en streaming, ordenados por nombre. Para exportaciones del inventario.
+    """
+    sql = """
+    SELECT 
+        producto_id,
+        nombre,
+        sku,
+        categoria,
+        cantidad_total,
+        unidad_medida,
+        ubicacion,
+        COALESCE(precio, 0),
+        proveedor,
+        estado,
+        disponible
+    FROM vista_inventario_completo
+    ORDER BY nombre ASC
+    """
+    return iter_query(sql, (), tamano_lote, modelo=Producto)
 
 # ============================================
 # --- FUNCIONES DE DIAGNÓSTICO ---
 # ============================================
 
-def verificar_inventario() -> List[Dict[str, Any]]:
+def verificar_inventario() -> List[ProblemaInventario]:
     """
     Verifica inconsistencias en el inventario.
     """
@@ -868,20 +1744,46 @@ def verificar_inventario() -> List[Dict[str, Any]]:
     WHERE p.activo = 1
     AND (ub.id IS NULL OR i.cantidad < 0 OR i.cantidad > 1000)
     """
-    result = execute_query(sql, fetch=True)
-    
-    problemas = []
-    if isinstance(result, list):
-        for row in result:
-            problemas.append({
-                'producto': row[0],
-                'sku': row[1],
-                'ubicacion_producto': row[2],
-                'ubicacion_inventario': row[3],
-                'cantidad': row[4],
-                'estado': row[5]
-            })
-    return problemas
+    result = execute_query(sql, fetch=True, modelo=ProblemaInventario)
+    return result if isinstance(result, list) else []
+
+def iterar_diferencias_stock(tamano_lote: int = TAMANO_LOTE_STREAMING) -> IteradorConsulta:
+    """
+    Conciliación: pares producto/ubicación cuyo stock en 'inventario' no coincide
+    con entradas menos salidas registradas en 'movimientos' (filas DiferenciaStock).
+    Recorre todo el historial en SQLite; en Python solo se reciben las diferencias.
+    """
+    sql = """
+    WITH calculado AS (
+        SELECT 
+            producto_id,
+            ubicacion_id,
+            SUM(CASE tipo WHEN 'IN' THEN cantidad WHEN 'OUT' THEN -cantidad ELSE 0 END) as neto
+        FROM movimientos
+        WHERE ubicacion_id IS NOT NULL
+        GROUP BY producto_id, ubicacion_id
+    ),
+    pares AS (
+        SELECT producto_id, ubicacion_id FROM inventario
+        UNION
+        SELECT producto_id, ubicacion_id FROM calculado
+    )
+    SELECT 
+        p.id,
+        p.sku,
+        p.nombre,
+        ub.codigo,
+        COALESCE(i.cantidad, 0) as registrado,
+        COALESCE(c.neto, 0) as calculado
+    FROM pares x
+    JOIN productos p ON p.id = x.producto_id
+    LEFT JOIN ubicaciones ub ON ub.id = x.ubicacion_id
+    LEFT JOIN inventario i ON i.producto_id = x.producto_id AND i.ubicacion_id = x.ubicacion_id
+    LEFT JOIN calculado c ON c.producto_id = x.producto_id AND c.ubicacion_id = x.ubicacion_id
+    WHERE COALESCE(i.cantidad, 0) <> COALESCE(c.neto, 0)
+    ORDER BY p.nombre, ub.codigo
+    """
+    return iter_query(sql, (), tamano_lote, modelo=DiferenciaStock)
 
 def resetear_inventario(producto_id: int, cantidad: int) -> bool:
     """
@@ -889,45 +1791,38 @@ def resetear_inventario(producto_id: int, cantidad: int) -> bool:
     Útil para corrección de datos.
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Obtener ubicación predeterminada
-        sql_ubicacion = "SELECT id FROM ubicaciones WHERE activo = 1 LIMIT 1"
-        cursor.execute(sql_ubicacion)
-        ubicacion = cursor.fetchone()
-        
-        if not ubicacion:
-            return False
+        with managed_connection() as conn:
+            cursor = conn.cursor()
             
-        ubicacion_id = ubicacion[0]
-        
-        # Eliminar registros existentes
-        sql_delete = "DELETE FROM inventario WHERE producto_id = ?"
-        cursor.execute(sql_delete, (producto_id,))
-        
-        # Insertar nuevo registro
-        sql_insert = """
-        INSERT INTO inventario (producto_id, ubicacion_id, cantidad)
-        VALUES (?, ?, ?)
-        """
-        cursor.execute(sql_insert, (producto_id, ubicacion_id, cantidad))
-        
-        # Registrar movimiento
-        sql_movimiento = """
-        INSERT INTO movimientos 
-        (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
-         razon, razon_detalle, usuario_id, observaciones)
-        VALUES ('IN', ?, ?, ?, 0, ?, 'reset', 'Reset manual de inventario', 1, 'Reset de sistema')
-        """
-        cursor.execute(sql_movimiento, (producto_id, ubicacion_id, cantidad, cantidad))
-        
-        conn.commit()
-        return True
+            # Obtener ubicación predeterminada (en caché)
+            ubicacion_id = obtener_ubicacion_predeterminada()
+            
+            if ubicacion_id is None:
+                return False
+            
+            # Eliminar registros existentes
+            sql_delete = "DELETE FROM inventario WHERE producto_id = ?"
+            cursor.execute(sql_delete, (producto_id,))
+            
+            # Insertar nuevo registro
+            sql_insert = """
+            INSERT INTO inventario (producto_id, ubicacion_id, cantidad)
+            VALUES (?, ?, ?)
+            """
+            cursor.execute(sql_insert, (producto_id, ubicacion_id, cantidad))
+            
+            # Registrar movimiento
+            sql_movimiento = """
+            INSERT INTO movimientos 
+            (tipo, producto_id, ubicacion_id, cantidad, cantidad_anterior, cantidad_nueva,
+             razon, razon_detalle, usuario_id, observaciones)
+            VALUES ('IN', ?, ?, ?, 0, ?, 'reset', 'Reset manual de inventario', 1, 'Reset de sistema')
+            """
+            cursor.execute(sql_movimiento, (producto_id, ubicacion_id, cantidad, cantidad))
+            
+            conn.commit()
+            return True
         
     except sqlite3.Error as e:
         print(f"Error al resetear inventario: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
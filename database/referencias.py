@@ -0,0 +1,75 @@
+# database/referencias.py - Caché de datos de referencia
+"""
+Caché en memoria para tablas que casi nunca cambian (configuracion,
+ubicaciones, usuarios). Las funciones de queries.py que escriben en esas
+tablas invalidan su entrada (write-through), así que las lecturas repetidas
+en rutas calientes no vuelven a consultar la BD.
+
+Los cambios hechos por otro proceso no se detectan: para eso existe
+invalidar(). La caché se vacía sola si cambia la ruta de la BD.
+"""
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import connection
+
+
+class CacheReferencias:
+    """Valores cargados por (tabla, clave), con contadores de aciertos y fallos."""
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._datos: Dict[Tuple[str, str], Any] = {}
+        # Generación por tabla: una carga que se cruza con una invalidación no se guarda
+        self._generaciones: Dict[str, int] = {}
+        self._generacion_global: int = 0
+        self._ruta: Optional[str] = None
+        self.aciertos: int = 0
+        self.fallos: int = 0
+
+    def obtener(self, tabla: str, clave: str, cargar: Callable[[], Any]) -> Any:
+        """
+        Retorna el valor guardado para (tabla, clave) o lo carga con 'cargar()'.
+        Los resultados vacíos (None, [], {}) no se guardan: pueden deberse a un error de BD.
+        """
+        with self._lock:
+            if self._ruta != connection.DB_PATH:
+                self._datos.clear()
+                self._ruta = connection.DB_PATH
+            if (tabla, clave) in self._datos:
+                self.aciertos += 1
+                return self._datos[(tabla, clave)]
+            self.fallos += 1
+            generacion = (self._generaciones.get(tabla, 0), self._generacion_global)
+
+        valor = cargar()
+
+        with self._lock:
+            vigente = (self._generaciones.get(tabla, 0), self._generacion_global) == generacion
+            if valor and vigente and self._ruta == connection.DB_PATH:
+                self._datos[(tabla, clave)] = valor
+        return valor
+
+    def invalidar(self, tabla: Optional[str] = None) -> None:
+        """Descarta las entradas de una tabla (o todas si no se indica)."""
+        with self._lock:
+            if tabla is None:
+                self._datos.clear()
+                self._generacion_global += 1
+                return
+            for llave in [llave for llave in self._datos if llave[0] == tabla]:
+                del self._datos[llave]
+            self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Aciertos, fallos y cantidad de entradas guardadas."""
+        with self._lock:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'entradas': len(self._datos)}
+
+
+_cache = CacheReferencias()
+
+
+def get_cache_referencias() -> CacheReferencias:
+    """Retorna la caché de referencias del proceso."""
+    return _cache
@@ -1,18 +1,41 @@
+import importlib
+import threading
 import tkinter as tk
-from typing import Optional
-
-# Services
-from services.inv_manager import InventoryManager
+from typing import Any, Dict, Optional, Tuple
 
 # Components
-from gui.components.sidebar import Sidebar
+from gui.arranque import tiempos
+from gui.components.sidebar import Sidebar, SIDEBAR_COLORS
+from gui.components.db_executor import iniciar_executor
+from gui.components.widgets import IndicadorOcupado
+from gui.components.gestor_vistas import GestorVistas
 
-# Vistas
+# Vistas: solo el login se importa al arrancar; el resto al mostrarlas por primera vez
 from views.login import LoginView
-from views.inventario import InventarioView
-from views.movimientos import MovimientosView
-from views.envios import EnviosView
-from views.salidas import SalidasView
+
+VISTAS: Dict[str, Tuple[str, str]] = {
+    "Inventario": ("views.inventario", "InventarioView"),
+    "Movimientos": ("views.movimientos", "MovimientosView"),
+    "Envios": ("views.envios", "EnviosView"),
+    "Salidas": ("views.salidas", "SalidasView"),
+}
+
+def _clase_vista(nombre: str) -> Any:
+    """Importa (si hace falta) y retorna la clase de la vista 'nombre'."""
+    modulo, clase = VISTAS[nombre]
+    return getattr(importlib.import_module(modulo), clase)
+
+def _inicializar_bd() -> None:
+    """Hilo de trabajo: aplica las migraciones pendientes mientras se muestra el login."""
+    from database.connection import asegurar_inicializada
+    with tiempos.fase("bd"):
+        asegurar_inicializada()
+
+def _precargar_modulos() -> None:
+    """Hilo en segundo plano: importa las vistas que aún no se abrieron (no toca widgets)."""
+    for modulo, _clase in VISTAS.values():
+        importlib.import_module(modulo)
+    importlib.import_module("services.reportes")
 
 class MainApp:
     def __init__(self, root: tk.Tk) -> None:
@@ -22,10 +45,32 @@ class MainApp:
         self.root.geometry("1280x720")
         self.root.title("Almacen")
         
-        self.inv_manager: InventoryManager = InventoryManager()
+        self._inv_manager: Optional[Any] = None
         self.current_user_id: int = 1
         
+        # Las vistas consultan la BD en hilos de trabajo (ver db_executor)
+        self.executor = iniciar_executor(self.root)
+        
         self.show_login()
+        
+        # La BD se abre en segundo plano, después de dibujar el login
+        self.root.after_idle(self._despues_del_primer_pintado)
+
+    @property
+    def inv_manager(self) -> Any:
+        """InventoryManager compartido (se crea al usarlo por primera vez)."""
+        if self._inv_manager is None:
+            from services.inv_manager import InventoryManager
+            self._inv_manager = InventoryManager()
+        return self._inv_manager
+
+    def _despues_del_primer_pintado(self) -> None:
+        tiempos.hito("primer_pintado")
+        self.executor.enviar(
+            _inicializar_bd,
+            al_fallar=lambda e: print(f"❌ Error al inicializar la base de datos: {e}"),
+            clave="arranque.bd"
+        )
 
     def show_login(self) -> None:
         if self.current_frame:
@@ -36,9 +81,21 @@ class MainApp:
     def show_main_system(self) -> None:
         if self.current_frame:
             self.current_frame.destroy()
+        # La primera carga termina cuando el executor queda libre (el inventario ya muestra datos)
+        tiempos.comenzar("primera_carga")
+        self.executor.agregar_observador(self._al_cambiar_ocupado)
         self.current_frame = MainSystem(self.root, self)
         self.current_frame.pack(fill="both", expand=True)
 
+    def _al_cambiar_ocupado(self, ocupado: bool) -> None:
+        if ocupado:
+            return
+        self.executor.quitar_observador(self._al_cambiar_ocupado)
+        tiempos.terminar("primera_carga")
+        tiempos.reportar()
+        # Lo que no hace falta para la primera pantalla se prepara sin bloquear la interfaz
+        threading.Thread(target=_precargar_modulos, name="almacen-precarga", daemon=True).start()
+
 # En gui/app.py - Modificar la clase MainSystem
 class MainSystem(tk.Frame):
     def __init__(self, parent: tk.Widget, controller: MainApp) -> None:
@@ -49,33 +106,26 @@ class MainSystem(tk.Frame):
         self.sidebar: Sidebar = Sidebar(self, controller=self)
         self.sidebar.pack(side="left", fill="y")
         
+        # Aviso de consultas en curso (abajo del menú)
+        IndicadorOcupado(self.sidebar, controller.executor, bg=SIDEBAR_COLORS["bg"],
+                         fg=SIDEBAR_COLORS["text"], font=("Segoe UI", 9)).pack(side="bottom", pady=(0, 5))
+        
         # Contenedor para las Vistas
         self.view_container: tk.Frame = tk.Frame(self, bg="#F3F4F6")
         self.view_container.pack(side="right", fill="both", expand=True)
         
+        # Las vistas construidas se ocultan y reutilizan en vez de recrearse (ver GestorVistas)
+        self.vistas: GestorVistas = GestorVistas(self.view_container, {
+            nombre: (lambda contenedor, n=nombre: _clase_vista(n)(contenedor)) for nombre in VISTAS
+        })
+        
         # Cargar vista por defecto
         self.show_view("Inventario")
 
     def show_view(self, view_name: str) -> None:
         """Cambia la vista central y actualiza el sidebar."""
-        
-        # 1. Limpiar contenedor
-        for widget in self.view_container.winfo_children():
-            widget.destroy()
-            
-        # 2. Instanciar nueva vista
-        if view_name == "Inventario":
-            view = InventarioView(self.view_container)
-        elif view_name == "Movimientos":
-            view = MovimientosView(self.view_container)
-        elif view_name == "Envios":
-            view = EnviosView(self.view_container)
-        elif view_name == "Salidas":
-            view = SalidasView(self.view_container)
-        else:
+        if self.vistas.mostrar(view_name) is None:
             return
 
-        view.pack(fill="both", expand=True)
-        
-        # 3. Actualizar estado visual del sidebar
-        self.sidebar.set_active(view_name)
\ No newline at end of file
+        # Actualizar estado visual del sidebar
+        self.sidebar.set_active(view_name)
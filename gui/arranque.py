@@ -0,0 +1,95 @@
+# gui/arranque.py - Tiempos de las fases de arranque
+"""
+Mide cuánto tarda cada fase del arranque para detectar regresiones en las
+terminales lentas:
+
+- importaciones:  módulos que main.py necesita para mostrar el login
+- primer_pintado: desde el inicio del proceso hasta que el login se dibuja
+- bd:             inicialización de la base de datos (migraciones pendientes)
+- primera_carga:  desde que se acepta el login hasta que el inventario muestra datos
+
+Este módulo solo usa la biblioteca estándar y se importa primero en main.py,
+así el reloj arranca antes que todo lo demás.
+
+Al completarse la primera carga se imprime un resumen. Si la variable de
+entorno ALMACEN_TIEMPOS_ARRANQUE tiene una ruta, además se agrega una línea
+a ese archivo (fecha y milisegundos por fase) para seguir la evolución.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+TIEMPOS_ENV_VAR: str = "ALMACEN_TIEMPOS_ARRANQUE"
+
+# Orden en que se informan las fases
+FASES: tuple = ("importaciones", "primer_pintado", "bd", "primera_carga")
+
+
+class TiemposArranque:
+    """Duraciones (en ms) de las fases del arranque."""
+
+    def __init__(self) -> None:
+        self.inicio: float = time.perf_counter()
+        self.fases: Dict[str, float] = {}
+        self._inicios: Dict[str, float] = {}
+        self._reportado: bool = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def fase(self, nombre: str) -> Iterator[None]:
+        """Mide el bloque 'with' como la fase 'nombre'."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._registrar(nombre, (time.perf_counter() - t0) * 1000)
+
+    def comenzar(self, nombre: str) -> None:
+        """Inicia una fase que termina en otro punto del código (ver terminar)."""
+        self._inicios.setdefault(nombre, time.perf_counter())
+
+    def terminar(self, nombre: str) -> None:
+        """Cierra una fase abierta con comenzar() (las siguientes llamadas no hacen nada)."""
+        t0 = self._inicios.pop(nombre, None)
+        if t0 is not None:
+            self._registrar(nombre, (time.perf_counter() - t0) * 1000)
+
+    def hito(self, nombre: str) -> None:
+        """Registra el tiempo desde el inicio del proceso (solo la primera vez)."""
+        if nombre not in self.fases:
+            self._registrar(nombre, (time.perf_counter() - self.inicio) * 1000)
+
+    def resumen(self) -> str:
+        partes = [f"{nombre.replace('_', ' ')} {self.fases[nombre]:.0f} ms"
+                  for nombre in FASES if nombre in self.fases]
+        return "⏱️ Arranque: " + " · ".join(partes)
+
+    def reportar(self) -> None:
+        """Imprime el resumen (y lo agrega al archivo de ALMACEN_TIEMPOS_ARRANQUE). Solo una vez."""
+        if self._reportado:
+            return
+        self._reportado = True
+        print(self.resumen())
+
+        ruta: Optional[str] = os.environ.get(TIEMPOS_ENV_VAR)
+        if not ruta:
+            return
+        columnas = [datetime.now().isoformat(timespec="seconds")]
+        columnas += [f"{nombre}={self.fases[nombre]:.1f}" for nombre in FASES if nombre in self.fases]
+        try:
+            with open(ruta, "a", encoding="utf-8") as f:
+                f.write("\t".join(columnas) + "\n")
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar los tiempos de arranque en {ruta}: {e}")
+
+    def _registrar(self, nombre: str, ms: float) -> None:
+        # La fase 'bd' se mide en un hilo de trabajo
+        with self._lock:
+            self.fases[nombre] = ms
+
+
+# Instancia del proceso (el reloj empieza al importar este módulo)
+tiempos: TiemposArranque = TiemposArranque()
@@ -0,0 +1,169 @@
+# gui/components/busqueda.py - Búsqueda mientras se escribe
+"""
+Controlador para los campos de búsqueda que filtran mientras se escribe.
+
+- Debounce: cada tecla reinicia una espera corta; la búsqueda se lanza
+  cuando el usuario deja de escribir. Teclear un SKU de 12 caracteres hace
+  una sola búsqueda, no doce.
+- Cancelación: la búsqueda corre en el executor de BD con una 'clave'; una
+  nueva descarta la que estaba en curso. Las teclas que no cambian el
+  texto (flechas, Shift...) no buscan de nuevo.
+- Refinamiento incremental: si el texto nuevo extiende a uno ya buscado
+  ("torn" -> "tornillo"), se acota ese resultado anterior en vez de buscar
+  en todo el catálogo. Al borrar se reutilizan los resultados guardados.
+
+Uso desde una vista:
+    self.busqueda = ControladorBusqueda(
+        self, buscar=get_catalogo().filtrar, refinar=get_catalogo().refinar,
+        al_resultado=lambda texto, filas: self._mostrar_productos(filas),
+        clave="inventario.productos"
+    )
+    entry.bind("<KeyRelease>", lambda e: self.busqueda.escribir(entry.get()))
+
+Para refinar, 'buscar' debe retornar el resultado completo (sin límite).
+Los resultados guardados se descartan con buscar_ahora() o invalidar(),
+que las vistas usan al recargar después de modificar datos.
+"""
+import tkinter as tk
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from gui.components.db_executor import get_executor
+
+# Espera tras la última tecla antes de buscar
+DEMORA_MS: int = 250
+# Resultados recientes que se guardan para refinar o volver atrás al borrar
+MAX_RESULTADOS_GUARDADOS: int = 8
+
+
+def normalizar_termino(texto: str) -> str:
+    """Minúsculas y espacios simples: dos textos que buscan lo mismo dan el mismo término."""
+    return " ".join(texto.lower().split())
+
+
+class ControladorBusqueda:
+    """
+    Debounce, cancelación y refinamiento incremental de una búsqueda.
+
+    Con 'buscar' la búsqueda corre en el executor y el resultado llega a
+    al_resultado(texto, resultado) en el hilo de Tk. Sin 'buscar' solo se
+    aplica el debounce y se llama a al_disparar(texto), para vistas que ya
+    lanzan su propia consulta (p. ej. el historial paginado).
+    """
+
+    def __init__(
+        self,
+        widget: tk.Misc,
+        buscar: Optional[Callable[[str], List[Any]]] = None,
+        al_resultado: Optional[Callable[[str, List[Any]], None]] = None,
+        al_fallar: Optional[Callable[[BaseException], None]] = None,
+        refinar: Optional[Callable[[List[Any], str], List[Any]]] = None,
+        al_disparar: Optional[Callable[[str], None]] = None,
+        clave: Optional[str] = None,
+        demora_ms: int = DEMORA_MS
+    ) -> None:
+        self.widget = widget
+        self.buscar = buscar
+        self.al_resultado = al_resultado
+        self.al_fallar = al_fallar
+        self.refinar = refinar
+        self.al_disparar = al_disparar
+        self.clave: str = clave or f"busqueda.{id(self)}"
+        self.demora_ms = demora_ms
+
+        self._temporizador: Optional[str] = None
+        self._texto_pendiente: str = ""
+        self._ultimo_termino: Optional[str] = None
+        self._resultados: "OrderedDict[str, List[Any]]" = OrderedDict()
+        # Contadores para diagnóstico: cuántas búsquedas fueron a la fuente y cuántas se refinaron
+        self.consultas: int = 0
+        self.refinamientos: int = 0
+
+    # --- API PÚBLICA (solo desde el hilo de Tk) ---
+
+    def escribir(self, texto: str) -> None:
+        """Registra una tecla: la búsqueda se lanza cuando pasa 'demora_ms' sin cambios."""
+        self._texto_pendiente = texto
+        self._cancelar_temporizador()
+        self._temporizador = self.widget.after(self.demora_ms, self._al_vencer)
+
+    def buscar_ahora(self, texto: str = "") -> None:
+        """Busca de inmediato y desde la fuente (botón Actualizar, recarga tras guardar)."""
+        self._cancelar_temporizador()
+        self.invalidar()
+        self._disparar(texto, forzar=True)
+
+    def cancelar(self) -> None:
+        """Descarta la búsqueda en espera y la que esté en curso."""
+        self._cancelar_temporizador()
+        self._ultimo_termino = None
+        get_executor().cancelar(self.clave)
+
+    def invalidar(self) -> None:
+        """Olvida los resultados guardados (los datos cambiaron)."""
+        self._resultados.clear()
+
+    # --- INTERNOS ---
+
+    def _cancelar_temporizador(self) -> None:
+        if self._temporizador is not None:
+            self.widget.after_cancel(self._temporizador)
+            self._temporizador = None
+
+    def _al_vencer(self) -> None:
+        self._temporizador = None
+        self._disparar(self._texto_pendiente, forzar=False)
+
+    def _disparar(self, texto: str, forzar: bool) -> None:
+        termino = normalizar_termino(texto)
+        if not forzar and termino == self._ultimo_termino:
+            return
+        self._ultimo_termino = termino
+
+        if self.al_disparar is not None:
+            self.al_disparar(texto)
+        if self.buscar is None:
+            return
+
+        guardado = self._resultados.get(termino)
+        if guardado is not None:
+            # Mismo término que una búsqueda reciente (p. ej. al borrar): sin consultar
+            get_executor().cancelar(self.clave)
+            self._resultados.move_to_end(termino)
+            self._entregar(texto, guardado)
+            return
+
+        base = self._base_para(termino) if self.refinar is not None else None
+        if base is not None:
+            self.refinamientos += 1
+            funcion: Callable[..., List[Any]] = self.refinar
+            args: Tuple[Any, ...] = (base, texto)
+        else:
+            self.consultas += 1
+            funcion, args = self.buscar, (texto,)
+
+        get_executor().enviar(
+            funcion, *args,
+            al_terminar=lambda resultado: self._recibir(termino, texto, resultado),
+            al_fallar=self.al_fallar,
+            clave=self.clave
+        )
+
+    def _base_para(self, termino: str) -> Optional[List[Any]]:
+        """El resultado guardado más específico cuyo término es prefijo del nuevo."""
+        mejor: Optional[str] = None
+        for anterior in self._resultados:
+            if termino.startswith(anterior) and (mejor is None or len(anterior) > len(mejor)):
+                mejor = anterior
+        return self._resultados[mejor] if mejor is not None else None
+
+    def _recibir(self, termino: str, texto: str, resultado: List[Any]) -> None:
+        self._resultados[termino] = resultado
+        self._resultados.move_to_end(termino)
+        while len(self._resultados) > MAX_RESULTADOS_GUARDADOS:
+            self._resultados.popitem(last=False)
+        self._entregar(texto, resultado)
+
+    def _entregar(self, texto: str, resultado: List[Any]) -> None:
+        if self.al_resultado is not None:
+            self.al_resultado(texto, resultado)
@@ -0,0 +1,226 @@
+# gui/components/db_executor.py - Consultas de BD fuera del hilo de Tk
+"""
+Ejecuta el trabajo de base de datos en un pool de hilos y entrega los
+resultados al hilo de Tk, que es el único que puede tocar widgets.
+
+Los hilos de trabajo dejan (tarea, resultado, error) en una cola; el hilo
+principal la vacía con root.after() mientras haya tareas pendientes.
+
+Uso desde una vista:
+    get_executor().enviar(
+        get_catalogo().filtrar, texto,
+        al_terminar=self._mostrar_productos,
+        clave="inventario.productos",   # una búsqueda nueva descarta la anterior
+    )
+
+Las tareas con la misma 'clave' se reemplazan: si llega una nueva, la
+anterior se cancela (si no empezó) o su resultado se descarta (si ya corría).
+"""
+import queue
+import threading
+import tkinter as tk
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Hilos de trabajo (menos que las conexiones del pool, ver POOL_MAX_CONEXIONES)
+MAX_HILOS: int = 3
+INTERVALO_SONDEO_MS: int = 30
+
+
+class TareaBD:
+    """Trabajo enviado al executor. cancelar() evita que se entregue su resultado."""
+
+    def __init__(
+        self,
+        funcion: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        al_terminar: Optional[Callable[[Any], None]],
+        al_fallar: Optional[Callable[[BaseException], None]],
+        clave: Optional[str]
+    ) -> None:
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.clave = clave
+        self.cancelada: bool = False
+        self._futuro: Optional["Future[Any]"] = None
+
+    def cancelar(self) -> None:
+        self.cancelada = True
+        if self._futuro is not None:
+            self._futuro.cancel()  # solo tiene efecto si aún no empezó
+
+
+class DBExecutor:
+    """Pool de hilos para la BD con entrega de resultados en el hilo de Tk."""
+
+    def __init__(self, root: tk.Misc, max_hilos: int = MAX_HILOS) -> None:
+        self.root = root
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="almacen-bd")
+        self._resultados: "queue.Queue[Tuple[TareaBD, Any, Optional[BaseException]]]" = queue.Queue()
+        self._pendientes: List[TareaBD] = []
+        self._por_clave: Dict[str, TareaBD] = {}
+        self._observadores: List[Callable[[bool], None]] = []
+        self._sondeando: bool = False
+        self._cerrado: bool = False
+        self._estado_notificado: bool = False
+
+    # --- API PÚBLICA (solo desde el hilo de Tk) ---
+
+    def enviar(
+        self,
+        funcion: Callable[..., Any],
+        *args: Any,
+        al_terminar: Optional[Callable[[Any], None]] = None,
+        al_fallar: Optional[Callable[[BaseException], None]] = None,
+        clave: Optional[str] = None,
+        **kwargs: Any
+    ) -> TareaBD:
+        """
+        Ejecuta funcion(*args, **kwargs) en un hilo de trabajo.
+        al_terminar(resultado) o al_fallar(excepción) se llaman en el hilo de Tk.
+        """
+        tarea = TareaBD(funcion, args, kwargs, al_terminar, al_fallar, clave)
+        if self._cerrado:
+            tarea.cancelada = True
+            return tarea
+
+        if clave is not None:
+            anterior = self._por_clave.get(clave)
+            if anterior is not None:
+                anterior.cancelar()
+            self._por_clave[clave] = tarea
+
+        self._pendientes.append(tarea)
+        tarea._futuro = self._pool.submit(self._ejecutar, tarea)
+        self._notificar()
+        self._programar_sondeo()
+        return tarea
+
+    def cancelar(self, clave: str) -> None:
+        """Cancela la tarea vigente con esa clave (si la hay)."""
+        tarea = self._por_clave.pop(clave, None)
+        if tarea is not None:
+            tarea.cancelar()
+            self._notificar()
+
+    @property
+    def ocupado(self) -> bool:
+        """True si hay alguna tarea no cancelada sin terminar."""
+        return any(not t.cancelada for t in self._pendientes)
+
+    def agregar_observador(self, callback: Callable[[bool], None]) -> None:
+        """callback(ocupado) se llama cuando el executor pasa de libre a ocupado o al revés."""
+        self._observadores.append(callback)
+
+    def quitar_observador(self, callback: Callable[[bool], None]) -> None:
+        if callback in self._observadores:
+            self._observadores.remove(callback)
+
+    def cerrar(self) -> None:
+        """Cancela lo pendiente y espera a que terminen las tareas en curso."""
+        self._cerrado = True
+        for tarea in self._pendientes:
+            tarea.cancelar()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    # --- INTERNOS ---
+
+    def _ejecutar(self, tarea: TareaBD) -> None:
+        """Corre en un hilo de trabajo: nunca toca widgets."""
+        if tarea.cancelada:
+            self._resultados.put((tarea, None, None))
+            return
+        try:
+            resultado = tarea.funcion(*tarea.args, **tarea.kwargs)
+            self._resultados.put((tarea, resultado, None))
+        except BaseException as e:
+            self._resultados.put((tarea, None, e))
+
+    def _programar_sondeo(self) -> None:
+        if not self._sondeando:
+            self._sondeando = True
+            self.root.after(INTERVALO_SONDEO_MS, self._sondear)
+
+    def _sondear(self) -> None:
+        """Entrega los resultados listos; se reprograma mientras haya pendientes."""
+        self._sondeando = False
+
+        # Las tareas canceladas antes de empezar nunca llegan a la cola
+        self._pendientes = [t for t in self._pendientes if not (t._futuro and t._futuro.cancelled())]
+        while True:
+            try:
+                tarea, resultado, error = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            if tarea in self._pendientes:
+                self._pendientes.remove(tarea)
+            if tarea.clave is not None and self._por_clave.get(tarea.clave) is tarea:
+                del self._por_clave[tarea.clave]
+            if not tarea.cancelada:
+                self._entregar(tarea, resultado, error)
+
+        self._notificar()
+        if self._pendientes and not self._cerrado:
+            self._programar_sondeo()
+
+    def _entregar(self, tarea: TareaBD, resultado: Any, error: Optional[BaseException]) -> None:
+        try:
+            if error is None:
+                if tarea.al_terminar is not None:
+                    tarea.al_terminar(resultado)
+            elif tarea.al_fallar is not None:
+                tarea.al_fallar(error)
+            else:
+                print(f"❌ Error en tarea de BD ({getattr(tarea.funcion, '__name__', tarea.funcion)}): {error}")
+        except tk.TclError as e:
+            # La vista que pidió el resultado ya fue destruida
+            print(f"⚠️ Resultado descartado: {e}")
+        except Exception:
+            # Un error en la vista no debe cortar la entrega del resto de resultados
+            traceback.print_exc()
+
+    def _notificar(self) -> None:
+        """Avisa a los observadores si cambió el estado ocupado/libre."""
+        ocupado = self.ocupado
+        if ocupado == self._estado_notificado:
+            return
+        self._estado_notificado = ocupado
+        for callback in list(self._observadores):
+            try:
+                callback(ocupado)
+            except tk.TclError:
+                self.quitar_observador(callback)
+
+
+_executor: Optional[DBExecutor] = None
+_lock_executor = threading.Lock()
+
+
+def iniciar_executor(root: tk.Misc) -> DBExecutor:
+    """Crea el executor del proceso asociado a la ventana principal."""
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = DBExecutor(root)
+        return _executor
+
+
+def get_executor() -> DBExecutor:
+    """Retorna el executor del proceso (requiere iniciar_executor)."""
+    if _executor is None:
+        raise RuntimeError("El executor de BD no fue iniciado (ver iniciar_executor)")
+    return _executor
+
+
+def cerrar_executor() -> None:
+    """Cierra el executor del proceso (al salir de la aplicación)."""
+    global _executor
+    with _lock_executor:
+        if _executor is not None:
+            _executor.cerrar()
+            _executor = None
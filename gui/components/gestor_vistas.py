@@ -0,0 +1,96 @@
+# gui/components/gestor_vistas.py - Ciclo de vida de las vistas principales
+"""
+Mantiene vivas las vistas ya construidas (Inventario, Movimientos, ...) y
+solo las oculta con pack_forget al cambiar de pestaña: volver a una vista
+no repite su construcción ni su carga inicial, y conserva su estado (el
+carrito de Envíos, los filtros del historial, la posición del scroll).
+
+Ganchos opcionales de cada vista:
+- on_activate(): se llama al volver a mostrarla; debe refrescar solo lo que
+  haya cambiado (las vistas usan actualizar_filas / reconciliar).
+- puede_descartarse() -> bool: si retorna False la vista no se expulsa
+  (p. ej. Envíos con productos en el carrito).
+
+Si hay más de 'max_vivas' vistas construidas se destruye la usada hace más
+tiempo (LRU), nunca la que se está mostrando.
+"""
+import tkinter as tk
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Vistas construidas que se mantienen a la vez
+MAX_VISTAS_VIVAS: int = 3
+
+
+class GestorVistas:
+    """Muestra vistas por nombre dentro de 'contenedor', reutilizándolas."""
+
+    def __init__(
+        self,
+        contenedor: tk.Widget,
+        fabricas: Dict[str, Callable[[tk.Widget], tk.Widget]],
+        max_vivas: int = MAX_VISTAS_VIVAS
+    ) -> None:
+        self.contenedor = contenedor
+        self.fabricas = fabricas
+        self.max_vivas = max_vivas
+        # Orden de uso: la última es la más reciente
+        self._vivas: "OrderedDict[str, tk.Widget]" = OrderedDict()
+        self.activa: Optional[str] = None
+
+    def mostrar(self, nombre: str) -> Optional[tk.Widget]:
+        """Muestra la vista 'nombre' (construyéndola si hace falta). Retorna la vista o None."""
+        fabrica = self.fabricas.get(nombre)
+        if fabrica is None:
+            return None
+
+        vista = self._vivas.get(nombre)
+        if vista is not None and not vista.winfo_exists():
+            del self._vivas[nombre]
+            vista = None
+
+        # Ocultar la vista actual (sigue viva)
+        if self.activa is not None and self.activa != nombre:
+            actual = self._vivas.get(self.activa)
+            if actual is not None and actual.winfo_exists():
+                actual.pack_forget()
+
+        if vista is None:
+            vista = fabrica(self.contenedor)
+            self._vivas[nombre] = vista
+            vista.pack(fill="both", expand=True)
+        else:
+            self._vivas.move_to_end(nombre)
+            vista.pack(fill="both", expand=True)
+            on_activate = getattr(vista, "on_activate", None)
+            if on_activate is not None:
+                on_activate()
+
+        self.activa = nombre
+        self._expulsar()
+        return vista
+
+    def vista(self, nombre: str) -> Optional[tk.Widget]:
+        """La vista viva con ese nombre (o None si no está construida)."""
+        return self._vivas.get(nombre)
+
+    def descartar(self, nombre: str) -> None:
+        """Destruye una vista para que se construya de nuevo la próxima vez."""
+        vista = self._vivas.pop(nombre, None)
+        if vista is not None:
+            vista.destroy()
+        if self.activa == nombre:
+            self.activa = None
+
+    def _expulsar(self) -> None:
+        """Destruye las vistas menos usadas que excedan el límite."""
+        for nombre in list(self._vivas):
+            if len(self._vivas) <= self.max_vivas:
+                break
+            if nombre == self.activa:
+                continue
+            vista = self._vivas[nombre]
+            puede_descartarse = getattr(vista, "puede_descartarse", None)
+            if puede_descartarse is not None and not puede_descartarse():
+                continue
+            self.descartar(nombre)
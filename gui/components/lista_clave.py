@@ -0,0 +1,136 @@
+# gui/components/lista_clave.py - Listas de widgets actualizadas por diferencias
+"""
+Lista de filas (un widget por elemento) que se actualiza comparando los
+datos nuevos con los que ya se muestran, en vez de destruir y recrear todo:
+
+- elemento nuevo          -> se crea su fila
+- elemento que ya no está -> se destruye su fila
+- elemento que cambió     -> se actualiza su fila (actualizar)
+- elemento igual          -> no se toca
+
+Cada elemento se identifica con 'clave' (p. ej. el id del producto). Las
+filas que no cambian conservan sus widgets, y con ellos lo que el usuario
+haya escrito en sus campos.
+
+Uso desde una vista:
+    self.lista = ListaConClave(
+        contenedor, clave=lambda item: item['id'],
+        crear=lambda padre, item: FilaCarrito(padre, item, self),
+        actualizar=lambda fila, item: fila.mostrar(item),
+        firma=lambda item: (item['cantidad'], item['precio']),
+        vacio=lambda padre: tk.Label(padre, text="Carrito vacío"),
+    )
+    self.lista.reconciliar(self.cart_items)
+"""
+import copy
+import tkinter as tk
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+
+class Cambios(NamedTuple):
+    """Resumen de una reconciliación (útil para diagnóstico)."""
+    creadas: int
+    actualizadas: int
+    eliminadas: int
+    reordenada: bool
+
+
+class ListaConClave:
+    """Filas empaquetadas en 'contenedor', una por elemento, reconciliadas por clave."""
+
+    def __init__(
+        self,
+        contenedor: tk.Widget,
+        clave: Callable[[Any], Hashable],
+        crear: Callable[[tk.Widget, Any], tk.Widget],
+        actualizar: Optional[Callable[[tk.Widget, Any], None]] = None,
+        firma: Optional[Callable[[Any], Any]] = None,
+        vacio: Optional[Callable[[tk.Widget], tk.Widget]] = None,
+        opciones_pack: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.contenedor = contenedor
+        self.clave = clave
+        self.crear = crear
+        self.actualizar = actualizar
+        # Valor que se compara para saber si un elemento cambió. Por defecto una
+        # copia superficial: sirve tanto para tuplas como para diccionarios que se modifican en el lugar
+        self.firma: Callable[[Any], Any] = firma or copy.copy
+        self.vacio = vacio
+        self.opciones_pack: Dict[str, Any] = opciones_pack or {"fill": "x", "pady": 2}
+
+        self._filas: Dict[Hashable, tk.Widget] = {}
+        self._firmas: Dict[Hashable, Any] = {}
+        self._orden: List[Hashable] = []
+        self._widget_vacio: Optional[tk.Widget] = None
+
+    # --- API PÚBLICA ---
+
+    def reconciliar(self, elementos: Sequence[Any]) -> Cambios:
+        """Deja las filas iguales a 'elementos' tocando solo las que cambiaron."""
+        claves = [self.clave(e) for e in elementos]
+        nuevas = set(claves)
+        if len(nuevas) != len(claves):
+            raise ValueError("ListaConClave: hay elementos con la clave repetida")
+
+        # 1. Filas que ya no están
+        eliminadas = 0
+        for clave in [c for c in self._orden if c not in nuevas]:
+            self._filas.pop(clave).destroy()
+            del self._firmas[clave]
+            eliminadas += 1
+        previas = [c for c in self._orden if c in nuevas]
+
+        # 2. Filas nuevas o con datos distintos
+        creadas = actualizadas = 0
+        for clave, elemento in zip(claves, elementos):
+            firma = self.firma(elemento)
+            fila = self._filas.get(clave)
+            if fila is None:
+                self._filas[clave] = self.crear(self.contenedor, elemento)
+                creadas += 1
+            elif firma != self._firmas[clave]:
+                if self.actualizar is not None:
+                    self.actualizar(fila, elemento)
+                else:
+                    # Sin función de actualización la fila se recrea en su lugar
+                    fila.destroy()
+                    self._filas[clave] = self.crear(self.contenedor, elemento)
+                    previas.remove(clave)
+                actualizadas += 1
+            self._firmas[clave] = firma
+
+        # 3. Orden: si las que quedaron siguen en el mismo orden y las nuevas van al
+        # final, solo se empaquetan las nuevas; si no, se re-empaqueta todo
+        reordenada = previas != claves[:len(previas)]
+        if reordenada:
+            for clave in previas:
+                self._filas[clave].pack_forget()
+            pendientes = claves
+        else:
+            pendientes = claves[len(previas):]
+        for clave in pendientes:
+            self._filas[clave].pack(**self.opciones_pack)
+        self._orden = claves
+
+        self._mostrar_vacio(not claves)
+        return Cambios(creadas, actualizadas, eliminadas, reordenada)
+
+    def fila(self, clave: Hashable) -> Optional[tk.Widget]:
+        """Widget de la fila con esa clave (o None)."""
+        return self._filas.get(clave)
+
+    def limpiar(self) -> None:
+        """Destruye todas las filas."""
+        self.reconciliar([])
+
+    # --- INTERNOS ---
+
+    def _mostrar_vacio(self, vacia: bool) -> None:
+        if self.vacio is None:
+            return
+        if vacia:
+            if self._widget_vacio is None:
+                self._widget_vacio = self.vacio(self.contenedor)
+            self._widget_vacio.pack(expand=True, pady=50)
+        elif self._widget_vacio is not None:
+            self._widget_vacio.pack_forget()
@@ -0,0 +1,476 @@
+# gui/components/tabla_virtual.py - Tabla con filas recicladas
+"""
+Tabla para listas largas (productos, movimientos): solo crea los widgets de
+las filas que caben en pantalla y, al hacer scroll, los reutiliza para
+mostrar otras filas de los datos. Cargar 50 o 50.000 filas cuesta lo mismo:
+los datos son una lista de modelos y los widgets, unos pocos por fila visible.
+
+Uso desde una vista:
+    tabla = TablaVirtual(parent, columnas=[
+        Columna("nombre", "PRODUCTO", peso=10, secundario=lambda p: p.sku, max_caracteres=25),
+        Columna("stock", "STOCK", peso=4, texto=lambda p: f"{p.stock} {p.unidad_medida}"),
+        Columna("estado", "ESTADO", peso=5, estilo=lambda p: COLORES_ESTADO[p.estado]),
+        Columna("acciones", "ACCIONES", peso=6, ordenable=False, acciones=[
+            AccionFila("ᴇᴅɪᴛ", lambda p: self.editar(p.id), fg="#2563EB"),
+        ]),
+    ])
+    tabla.set_filas(productos)
+
+Las celdas se recalculan desde la fila cuando cambia su contenido: para que
+una fila refleje un cambio de estado externo (p. ej. el carrito) basta con
+llamar a refrescar(). actualizar_filas() recibe una versión nueva de los
+mismos datos y solo redibuja las filas visibles que cambiaron.
+"""
+import tkinter as tk
+from dataclasses import dataclass, field
+from tkinter import ttk
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from gui.components.tooltip import ToolTip
+
+Fila = Any
+Estilo = Dict[str, Any]
+
+COLORES_TABLA: Dict[str, str] = {
+    "fondo": "#FFFFFF",
+    "cabecera_bg": "#FFFFFF",
+    "cabecera_fg": "#6B7280",
+    "texto": "#111827",
+    "texto_secundario": "#6B7280",
+    "borde": "#E5E7EB",
+    "icono_bg": "#F3F4F6",
+}
+
+ALTO_FILA: int = 48
+# Marca de "fila visual sin datos": distinta de cualquier fila, fuerza el redibujo
+_SIN_DATOS: Any = object()
+# Fracción recorrida a partir de la cual se avisa con al_acercarse_al_final
+UMBRAL_FINAL: float = 0.9
+
+
+@dataclass
+class AccionFila:
+    """Botón de una columna de acciones; comando(fila) recibe la fila mostrada."""
+    texto: str
+    comando: Callable[[Fila], None]
+    fg: str = "#111827"
+    bg: str = "#FFFFFF"
+    fuente: Tuple[Any, ...] = ("Segoe UI", 10)
+    ancho: Optional[int] = None
+    # Si retorna False el botón no se muestra en esa fila
+    visible: Optional[Callable[[Fila], bool]] = None
+    # Opciones extra del botón según la fila (text, bg, fg, state, cursor...)
+    estilo: Optional[Callable[[Fila], Estilo]] = None
+
+
+@dataclass
+class Columna:
+    """Definición de una columna: de dónde sale el texto y cómo se dibuja."""
+    clave: str
+    titulo: str
+    peso: int = 1
+    # Texto de la celda (por defecto getattr(fila, clave))
+    texto: Optional[Callable[[Fila], Any]] = None
+    # Segunda línea en gris debajo del texto (p. ej. el SKU)
+    secundario: Optional[Callable[[Fila], Any]] = None
+    # Opciones extra de la etiqueta según la fila (bg/fg de los badges de estado)
+    estilo: Optional[Callable[[Fila], Estilo]] = None
+    icono: Optional[str] = None
+    fuente: Tuple[Any, ...] = ("Segoe UI", 9)
+    fg: Optional[str] = None
+    anchor: str = "w"
+    # Recorta el texto y muestra el completo en un tooltip
+    max_caracteres: Optional[int] = None
+    ordenable: bool = True
+    # Valor por el que se ordena (por defecto getattr(fila, clave))
+    orden: Optional[Callable[[Fila], Any]] = None
+    acciones: List[AccionFila] = field(default_factory=list)
+
+    def valor(self, fila: Fila) -> Any:
+        return self.texto(fila) if self.texto else getattr(fila, self.clave, "")
+
+
+class _Celda:
+    """Widgets de una celda de una fila reciclable."""
+
+    def __init__(self, tabla: "TablaVirtual", fila: tk.Frame, columna: Columna) -> None:
+        colores = tabla.colores
+        self.columna = columna
+        self.marco = tk.Frame(fila, bg=colores["fondo"])
+        self.etiqueta: Optional[tk.Label] = None
+        self.secundaria: Optional[tk.Label] = None
+        self.tooltip: Optional[ToolTip] = None
+        self.botones: List[tk.Button] = []
+        self._visibles: Tuple[bool, ...] = ()
+
+        if columna.acciones:
+            for accion in columna.acciones:
+                opciones: Estilo = {"width": accion.ancho} if accion.ancho else {}
+                self.botones.append(tk.Button(
+                    self.marco, text=accion.texto, font=accion.fuente, fg=accion.fg, bg=accion.bg,
+                    relief="flat", cursor="hand2", **opciones
+                ))
+            return
+
+        if columna.icono:
+            tk.Label(self.marco, text=columna.icono, font=("Arial", 12), bg=colores["icono_bg"],
+                     width=3).pack(side="left", padx=(0, 10))
+
+        textos = tk.Frame(self.marco, bg=colores["fondo"])
+        textos.pack(side="left", fill="x", expand=True)
+        self.base: Estilo = {"bg": colores["fondo"], "fg": columna.fg or colores["texto"]}
+        # width=1: el ancho lo deciden los pesos de la columna, no el texto de cada fila
+        self.etiqueta = tk.Label(textos, font=columna.fuente, anchor=columna.anchor, width=1, **self.base)
+        self.etiqueta.pack(fill="x")
+        if columna.secundario:
+            self.secundaria = tk.Label(textos, font=("Segoe UI", 8), anchor=columna.anchor, width=1,
+                                       bg=colores["fondo"], fg=colores["texto_secundario"])
+            self.secundaria.pack(fill="x")
+        if columna.max_caracteres:
+            self.tooltip = ToolTip(self.etiqueta, "")
+
+    def mostrar(self, fila: Fila) -> None:
+        columna = self.columna
+        if self.botones:
+            self._mostrar_acciones(fila)
+            return
+
+        valor = columna.valor(fila)
+        texto = "" if valor is None else str(valor)
+        if columna.max_caracteres and len(texto) > columna.max_caracteres:
+            completo, texto = texto, texto[:columna.max_caracteres - 3] + "..."
+        else:
+            completo = ""
+        if self.tooltip is not None:
+            self.tooltip.text = completo
+
+        opciones = dict(self.base, text=texto)
+        if columna.estilo:
+            opciones.update(columna.estilo(fila))
+        self.etiqueta.config(**opciones)
+
+        if self.secundaria is not None:
+            secundario = columna.secundario(fila)
+            self.secundaria.config(text="" if secundario is None else str(secundario))
+
+    def _mostrar_acciones(self, fila: Fila) -> None:
+        acciones = self.columna.acciones
+        visibles = tuple(a.visible is None or bool(a.visible(fila)) for a in acciones)
+        if visibles != self._visibles:
+            # Se re-empaquetan en orden solo si cambió qué botones se ven
+            for boton in self.botones:
+                boton.pack_forget()
+            for boton, visible in zip(self.botones, visibles):
+                if visible:
+                    boton.pack(side="left", padx=(0, 2))
+            self._visibles = visibles
+        for accion, boton in zip(acciones, self.botones):
+            if accion.estilo:
+                boton.config(**accion.estilo(fila))
+
+
+class _FilaVisual:
+    """Una fila de widgets que se reutiliza para mostrar distintas filas de datos."""
+
+    def __init__(self, tabla: "TablaVirtual") -> None:
+        colores = tabla.colores
+        self.indice: Optional[int] = None
+        self.fila: Fila = _SIN_DATOS
+        self.marco = tk.Frame(tabla._cuerpo, bg=colores["fondo"])
+        self.celdas: List[_Celda] = []
+        for i, columna in enumerate(tabla.columnas):
+            self.marco.columnconfigure(i, weight=columna.peso, uniform="tabla_col")
+            celda = _Celda(tabla, self.marco, columna)
+            celda.marco.grid(row=0, column=i, sticky="we", padx=10)
+            for accion, boton in zip(columna.acciones, celda.botones):
+                boton.config(command=lambda a=accion: tabla._ejecutar_accion(self, a))
+            self.celdas.append(celda)
+        self.marco.rowconfigure(0, weight=1)
+        tk.Frame(self.marco, bg=colores["borde"], height=1).place(x=0, rely=1.0, y=-1, relwidth=1.0)
+
+    def mostrar(self, indice: int, fila: Fila) -> None:
+        self.indice = indice
+        self.fila = fila
+        for celda in self.celdas:
+            celda.mostrar(fila)
+
+
+class TablaVirtual(tk.Frame):
+    """
+    Tabla con cabecera ordenable cuyas filas se dibujan bajo demanda.
+
+    Mantiene la lista completa de filas en memoria (modelos, no widgets) y un
+    conjunto de filas visuales del tamaño del área visible.
+    """
+
+    def __init__(
+        self,
+        master: tk.Widget,
+        columnas: Sequence[Columna],
+        alto_fila: int = ALTO_FILA,
+        mensaje_vacio: str = "No hay datos",
+        al_acercarse_al_final: Optional[Callable[[], None]] = None,
+        ancho_minimo: int = 0,
+        clave_fila: Optional[Callable[[Fila], Hashable]] = None,
+        colores: Optional[Dict[str, str]] = None,
+        **kwargs: Any
+    ) -> None:
+        self.colores: Dict[str, str] = dict(COLORES_TABLA, **(colores or {}))
+        kwargs.setdefault("bg", self.colores["fondo"])
+        super().__init__(master, **kwargs)
+
+        self.columnas: List[Columna] = list(columnas)
+        self.alto_fila: int = alto_fila
+        self.mensaje_vacio: str = mensaje_vacio
+        self.al_acercarse_al_final = al_acercarse_al_final
+        self.ancho_minimo: int = ancho_minimo
+        # Identidad de una fila (p. ej. el id del producto) para conservar la posición al actualizar
+        self.clave_fila = clave_fila
+
+        self._datos: List[Fila] = []
+        self._filas_visuales: List[_FilaVisual] = []
+        self._desplazamiento: int = 0      # píxeles recorridos en vertical
+        self._desplazamiento_x: int = 0    # píxeles recorridos en horizontal
+        self._orden: Optional[Tuple[str, bool]] = None  # (clave, descendente)
+        self._titulos: Dict[str, tk.Label] = {}
+        self._pintado_pendiente: bool = False
+
+        self._construir()
+
+    # --- API PÚBLICA ---
+
+    @property
+    def filas(self) -> List[Fila]:
+        """Filas en el orden mostrado (no modificar: usar set_filas/agregar_filas)."""
+        return self._datos
+
+    def set_filas(self, filas: Sequence[Fila], conservar_posicion: bool = False) -> None:
+        """Reemplaza los datos; vuelve al inicio salvo que se pida conservar la posición."""
+        self._datos = list(filas)
+        self._aplicar_orden()
+        if not conservar_posicion:
+            self._desplazamiento = 0
+        self._mensaje.config(text=self.mensaje_vacio, fg=self.colores["texto_secundario"])
+        self._pintar()
+
+    def actualizar_filas(self, filas: Sequence[Fila]) -> None:
+        """
+        Reemplaza los datos por una versión más reciente de la misma lista (recarga
+        tras una venta o un ajuste): la primera fila visible sigue arriba aunque se
+        agreguen o quiten filas antes que ella, y solo se redibujan las filas
+        visibles cuyo contenido cambió.
+        """
+        ancla: Optional[Tuple[Hashable, int]] = None
+        if self.clave_fila is not None and self._datos:
+            primera, corrimiento = divmod(self._desplazamiento, self.alto_fila)
+            if primera < len(self._datos):
+                ancla = (self.clave_fila(self._datos[primera]), corrimiento)
+
+        self._datos = list(filas)
+        self._aplicar_orden()
+        if ancla is not None:
+            indice = next((i for i, f in enumerate(self._datos) if self.clave_fila(f) == ancla[0]), None)
+            if indice is not None:
+                self._desplazamiento = indice * self.alto_fila + ancla[1]
+        self._mensaje.config(text=self.mensaje_vacio, fg=self.colores["texto_secundario"])
+        self._pintar()
+
+    def agregar_filas(self, filas: Sequence[Fila]) -> None:
+        """Agrega filas al final (carga por páginas) sin mover el scroll."""
+        self._datos.extend(filas)
+        if self._orden is not None:
+            self._aplicar_orden()
+        self._pintar()
+
+    def mostrar_mensaje(self, texto: str, color: Optional[str] = None) -> None:
+        """Vacía la tabla y muestra un mensaje (p. ej. un error de carga)."""
+        self._datos = []
+        self._desplazamiento = 0
+        self._mensaje.config(text=texto, fg=color or self.colores["texto_secundario"])
+        self._pintar()
+
+    def set_pie(self, texto: str = "", color: Optional[str] = None) -> None:
+        """Texto informativo debajo de la tabla (vacío lo oculta)."""
+        self._pie.config(text=texto, fg=color or self.colores["texto_secundario"])
+        if texto:
+            self._pie.pack(fill="x", padx=10, pady=5)
+        else:
+            self._pie.pack_forget()
+
+    def refrescar(self) -> None:
+        """Vuelve a dibujar las filas visibles (tras cambiar un estado que afecta las celdas)."""
+        for fila_visual in self._filas_visuales:
+            fila_visual.fila = _SIN_DATOS
+        self._pintar()
+
+    def ordenar(self, clave: str, descendente: Optional[bool] = None) -> None:
+        """Ordena por la columna 'clave'; sin 'descendente' alterna el sentido actual."""
+        if descendente is None:
+            descendente = self._orden is not None and self._orden[0] == clave and not self._orden[1]
+        self._orden = (clave, descendente)
+        for columna in self.columnas:
+            flecha = ""
+            if columna.clave == clave:
+                flecha = " ▼" if descendente else " ▲"
+            if columna.clave in self._titulos:
+                self._titulos[columna.clave].config(text=columna.titulo + flecha)
+        self._aplicar_orden()
+        self._desplazamiento = 0
+        self.refrescar()
+
+    # --- CONSTRUCCIÓN ---
+
+    def _construir(self) -> None:
+        colores = self.colores
+
+        # Cabecera (se desplaza en horizontal junto con las filas)
+        self._marco_cabecera = tk.Frame(self, bg=colores["cabecera_bg"], height=44)
+        self._marco_cabecera.pack(fill="x")
+        self._cabecera = tk.Frame(self._marco_cabecera, bg=colores["cabecera_bg"])
+        for i, columna in enumerate(self.columnas):
+            self._cabecera.columnconfigure(i, weight=columna.peso, uniform="tabla_col")
+            titulo = tk.Label(self._cabecera, text=columna.titulo, font=("Segoe UI", 8, "bold"),
+                              fg=colores["cabecera_fg"], bg=colores["cabecera_bg"], anchor="w", width=1)
+            titulo.grid(row=0, column=i, sticky="we", padx=10, pady=14)
+            if columna.ordenable and not columna.acciones:
+                titulo.config(cursor="hand2")
+                titulo.bind("<Button-1>", lambda _e, clave=columna.clave: self.ordenar(clave))
+                self._titulos[columna.clave] = titulo
+        tk.Frame(self, bg=colores["borde"], height=1).pack(fill="x")
+
+        # Área de filas + scrollbars
+        self._area = tk.Frame(self, bg=colores["fondo"])
+        self._area.pack(fill="both", expand=True)
+        self._cuerpo = tk.Frame(self._area, bg=colores["fondo"])
+        self._scroll_y = ttk.Scrollbar(self._area, orient="vertical", command=self._yview)
+        self._scroll_x = ttk.Scrollbar(self._area, orient="horizontal", command=self._xview)
+        self._cuerpo.grid(row=0, column=0, sticky="nsew")
+        self._scroll_y.grid(row=0, column=1, sticky="ns")
+        self._area.grid_rowconfigure(0, weight=1)
+        self._area.grid_columnconfigure(0, weight=1)
+        if self.ancho_minimo:
+            self._scroll_x.grid(row=1, column=0, sticky="ew")
+
+        self._mensaje = tk.Label(self._cuerpo, text=self.mensaje_vacio, font=("Segoe UI", 10),
+                                 fg=colores["texto_secundario"], bg=colores["fondo"])
+        self._pie = tk.Label(self, font=("Segoe UI", 9), bg=colores["fondo"], anchor="w")
+
+        self._cuerpo.bind("<Configure>", lambda _e: self._programar_pintado())
+        self._enlazar_rueda(self._cuerpo)
+
+    def _enlazar_rueda(self, widget: tk.Widget) -> None:
+        """La rueda del mouse se enlaza a cada widget del pool (son pocos) en vez de bind_all."""
+        widget.bind("<MouseWheel>", self._on_mousewheel)
+        widget.bind("<Button-4>", lambda _e: self._yview("scroll", -1, "units"))
+        widget.bind("<Button-5>", lambda _e: self._yview("scroll", 1, "units"))
+        for hijo in widget.winfo_children():
+            self._enlazar_rueda(hijo)
+
+    def _asegurar_filas_visuales(self, alto_visible: int) -> None:
+        """Crea las filas visuales que falten para cubrir el alto visible (nunca se destruyen)."""
+        necesarias = alto_visible // self.alto_fila + 2
+        while len(self._filas_visuales) < necesarias:
+            fila_visual = _FilaVisual(self)
+            self._enlazar_rueda(fila_visual.marco)
+            self._filas_visuales.append(fila_visual)
+
+    # --- DIBUJO ---
+
+    def _programar_pintado(self) -> None:
+        # Varios <Configure> seguidos (al redimensionar) se resuelven en un solo pintado
+        if not self._pintado_pendiente:
+            self._pintado_pendiente = True
+            self.after_idle(self._pintar)
+
+    def _pintar(self) -> None:
+        self._pintado_pendiente = False
+        alto_visible = max(self._cuerpo.winfo_height(), 1)
+        ancho_visible = max(self._cuerpo.winfo_width(), 1)
+        ancho = max(ancho_visible, self.ancho_minimo)
+        total = len(self._datos) * self.alto_fila
+
+        self._desplazamiento = max(0, min(self._desplazamiento, total - alto_visible))
+        self._desplazamiento_x = max(0, min(self._desplazamiento_x, ancho - ancho_visible))
+        self._asegurar_filas_visuales(alto_visible)
+
+        primera, corrimiento = divmod(self._desplazamiento, self.alto_fila)
+        for k, fila_visual in enumerate(self._filas_visuales):
+            indice = primera + k
+            y = k * self.alto_fila - corrimiento
+            if indice >= len(self._datos) or y >= alto_visible:
+                fila_visual.marco.place_forget()
+                fila_visual.indice, fila_visual.fila = None, _SIN_DATOS
+                continue
+            fila = self._datos[indice]
+            # Solo se reconfiguran los widgets si la fila mostrada cambió de contenido
+            if fila_visual.fila != fila:
+                fila_visual.mostrar(indice, fila)
+            else:
+                fila_visual.indice = indice
+            fila_visual.marco.place(x=-self._desplazamiento_x, y=y, width=ancho, height=self.alto_fila)
+
+        if self._datos:
+            self._mensaje.place_forget()
+        else:
+            self._mensaje.place(relx=0.5, y=50, anchor="n")
+
+        self._cabecera.place(x=-self._desplazamiento_x, y=0, width=ancho, relheight=1.0)
+        self._scroll_x.set(self._desplazamiento_x / ancho, (self._desplazamiento_x + ancho_visible) / ancho)
+
+        if total <= alto_visible:
+            inicio, fin = 0.0, 1.0
+        else:
+            inicio = self._desplazamiento / total
+            fin = (self._desplazamiento + alto_visible) / total
+        self._scroll_y.set(inicio, fin)
+
+        if self.al_acercarse_al_final is not None and self._datos and fin >= UMBRAL_FINAL:
+            # Diferido: la vista puede estar agregando filas en este mismo momento
+            self.after_idle(self.al_acercarse_al_final)
+
+    # --- SCROLL ---
+
+    def _yview(self, *args: Any) -> None:
+        """Protocolo de ttk.Scrollbar: ('moveto', fracción) o ('scroll', n, 'units'|'pages')."""
+        total = len(self._datos) * self.alto_fila
+        alto_visible = self._cuerpo.winfo_height()
+        if args[0] == "moveto":
+            self._desplazamiento = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            paso = alto_visible if args[2] == "pages" else self.alto_fila
+            self._desplazamiento += int(args[1]) * paso
+        self._pintar()
+
+    def _xview(self, *args: Any) -> None:
+        ancho = max(self._cuerpo.winfo_width(), self.ancho_minimo, 1)
+        if args[0] == "moveto":
+            self._desplazamiento_x = int(float(args[1]) * ancho)
+        elif args[0] == "scroll":
+            self._desplazamiento_x += int(args[1]) * 40
+        self._pintar()
+
+    def _on_mousewheel(self, event: tk.Event) -> None:
+        # Windows manda múltiplos de 120; macOS valores pequeños
+        pasos = int(-event.delta / 120) or (-1 if event.delta > 0 else 1)
+        self._yview("scroll", pasos * 3, "units")
+
+    # --- ORDEN Y ACCIONES ---
+
+    def _aplicar_orden(self) -> None:
+        if self._orden is None:
+            return
+        clave, descendente = self._orden
+        columna = next((c for c in self.columnas if c.clave == clave), None)
+        if columna is None:
+            return
+        valor = columna.orden or (lambda fila: getattr(fila, clave, None))
+        # Se calcula el valor una sola vez por fila; los vacíos (None) quedan siempre al final
+        pares = [(valor(f), f) for f in self._datos]
+        con_valor = [(v.casefold() if isinstance(v, str) else v, f) for v, f in pares if v is not None]
+        con_valor.sort(key=lambda par: par[0], reverse=descendente)
+        self._datos = [f for _, f in con_valor] + [f for v, f in pares if v is None]
+
+    def _ejecutar_accion(self, fila_visual: _FilaVisual, accion: AccionFila) -> None:
+        indice = fila_visual.indice
+        if indice is not None and indice < len(self._datos):
+            accion.comando(self._datos[indice])
@@ -59,4 +59,27 @@ class EntryWithPlaceholder(tk.Entry):
             self.insert(0, text)
             self.config(fg=self.default_fg_color)
         else:
-            self._show_placeholder()
\ No newline at end of file
+            self._show_placeholder()
+
+
+class IndicadorOcupado(tk.Label):
+    """
+    Etiqueta que aparece mientras el executor de BD tiene tareas pendientes
+    y cambia el cursor de la ventana a 'watch'.
+    """
+
+    def __init__(self, master: tk.Widget, executor: Any, texto: str = "⏳ Cargando...", **kwargs: Any) -> None:
+        super().__init__(master, text="", **kwargs)
+        self.texto: str = texto
+        self.executor = executor
+        self.executor.agregar_observador(self._actualizar)
+        self.bind("<Destroy>", self._on_destroy)
+        self._actualizar(self.executor.ocupado)
+
+    def _actualizar(self, ocupado: bool) -> None:
+        self.config(text=self.texto if ocupado else "")
+        self.winfo_toplevel().config(cursor="watch" if ocupado else "")
+
+    def _on_destroy(self, event: tk.Event) -> None:
+        if event.widget is self:
+            self.executor.quitar_observador(self._actualizar)
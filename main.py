@@ -1,13 +1,15 @@
-import tkinter as tk
-from gui.app import MainApp
-from database.connection import initialize_db
+from gui.arranque import tiempos
+
+with tiempos.fase("importaciones"):
+    import tkinter as tk
+    from gui.app import MainApp
 
 def main() -> None:
     """
-    Función principal que inicializa la base de datos y la interfaz gráfica.
+    Función principal que inicializa la interfaz gráfica.
+    El login se muestra primero; la base de datos se inicializa en segundo
+    plano y las vistas se importan al abrirlas (ver gui/app.py).
     """
-    initialize_db()
-    
     root: tk.Tk = tk.Tk()
     root.title("Almacen")
     root.geometry("1024x768")
@@ -15,6 +17,14 @@ def main() -> None:
     app: MainApp = MainApp(root)
     
     root.mainloop()
+    
+    # Esperar las consultas en curso y cerrar las conexiones reutilizables al salir
+    from database.connection import get_manager
+    from database.catalogo import get_catalogo
+    from gui.components.db_executor import cerrar_executor
+    cerrar_executor()
+    get_catalogo().cerrar()
+    get_manager().close_all()
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,11 +1,46 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Literal, Optional, Dict, Any, List
-from database.queries import ajustar_stock, get_product_stock
+from database.asignacion import ESTRATEGIAS, EstrategiaAsignacion
+from database.queries import ajustar_stock, get_product_stock, obtener_disponible, registrar_movimientos_lote
 from services.auth_service import get_current_user
 
 # Definición de Tipos actualizados
 MovementType = Literal["IN", "OUT"]
 RazonType = Literal["venta", "ajuste manual", "dañado", "vencido", "robo", "uso interno", 
                     "transferencia", "recepcion", "compra", "merma", "devolucion"]
+ModoLote = Literal["todo_o_nada", "parcial"]
+
+# Mensaje de las líneas válidas que no se aplicaron porque otra línea del lote falló
+MENSAJE_LOTE_REVERTIDO: str = "No aplicada: otra línea del lote falló"
+
+@dataclass
+class LineaLote:
+    """Una línea de un lote de movimientos (manifiesto, carrito, recepción)."""
+    product_id: int
+    quantity: int
+    tipo: MovementType = "OUT"
+    razon: RazonType = "venta"
+    ubicacion_id: Optional[int] = None
+    razon_detalle: Optional[str] = None
+    observaciones: Optional[str] = None
+    referencia: Optional[str] = None
+
+@dataclass
+class LineaTransferencia:
+    """Una línea de transferencia de stock entre dos ubicaciones."""
+    product_id: int
+    quantity: int
+    ubicacion_origen_id: int
+    ubicacion_destino_id: int
+
+@dataclass
+class ResultadoLinea:
+    """Resultado de aplicar una línea de un lote."""
+    linea: LineaLote
+    exito: bool
+    mensaje: str = ""
 
 class InventoryManager:
     """
@@ -80,7 +115,8 @@ class InventoryManager:
         ubicacion_id: Optional[int] = None,
         razon_detalle: Optional[str] = None,
         observaciones: Optional[str] = None,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        estrategia: Optional[EstrategiaAsignacion] = None
     ) -> bool:
         """
         Disminuye stock validando reglas de negocio.
@@ -89,10 +125,12 @@ class InventoryManager:
             product_id: ID del producto
             quantity: Cantidad a retirar
             razon: Razón de la salida
-            ubicacion_id: ID de la ubicación
+            ubicacion_id: ID de la ubicación (si no se indica, la cantidad se reparte
+                entre las ubicaciones que tienen el producto)
             razon_detalle: Detalle adicional de la razón
             observaciones: Observaciones del movimiento
             user_id: ID del usuario
+            estrategia: Cómo repartir la salida sin ubicación (por defecto, la configurada)
             
         Returns:
             bool: True si la operación fue exitosa
@@ -102,6 +140,7 @@ class InventoryManager:
 
         # Validar reglas de negocio
         self._validar_reglas_salida(razon, quantity)
+        self._validar_estrategia(estrategia)
 
         # Obtener usuario
         if not user_id:
@@ -109,20 +148,28 @@ class InventoryManager:
                 raise ValueError("No hay usuario autenticado")
             user_id = self.current_user.id
 
-        # Obtener ubicación si no se especifica
+        # Sin ubicación: un movimiento por ubicación usada, todos en una transacción
         if not ubicacion_id:
-            ubicacion_id = self._obtener_ubicacion_predeterminada()
-
-        # Verificar stock disponible
-        if ubicacion_id:
-            stock_actual = get_product_stock(product_id, ubicacion_id)
-        else:
-            stock_actual = get_product_stock(product_id)
-            
-        if stock_actual < quantity:
-            raise ValueError(f"Stock insuficiente. Disponible: {stock_actual}, Solicitado: {quantity}")
+            referencia = f"SAL-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+            resultado_bd = registrar_movimientos_lote([{
+                'tipo': 'OUT',
+                'producto_id': product_id,
+                'ubicacion_id': None,
+                'cantidad': quantity,
+                'razon': razon,
+                'razon_detalle': razon_detalle,
+                'observaciones': observaciones,
+                'referencia': referencia,
+                'usuario_id': user_id,
+            }], estrategia=estrategia)
+            if resultado_bd is None:
+                raise ValueError("Error al registrar la salida en la base de datos.")
+            if resultado_bd[0]:
+                raise ValueError(resultado_bd[0])
+            return True
 
-        # Registrar el movimiento de salida
+        # Registrar el movimiento de salida (ajustar_stock valida el stock
+        # dentro de la misma transacción, así que no se pre-consulta aquí)
         success = ajustar_stock(
             producto_id=product_id,
             ubicacion_id=ubicacion_id,
@@ -135,6 +182,10 @@ class InventoryManager:
         )
         
         if not success:
+            # Lo reservado por órdenes pendientes no está disponible para salir
+            disponible = obtener_disponible(product_id, ubicacion_id)
+            if disponible < quantity:
+                raise ValueError(f"Stock insuficiente. Disponible: {max(disponible, 0)}, Solicitado: {quantity}")
             raise ValueError("Error al registrar la salida en la base de datos.")
         
         return True
@@ -221,33 +272,149 @@ class InventoryManager:
         user_id: Optional[int] = None
     ) -> bool:
         """
-        Transfiere stock entre ubicaciones.
+        Transfiere stock entre ubicaciones (salida y entrada en una sola transacción).
         """
-        try:
-            # Sacar de la ubicación origen
-            self.registrar_salida(
-                product_id=product_id,
-                quantity=cantidad,
-                razon="transferencia",
-                ubicacion_id=ubicacion_origen_id,
-                razon_detalle=f"Transferencia a ubicación {ubicacion_destino_id}",
-                user_id=user_id
-            )
+        self.transferir_lote(
+            [LineaTransferencia(product_id, cantidad, ubicacion_origen_id, ubicacion_destino_id)],
+            user_id=user_id
+        )
+        return True
+
+    def transferir_lote(
+        self,
+        lineas: List[LineaTransferencia],
+        user_id: Optional[int] = None
+    ) -> str:
+        """
+        Transfiere varias líneas (producto, origen, destino, cantidad) de forma atómica.
+        Cada línea genera una salida en el origen y una entrada en el destino; todos
+        los movimientos comparten la referencia 'TRF-...' de la transferencia.
+        Las líneas se aplican en orden, así que una línea puede mover stock que
+        otra anterior acaba de dejar en su origen.
+        
+        Returns:
+            str: Referencia de la transferencia
             
-            # Meter en la ubicación destino
-            self.registrar_entrada(
-                product_id=product_id,
-                quantity=cantidad,
+        Raises:
+            ValueError: Si alguna línea no es válida (no se aplica ninguna)
+        """
+        if not lineas:
+            raise ValueError("Error en transferencia: no hay líneas para transferir")
+
+        referencia = f"TRF-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+        movimientos: List[LineaLote] = []
+        for linea in lineas:
+            if linea.ubicacion_origen_id == linea.ubicacion_destino_id:
+                raise ValueError("Error en transferencia: origen y destino son la misma ubicación")
+            movimientos.append(LineaLote(
+                product_id=linea.product_id,
+                quantity=linea.quantity,
+                tipo="OUT",
                 razon="transferencia",
-                ubicacion_id=ubicacion_destino_id,
-                razon_detalle=f"Transferencia desde ubicación {ubicacion_origen_id}",
-                user_id=user_id
-            )
+                ubicacion_id=linea.ubicacion_origen_id,
+                razon_detalle=f"Transferencia a ubicación {linea.ubicacion_destino_id}",
+                referencia=referencia
+            ))
+            movimientos.append(LineaLote(
+                product_id=linea.product_id,
+                quantity=linea.quantity,
+                tipo="IN",
+                razon="transferencia",
+                ubicacion_id=linea.ubicacion_destino_id,
+                razon_detalle=f"Transferencia desde ubicación {linea.ubicacion_origen_id}",
+                referencia=referencia
+            ))
+
+        resultados = self.aplicar_lote(movimientos, modo="todo_o_nada", user_id=user_id)
+        # Solo se reportan los motivos reales, no las líneas arrastradas por el rollback
+        fallos = [r for r in resultados if not r.exito and r.mensaje != MENSAJE_LOTE_REVERTIDO]
+        if fallos:
+            detalle = "; ".join(f"producto {r.linea.product_id}: {r.mensaje}" for r in fallos)
+            raise ValueError(f"Error en transferencia: {detalle}")
+        return referencia
+
+    def aplicar_lote(
+        self,
+        lineas: List[LineaLote],
+        modo: ModoLote = "todo_o_nada",
+        user_id: Optional[int] = None,
+        estrategia: Optional[EstrategiaAsignacion] = None
+    ) -> List[ResultadoLinea]:
+        """
+        Aplica varias entradas/salidas con una consulta de stock y una transacción.
+        Las salidas sin ubicación se reparten entre las ubicaciones del producto;
+        las entradas sin ubicación van a la ubicación predeterminada.
+        
+        Args:
+            lineas: Líneas del lote, en el orden en que deben aplicarse
+            modo: 'todo_o_nada' no aplica nada si alguna línea falla;
+                  'parcial' aplica las válidas y reporta las demás
+            user_id: ID del usuario (por defecto, el usuario actual)
+            estrategia: Cómo repartir las salidas sin ubicación (por defecto, la configurada)
             
-            return True
-        except ValueError as e:
-            # En un sistema más complejo, aquí se haría rollback
-            raise ValueError(f"Error en transferencia: {e}")
+        Returns:
+            List[ResultadoLinea]: Un resultado por línea, en el mismo orden
+        """
+        self._validar_estrategia(estrategia)
+        if not user_id:
+            if not self.current_user:
+                raise ValueError("No hay usuario autenticado")
+            user_id = self.current_user.id
+
+        ubicacion_predeterminada: Optional[int] = None
+        if any(not linea.ubicacion_id and linea.tipo == "IN" for linea in lineas):
+            ubicacion_predeterminada = self._obtener_ubicacion_predeterminada()
+
+        # Reglas de negocio por línea (sin tocar la BD)
+        errores: List[Optional[str]] = []
+        for linea in lineas:
+            try:
+                if linea.quantity <= 0:
+                    raise ValueError("La cantidad debe ser mayor a 0.")
+                if linea.tipo == "OUT":
+                    self._validar_reglas_salida(linea.razon, linea.quantity)
+                errores.append(None)
+            except ValueError as e:
+                errores.append(str(e))
+
+        validas = [i for i, error in enumerate(errores) if error is None]
+        if validas and not (modo == "todo_o_nada" and len(validas) < len(lineas)):
+            movimientos = [
+                {
+                    'tipo': lineas[i].tipo,
+                    'producto_id': lineas[i].product_id,
+                    'ubicacion_id': lineas[i].ubicacion_id or (
+                        ubicacion_predeterminada if lineas[i].tipo == "IN" else None
+                    ),
+                    'cantidad': lineas[i].quantity,
+                    'razon': lineas[i].razon,
+                    'razon_detalle': lineas[i].razon_detalle,
+                    'observaciones': lineas[i].observaciones,
+                    'referencia': lineas[i].referencia,
+                    'usuario_id': user_id,
+                }
+                for i in validas
+            ]
+            resultado_bd = registrar_movimientos_lote(
+                movimientos, todo_o_nada=(modo == "todo_o_nada"), estrategia=estrategia
+            )
+            if resultado_bd is None:
+                raise ValueError("Error al registrar el lote en la base de datos.")
+            for i, error in zip(validas, resultado_bd):
+                errores[i] = error
+            aplicado = not (modo == "todo_o_nada" and any(resultado_bd))
+        else:
+            aplicado = False
+
+        resultados: List[ResultadoLinea] = []
+        for linea, error in zip(lineas, errores):
+            if error:
+                resultados.append(ResultadoLinea(linea, False, error))
+            elif aplicado:
+                resultados.append(ResultadoLinea(linea, True))
+            else:
+                resultados.append(ResultadoLinea(linea, False, MENSAJE_LOTE_REVERTIDO))
+        return resultados
 
     # --- MÉTODOS PRIVADOS (Helpers internos) ---
 
@@ -268,6 +435,11 @@ class InventoryManager:
             # Validaciones para mermas
             pass
 
+    def _validar_estrategia(self, estrategia: Optional[str]) -> None:
+        """La estrategia de asignación indicada debe existir (None usa la configurada)."""
+        if estrategia is not None and estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia de asignación no válida: {estrategia}")
+
     def _obtener_ubicacion_predeterminada(self) -> int:
         """
         Obtiene la primera ubicación disponible.
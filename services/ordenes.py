@@ -0,0 +1,138 @@
+# services/ordenes.py - Colocación de órdenes de venta
+"""
+Crea una orden y descuenta su stock de forma atómica (ver
+queries.registrar_orden_venta): la disponibilidad de todas las líneas se
+comprueba con una consulta y la orden, sus detalles y sus salidas se
+escriben en la misma transacción BEGIN IMMEDIATE.
+
+Si falta stock para alguna línea no se crea la orden: nunca queda una orden
+confirmada con stock sin descontar. Varias terminales pueden cobrar a la vez;
+la segunda espera el bloqueo de escritura y valida contra el stock ya
+descontado por la primera.
+
+Las órdenes que se despachan después (p. ej. pedidos web) se colocan con
+reservar=True: en vez de descontar, reservan el stock hasta completar_orden()
+o cancelar_orden(). La disponibilidad siempre descuenta lo reservado, así
+que dos órdenes pendientes no prometen las mismas unidades
+(ver disponible_para_prometer).
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from database.asignacion import ESTRATEGIAS, EstrategiaAsignacion
+from database.queries import cancelar_orden as cancelar_orden_bd
+from database.queries import completar_orden as completar_orden_bd
+from database.queries import obtener_disponible, registrar_orden_venta
+
+TIPOS_OPERACION: tuple = ("Venta Directa", "Pedido Web", "Transferencia")
+# Operaciones que se despachan más tarde: reservan el stock en vez de descontarlo
+TIPOS_CON_RESERVA: tuple = ("Pedido Web",)
+
+
+@dataclass
+class LineaOrden:
+    """Una línea del carrito: producto, cantidad y precio unitario."""
+    product_id: int
+    quantity: int
+    precio: float
+    nombre: str = ""
+    ubicacion_id: Optional[int] = None
+
+
+@dataclass
+class ResultadoOrden:
+    """Resultado de colocar una orden. 'errores' trae un mensaje por línea rechazada."""
+    orden_id: Optional[int]
+    numero_orden: str = ""
+    errores: List[str] = field(default_factory=list)
+
+    @property
+    def exito(self) -> bool:
+        return self.orden_id is not None
+
+
+def colocar_orden(
+    tipo_operacion: str,
+    lineas: List[LineaOrden],
+    usuario_id: int,
+    cliente_id: Optional[int] = None,
+    reservar: Optional[bool] = None,
+    estrategia: Optional[EstrategiaAsignacion] = None
+) -> ResultadoOrden:
+    """
+    Crea la orden y descuenta (o reserva) el stock de todas sus líneas, o no hace nada.
+    Sin 'reservar' explícito, reservan los tipos de TIPOS_CON_RESERVA. Las líneas
+    sin ubicación se reparten entre ubicaciones según 'estrategia' (por defecto, la configurada).
+
+    Raises:
+        ValueError: Si la orden no es válida o hubo un error de base de datos
+    """
+    if not lineas:
+        raise ValueError("La orden no tiene productos.")
+    if tipo_operacion not in TIPOS_OPERACION:
+        raise ValueError(f"Tipo de operación no válido: {tipo_operacion}")
+    if estrategia is not None and estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia de asignación no válida: {estrategia}")
+
+    errores: List[str] = [
+        f"• {linea.nombre or f'Producto {linea.product_id}'}: La cantidad debe ser mayor a 0."
+        for linea in lineas if linea.quantity <= 0
+    ]
+    if errores:
+        return ResultadoOrden(None, errores=errores)
+
+    if reservar is None:
+        reservar = tipo_operacion in TIPOS_CON_RESERVA
+
+    resultado = registrar_orden_venta(
+        tipo_operacion=tipo_operacion,
+        cliente_id=cliente_id,
+        usuario_id=usuario_id,
+        productos=[
+            {
+                'id': linea.product_id,
+                'cantidad': linea.quantity,
+                'precio': linea.precio,
+                'ubicacion_id': linea.ubicacion_id,
+            } for linea in lineas
+        ],
+        reservar=reservar,
+        estrategia=estrategia
+    )
+    if resultado is None:
+        raise ValueError("Error al registrar la orden en la base de datos.")
+
+    orden_id, numero_orden, errores_bd = resultado
+    errores = [
+        f"• {linea.nombre or f'Producto {linea.product_id}'}: {error}"
+        for linea, error in zip(lineas, errores_bd) if error
+    ]
+    return ResultadoOrden(orden_id, numero_orden, errores)
+
+
+def completar_orden(orden_id: int, usuario_id: int) -> None:
+    """
+    Despacha una orden pendiente: descuenta lo reservado y consume sus reservas.
+
+    Raises:
+        ValueError: Si la orden no está pendiente o ya no hay stock físico
+    """
+    error = completar_orden_bd(orden_id, usuario_id)
+    if error:
+        raise ValueError(f"No se pudo completar la orden #{orden_id}: {error}")
+
+
+def cancelar_orden(orden_id: int) -> None:
+    """
+    Cancela una orden pendiente y libera su stock reservado.
+
+    Raises:
+        ValueError: Si la orden no existe o no está pendiente
+    """
+    if not cancelar_orden_bd(orden_id):
+        raise ValueError(f"La orden #{orden_id} no existe o no está pendiente.")
+
+
+def disponible_para_prometer(producto_id: int, ubicacion_id: Optional[int] = None) -> int:
+    """Stock que aún puede comprometerse: existencias menos reservas de órdenes pendientes."""
+    return obtener_disponible(producto_id, ubicacion_id)
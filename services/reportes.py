@@ -0,0 +1,96 @@
+# services/reportes.py - Exportaciones y conciliación de inventario
+"""
+Exportaciones a CSV construidas sobre los recorridos en streaming de
+queries.py (iter_query): las filas se escriben a medida que llegan, así que
+la memoria usada no depende de cuántos movimientos o productos haya.
+
+El archivo se escribe primero como '<ruta>.tmp' y se renombra al terminar:
+una exportación fallida o cancelada no deja un CSV a medias.
+"""
+import csv
+import os
+from typing import Any, Iterable, List, Optional, Sequence
+
+from database.modelos import DiferenciaStock
+from database.queries import IteradorConsulta, iterar_diferencias_stock, iterar_inventario, iterar_movimientos
+
+ENCABEZADOS_MOVIMIENTOS: Sequence[str] = (
+    "Fecha", "Producto", "Tipo", "Cantidad", "Razón", "Proveedor", "Ubicación", "Observaciones", "SKU", "ID"
+)
+ENCABEZADOS_INVENTARIO: Sequence[str] = (
+    "ID", "Nombre", "SKU", "Categoría", "Stock", "Unidad", "Ubicación", "Precio", "Proveedor", "Estado", "Disponible"
+)
+ENCABEZADOS_CONCILIACION: Sequence[str] = (
+    "ID Producto", "SKU", "Nombre", "Ubicación", "Stock registrado", "Stock calculado", "Diferencia"
+)
+
+
+def exportar_movimientos_csv(
+    ruta: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    tipo: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    texto: Optional[str] = None
+) -> int:
+    """
+    Exporta el historial de movimientos con los mismos filtros del historial.
+    Retorna la cantidad de filas escritas.
+    """
+    filas = iterar_movimientos(fecha_desde, fecha_hasta, tipo, ubicacion, texto)
+    return _escribir_csv(ruta, ENCABEZADOS_MOVIMIENTOS, filas)
+
+
+def exportar_inventario_csv(ruta: str) -> int:
+    """Exporta todos los productos activos con su stock. Retorna las filas escritas."""
+    return _escribir_csv(ruta, ENCABEZADOS_INVENTARIO, iterar_inventario())
+
+
+def conciliar_inventario() -> List[DiferenciaStock]:
+    """
+    Compara el stock de cada producto/ubicación con la suma de sus movimientos.
+    Retorna solo los pares que no coinciden (lista vacía = inventario conciliado).
+    """
+    with iterar_diferencias_stock() as diferencias:
+        return list(diferencias)
+
+
+def exportar_conciliacion_csv(ruta: str) -> int:
+    """Exporta las diferencias de la conciliación. Retorna las filas escritas."""
+    filas = iterar_diferencias_stock()
+    return _escribir_csv(ruta, ENCABEZADOS_CONCILIACION, ((*d, d.diferencia) for d in filas), filas)
+
+
+def _escribir_csv(
+    ruta: str,
+    encabezados: Sequence[str],
+    filas: Iterable[Sequence[Any]],
+    origen: Optional[IteradorConsulta] = None
+) -> int:
+    """
+    Escribe las filas en 'ruta' (UTF-8 con BOM, para que Excel respete los acentos).
+    'origen' es el recorrido a cerrar si 'filas' lo envuelve.
+    """
+    origen = origen or (filas if isinstance(filas, IteradorConsulta) else None)
+    temporal = f"{ruta}.tmp"
+    escritas = 0
+    try:
+        with open(temporal, "w", newline="", encoding="utf-8-sig") as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(encabezados)
+            for fila in filas:
+                escritor.writerow(fila)
+                escritas += 1
+        if origen is not None and origen.error:
+            raise RuntimeError(f"Error al leer los datos: {origen.error}")
+        if origen is not None and origen.cancelada:
+            raise InterruptedError("Exportación cancelada")
+        os.replace(temporal, ruta)
+        return escritas
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    finally:
+        if origen is not None:
+            origen.close()
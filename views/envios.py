@@ -1,11 +1,19 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from typing import Dict, List, Tuple, Union, Optional
+from tkinter import ttk, messagebox, Toplevel
+from typing import Any, Dict, List, Tuple, Union, Optional
 
 # Importaciones del sistema
-from database.queries import get_all_products, crear_orden_venta
+from database.catalogo import get_catalogo
+from database.modelos import Orden, Producto
+from database.queries import obtener_ordenes_pendientes
+from gui.components.db_executor import get_executor
+from gui.components.busqueda import ControladorBusqueda
+from gui.components.lista_clave import ListaConClave
+from gui.components.tabla_virtual import AccionFila, Columna, TablaVirtual
 from services.auth_service import get_current_user
-from services.inv_manager import InventoryManager
+from services.ordenes import (
+    TIPOS_CON_RESERVA, LineaOrden, ResultadoOrden, cancelar_orden, colocar_orden, completar_orden
+)
 
 # --- CONFIGURACIÓN DE ESTILOS (Tema Azul - Ventas) ---
 COLORS: Dict[str, str] = {
@@ -25,7 +33,77 @@ COLORS: Dict[str, str] = {
 
 FontTuple = Tuple[str, int, str]
 
-COLUMN_WEIGHTS: List[int] = [3, 3, 3, 3, 3, 3]
+COLUMN_WEIGHTS: List[int] = [3, 3, 3, 3, 3, 3, 3]
+
+# Color del stock según el estado del producto
+COLORES_STOCK: Dict[str, str] = {
+    "Out of Stock": COLORS["error_fg"],
+    "Low Stock": COLORS["warning_fg"],
+}
+
+class FilaCarrito(tk.Frame):
+    """Fila del carrito; mostrar() cambia cantidad y subtotal sin recrear los widgets."""
+
+    def __init__(self, parent: tk.Widget, item: Dict[str, Any], vista: "EnviosView") -> None:
+        super().__init__(parent, bg="white", pady=8)
+        producto_id: int = item['id']
+
+        # Nombre
+        self.lbl_nombre = tk.Label(self, font=("Segoe UI", 9, "bold"), bg="white", anchor="w")
+        self.lbl_nombre.pack(anchor="w", padx=5)
+
+        # Detalles (SKU, cantidad)
+        info = tk.Frame(self, bg="white")
+        info.pack(fill="x", padx=5, pady=2)
+
+        self.lbl_sku = tk.Label(info, font=("Segoe UI", 8), fg=COLORS["text_gray"], bg="white")
+        self.lbl_sku.pack(side="left")
+
+        # Cantidad con controles
+        qty_frame = tk.Frame(info, bg="white")
+        qty_frame.pack(side="right")
+
+        tk.Button(qty_frame, text="−", font=("Segoe UI", 8),
+                  bg=COLORS["border"], fg=COLORS["text_dark"],
+                  relief="flat", width=2, cursor="hand2",
+                  command=lambda: vista.ajustar_cantidad(producto_id, -1)).pack(side="left")
+
+        self.lbl_cantidad = tk.Label(qty_frame, font=("Segoe UI", 9, "bold"), bg="white")
+        self.lbl_cantidad.pack(side="left")
+
+        tk.Button(qty_frame, text="＋", font=("Segoe UI", 8),
+                  bg=COLORS["primary"], fg="white",
+                  relief="flat", width=2, cursor="hand2",
+                  command=lambda: vista.ajustar_cantidad(producto_id, 1)).pack(side="left")
+
+        # Precio y subtotal
+        price_frame = tk.Frame(self, bg="white")
+        price_frame.pack(fill="x", padx=5)
+
+        self.lbl_precio = tk.Label(price_frame, font=("Segoe UI", 8), fg=COLORS["text_gray"], bg="white")
+        self.lbl_precio.pack(side="left")
+
+        self.lbl_subtotal = tk.Label(price_frame, font=("Segoe UI", 9, "bold"), bg="white")
+        self.lbl_subtotal.pack(side="right")
+
+        # Botón eliminar
+        tk.Button(self, text="✕ Eliminar", font=("Segoe UI", 8),
+                  bg=COLORS["error_bg"], fg=COLORS["error_fg"],
+                  relief="flat", cursor="hand2",
+                  command=lambda: vista.eliminar_del_carrito(producto_id)).pack(anchor="e", padx=5, pady=2)
+
+        # Separador
+        tk.Frame(self, bg=COLORS["border"], height=1).pack(fill="x", pady=(4, 0))
+
+        self.mostrar(item)
+
+    def mostrar(self, item: Dict[str, Any]) -> None:
+        self.lbl_nombre.config(text=f"{item['nombre']}")
+        self.lbl_sku.config(text=f"SKU: {item['sku']}")
+        self.lbl_cantidad.config(text=f" {item['cantidad']} ")
+        self.lbl_precio.config(text=f"${item['precio']:.2f} c/u")
+        self.lbl_subtotal.config(text=f"${float(item['precio']) * int(item['cantidad']):.2f}")
+
 
 class EnviosView(tk.Frame):
     def __init__(self, parent: tk.Widget) -> None:
@@ -36,11 +114,22 @@ class EnviosView(tk.Frame):
         self.current_user = get_current_user()
         self.user_id = self.current_user.id if self.current_user else 1
 
-        self.inv_manager = InventoryManager()
+        # Filtro del resultado que muestra la tabla de productos
+        self._filtro_mostrado: Optional[str] = None
 
         # Estado del carrito: Lista de diccionarios
         self.cart_items: List[Dict[str, Union[str, int, float]]] = []
 
+        # Búsqueda mientras se escribe: debounce, índice FTS5 (refinando el resultado
+        # anterior si el texto lo extiende) y filas del catálogo en memoria
+        catalogo = get_catalogo()
+        self.busqueda = ControladorBusqueda(
+            self, buscar=catalogo.filtrar, refinar=catalogo.refinar,
+            al_resultado=self._mostrar_productos,
+            al_fallar=self._mostrar_error_productos,
+            clave="envios.productos"
+        )
+
         # Estructura Principal: Panel Izquierdo (Productos) | Panel Derecho (Carrito)
         self.left_panel: tk.Frame = tk.Frame(self, bg=COLORS["bg_main"])
         self.left_panel.pack(side="left", fill="both", expand=True, padx=(20, 10), pady=20)
@@ -92,64 +181,58 @@ class EnviosView(tk.Frame):
                   font=("Segoe UI", 9), relief="flat", padx=10, pady=5,
                   cursor="hand2", command=self.cargar_productos).pack(side="right", padx=5)
 
-        # --- Cabecera de la Tabla ---
-        headers: List[str] = ["PRODUCTO", "SKU", "STOCK", "PRECIO", "UBICACIÓN", "ACCIÓN"]
-        
-        head_fr: tk.Frame = tk.Frame(self.left_panel, bg=COLORS["bg_main"])
-        head_fr.pack(fill="x", pady=5)
-        
-        # Configurar grid para cabeceras
-        for i, text in enumerate(headers):
-            head_fr.columnconfigure(i, weight=COLUMN_WEIGHTS[i], uniform="table_col")
-            tk.Label(head_fr, text=text, font=("Segoe UI", 8, "bold"), 
-                     bg=COLORS["bg_main"], fg=COLORS["text_gray"], anchor="w").grid(
-                         row=0, column=i, sticky="we", padx=5)
-
-        # --- CONTENEDOR PRINCIPAL CON SCROLL VERTICAL Y HORIZONTAL ---
-        main_container = tk.Frame(self.left_panel, bg=COLORS["bg_main"])
-        main_container.pack(fill="both", expand=True)
-        
-        # Canvas principal
-        self.canvas_prod = tk.Canvas(main_container, bg=COLORS["bg_main"], highlightthickness=0)
-        
-        # Scrollbar vertical
-        self.scroll_prod_vertical = ttk.Scrollbar(main_container, orient="vertical", command=self.canvas_prod.yview)
-        
-        # Scrollbar horizontal NUEVO
-        self.scroll_prod_horizontal = ttk.Scrollbar(main_container, orient="horizontal", command=self.canvas_prod.xview)
-        
-        # Frame contenedor (scrollable)
-        self.frame_list = tk.Frame(self.canvas_prod, bg=COLORS["bg_main"])
-        
-        # Configurar scroll
-        def configurar_scrollregion(e):
-            self.canvas_prod.configure(scrollregion=self.canvas_prod.bbox("all"))
-        
-        self.frame_list.bind("<Configure>", configurar_scrollregion)
-        
-        # Crear ventana en canvas
-        self.canvas_prod.create_window((0, 0), window=self.frame_list, anchor="nw")
-        
-        # Configurar scrollbars
-        self.canvas_prod.configure(
-            yscrollcommand=self.scroll_prod_vertical.set,
-            xscrollcommand=self.scroll_prod_horizontal.set
+        # --- Tabla de productos (virtual: solo crea los widgets de las filas visibles) ---
+        self.tabla = TablaVirtual(
+            self.left_panel, columnas=self._columnas_tabla(), alto_fila=44,
+            mensaje_vacio="No hay productos disponibles", ancho_minimo=700, clave_fila=lambda p: p.id,
+            colores={"cabecera_bg": COLORS["bg_main"], "cabecera_fg": COLORS["text_gray"]}
         )
-        
-        # Posicionar widgets con grid para mejor control
-        self.canvas_prod.grid(row=0, column=0, sticky="nsew")
-        self.scroll_prod_vertical.grid(row=0, column=1, sticky="ns")
-        self.scroll_prod_horizontal.grid(row=1, column=0, sticky="ew", columnspan=2)
-        
-        # Configurar expansión
-        main_container.grid_rowconfigure(0, weight=1)
-        main_container.grid_columnconfigure(0, weight=1)
-        
-        # Ajustar tamaño de la ventana en canvas cuando el canvas cambie de tamaño
-        def ajustar_ventana_canvas(event):
-            self.canvas_prod.itemconfig(1, width=event.width)
-        
-        self.canvas_prod.bind("<Configure>", ajustar_ventana_canvas)
+        self.tabla.pack(fill="both", expand=True, pady=(5, 0))
+
+    def _columnas_tabla(self) -> List[Columna]:
+        """Columnas de la lista de productos; la columna ACCIÓN depende del carrito."""
+        return [
+            Columna("nombre", "PRODUCTO", peso=COLUMN_WEIGHTS[0], fuente=("Segoe UI", 9, "bold"), max_caracteres=25),
+            Columna("sku", "SKU", peso=COLUMN_WEIGHTS[1], fuente=("Segoe UI", 9, "bold"), fg=COLORS["text_gray"]),
+            # Stock con color según estado
+            Columna("stock", "STOCK", peso=COLUMN_WEIGHTS[2], fuente=("Segoe UI", 9, "bold"),
+                    texto=lambda p: "0" if p.estado == "Out of Stock" else str(p.stock),
+                    estilo=lambda p: {"fg": COLORES_STOCK.get(p.estado, COLORS["success_fg"])}),
+            # Disponible para prometer: stock menos lo reservado por pedidos pendientes
+            Columna("disponible", "DISPONIBLE", peso=COLUMN_WEIGHTS[3], fuente=("Segoe UI", 9, "bold"),
+                    texto=lambda p: str(max(p.disponible, 0)), estilo=self._estilo_disponible),
+            Columna("precio", "PRECIO", peso=COLUMN_WEIGHTS[4], texto=lambda p: f"${float(p.precio):.2f}"),
+            Columna("ubicacion", "UBICACIÓN", peso=COLUMN_WEIGHTS[5], fuente=("Segoe UI", 8), max_caracteres=15,
+                    texto=lambda p: p.ubicacion or "Sin ubicación", estilo=lambda p: {"bg": "#F3F4F6"}),
+            Columna("accion", "ACCIÓN", peso=COLUMN_WEIGHTS[6], ordenable=False, acciones=[
+                # Botón Agregar (deshabilitado si no queda stock disponible)
+                AccionFila("＋", lambda p: self.agregar_al_carrito(p.id, p.nombre, p.sku, float(p.precio)),
+                           fg="white", bg=COLORS["primary"], fuente=("Segoe UI", 10, "bold"), ancho=3,
+                           estilo=self._estilo_boton_agregar),
+                # Botón Quitar (habilitado solo si el producto ya está en el carrito)
+                AccionFila("−", lambda p: self.quitar_del_carrito(p.id, float(p.precio)),
+                           fg="white", bg=COLORS["danger"], fuente=("Segoe UI", 10, "bold"), ancho=3,
+                           estilo=lambda p: {"state": "normal" if self._en_carrito(p.id) else "disabled"}),
+            ]),
+        ]
+
+    @staticmethod
+    def _estilo_disponible(producto: Producto) -> Dict[str, str]:
+        if producto.disponible <= 0:
+            return {"fg": COLORS["error_fg"]}
+        if producto.disponible < producto.stock:
+            # Parte del stock está reservada
+            return {"fg": COLORS["warning_fg"]}
+        return {"fg": COLORS["success_fg"]}
+
+    @staticmethod
+    def _estilo_boton_agregar(producto: Producto) -> Dict[str, str]:
+        if producto.disponible > 0:
+            return {"text": "＋", "bg": COLORS["primary"], "fg": "white", "cursor": "hand2", "state": "normal"}
+        return {"text": "⨯", "bg": COLORS["border"], "fg": COLORS["text_gray"], "cursor": "arrow", "state": "disabled"}
+
+    def _en_carrito(self, producto_id: int) -> bool:
+        return any(item['id'] == producto_id for item in self.cart_items)
 
     def _construir_panel_derecho(self) -> None:
         # --- Header Total ---
@@ -209,6 +292,18 @@ class EnviosView(tk.Frame):
             self.canvas_cart.configure(scrollregion=self.canvas_cart.bbox("all"))
         
         self.cart_container.bind("<Configure>", configurar_scroll_cart)
+
+        # Filas del carrito identificadas por producto: se actualizan por diferencias
+        self.lista_carrito = ListaConClave(
+            self.cart_container,
+            clave=lambda item: item['id'],
+            crear=lambda padre, item: FilaCarrito(padre, item, self),
+            actualizar=lambda fila, item: fila.mostrar(item),
+            firma=lambda item: (item['nombre'], item['sku'], item['precio'], item['cantidad']),
+            vacio=lambda padre: tk.Label(padre, text="Carrito vacío", font=("Segoe UI", 10),
+                                         fg=COLORS["text_gray"], bg="white"),
+            opciones_pack={"fill": "x", "pady": 2}
+        )
         
         # Posicionar widgets del carrito
         self.canvas_cart.pack(side="left", fill="both", expand=True)
@@ -231,166 +326,50 @@ class EnviosView(tk.Frame):
         self.combo_ops.pack(fill="x", pady=(5, 15))
 
         # --- Botón Acción ---
-        tk.Button(config_fr, text="✅ PROCESAR SALIDA", bg=COLORS["primary"], fg="white", 
-                  font=("Segoe UI", 11, "bold"), relief="flat", pady=12, cursor="hand2",
-                  command=self.procesar_venta).pack(fill="x")
+        self.btn_procesar: tk.Button = tk.Button(
+            config_fr, text="✅ PROCESAR SALIDA", bg=COLORS["primary"], fg="white", 
+            font=("Segoe UI", 11, "bold"), relief="flat", pady=12, cursor="hand2",
+            command=self.procesar_venta)
+        self.btn_procesar.pack(fill="x")
 
         # Botón vaciar carrito
         tk.Button(config_fr, text="🗑️ Vaciar Carrito", bg=COLORS["border"], fg=COLORS["text_dark"],
                   font=("Segoe UI", 10), relief="flat", pady=8, cursor="hand2",
                   command=self.vaciar_carrito).pack(fill="x", pady=(5, 0))
 
-    def cargar_productos(self, filtro: str = "") -> None:
-        # Limpiar lista visual
-        for widget in self.frame_list.winfo_children():
-            widget.destroy()
-
-        try:
-            # Obtener productos de la DB
-            # Estructura de get_all_products(): (id, name, sku, category, stock, location, precio, proveedor, estado)
-            productos = get_all_products()
-            
-            # DEBUG: Ver cuántos productos hay
-            print(f"📊 Productos encontrados: {len(productos)}")
-            
-            if not productos:
-                tk.Label(self.frame_list, text="No hay productos disponibles", 
-                        font=("Segoe UI", 10), fg=COLORS["text_gray"], 
-                        bg=COLORS["bg_main"]).pack(pady=50)
-                return
-                
-            for p in productos:
-                # Desempaquetar según la estructura actual
-                producto_id = p[0]      # id
-                nombre = p[1]           # name
-                sku = p[2]              # sku/barcode
-                categoria = p[3]        # category
-                stock = p[4]            # total_stock
-                unidad_medida = p[5] 
-                ubicacion = p[6]        # location
-                precio = p[7]           # precio
-                proveedor = p[8]        # proveedor
-                estado = p[9]           # estado
-                
-                # Aplicar filtro
-                if filtro and filtro.lower() not in str(nombre).lower() and filtro.lower() not in str(sku).lower():
-                    continue
-                    
-                # Crear fila
-                self._crear_fila_producto(
-                    producto_id=producto_id,
-                    nombre=nombre,
-                    sku=sku,
-                    stock=stock,
-                    unidad=unidad_medida,
-                    precio=float(precio) if precio else 0,
-                    ubicacion=ubicacion,
-                    estado=estado
-                )
-                
-        except Exception as e:
-            print(f"❌ Error al cargar productos: {e}")
-            tk.Label(self.frame_list, text="Error al cargar productos", 
-                    font=("Segoe UI", 10), fg=COLORS["danger"], bg=COLORS["bg_main"]).pack(pady=20)
-
-    def _crear_fila_producto(self, producto_id: int, nombre: str, sku: str, stock: int, 
-                           unidad: str, precio: float, ubicacion: str, estado: str) -> None:
-
-        row: tk.Frame = tk.Frame(self.frame_list, bg="white", pady=8)
-        row.pack(fill="x", pady=2, padx=5)
-        
-        # Configurar columnas con grid para mejor control
-        for i, weight in enumerate(COLUMN_WEIGHTS):
-            row.columnconfigure(i, weight=weight, uniform="table_col")
+        # Pedidos con stock reservado (completar o cancelar)
+        tk.Button(config_fr, text="📋 Pedidos Pendientes", bg=COLORS["border"], fg=COLORS["text_dark"],
+                  font=("Segoe UI", 10), relief="flat", pady=8, cursor="hand2",
+                  command=self.abrir_pedidos_pendientes).pack(fill="x", pady=(5, 0))
 
-        # Nombre del producto (truncado)
-        f_prod: tk.Frame = tk.Frame(row, bg="white")
-        f_prod.grid(row=0, column=0, sticky="w", padx=10)
+    def cargar_productos(self, filtro: Optional[str] = None) -> None:
+        # Sin filtro explícito se recarga con el texto que hay en el buscador
+        if filtro is None:
+            filtro = self._filtro_actual()
+        # Filtrar el catálogo compartido en un hilo de trabajo; un filtro nuevo descarta el anterior
+        self.busqueda.buscar_ahora(filtro)
 
-        nombre_display = nombre
-        if len(nombre_display) > 25:
-            nombre_display = nombre_display[:22] + "..."
-        
-        lbl_name: tk.Label = tk.Label(f_prod, text=nombre_display, font=("Segoe UI", 9, "bold"), bg="white", anchor="w", justify="left", width=25)
-        lbl_name.grid(row=0, column=0, sticky="we")
+    def on_activate(self) -> None:
+        """Al volver a la pestaña: refresca el stock del filtro actual (el carrito se conserva)."""
+        self.cargar_productos()
 
-        if len(nombre_display) > 22: 
-            ToolTip(lbl_name, nombre_display)
+    def puede_descartarse(self) -> bool:
+        """Con productos en el carrito la vista no se destruye al cambiar de pestaña."""
+        return not self.cart_items
 
-        # SKU
-        tk.Label(row, text=sku, font=("Segoe UI", 9, "bold"), bg="white", 
-                fg=COLORS["text_gray"], anchor="w", justify="left").grid(row=0, column=1, sticky="we", padx=10)
-        
-        # Stock con color según estado
-        if estado == "Out of Stock":
-            color_stock = COLORS["error_fg"]
-            stock_text = "0"
-        elif estado == "Low Stock":
-            color_stock = COLORS["warning_fg"]
-            stock_text = str(stock)
+    def _mostrar_productos(self, filtro: str, productos: List[Producto]) -> None:
+        print(f"📊 Productos encontrados: {len(productos)}")
+        if filtro == self._filtro_mostrado:
+            # Recarga del mismo filtro (p. ej. tras una venta): solo cambian las filas afectadas
+            self.tabla.actualizar_filas(productos)
         else:
-            color_stock = COLORS["success_fg"]
-            stock_text = str(stock)
-            
-        tk.Label(row, text=stock_text, font=("Segoe UI", 9, "bold"), 
-                bg="white", fg=color_stock, anchor="w", justify="left").grid(row=0, column=2, sticky="we", padx=10)
-        
-        # Precio
-        tk.Label(row, text=f"${precio:.2f}", font=("Segoe UI", 9), 
-                bg="white", anchor="w", justify="left").grid(row=0, column=3, sticky="we", padx=10)
-        
-        # Ubicación
-        ubicacion_display = ubicacion or "Sin ubicación"
-        if len(ubicacion_display) > 15:
-            ubicacion_display = ubicacion_display[:12] + "..."
-            
-        tk.Label(row, text=ubicacion_display, font=("Segoe UI", 8), 
-                bg="#F3F4F6", padx=5, anchor="w", justify="left").grid(row=0, column=4, sticky="we", padx=10)
-
-        # Columna ACCIÓN con dos botones
-        action_frame = tk.Frame(row, bg="white")
-        action_frame.grid(row=0, column=5, padx=5, sticky="e")
-        
-        # Botón Agregar (deshabilitado si no hay stock)
-        btn_text = "＋" if stock > 0 else "⨯"
-        btn_state = "normal" if stock > 0 else "disabled"
-        
-        btn_add: tk.Button = tk.Button(
-            action_frame, 
-            text=btn_text, 
-            bg=COLORS["primary"] if stock > 0 else COLORS["border"],
-            fg="white" if stock > 0 else COLORS["text_gray"],
-            font=("Segoe UI", 10, "bold"),
-            relief="flat", 
-            width=3,
-            cursor="hand2" if stock > 0 else "arrow",
-            state=btn_state,
-            command=lambda pid=producto_id, pname=nombre, psku=sku, pprice=precio: 
-                self.agregar_al_carrito(pid, pname, psku, pprice)
-        )
-        btn_add.pack(side="left", padx=(0, 2))
-        
-        # Botón Quitar (solo visible si el producto ya está en el carrito)
-        btn_remove: tk.Button = tk.Button(
-            action_frame, 
-            text="−", 
-            bg=COLORS["danger"],
-            fg="white",
-            font=("Segoe UI", 10, "bold"),
-            relief="flat", 
-            width=3,
-            cursor="hand2",
-            command=lambda pid=producto_id, pprice=precio: 
-                self.quitar_del_carrito(pid, pprice)
-        )
-        btn_remove.pack(side="left")
-
-        # Verificar si el producto está en el carrito para habilitar/quitar botón
-        en_carrito = any(item['id'] == producto_id for item in self.cart_items)
-        btn_remove.config(state="normal" if en_carrito else "disabled")
+            self.tabla.set_filas(productos)
+        self._filtro_mostrado = filtro
 
-        # Separador
-        tk.Frame(self.frame_list, bg=COLORS["border"], height=1).pack(fill="x", pady=1)
+    def _mostrar_error_productos(self, error: BaseException) -> None:
+        print(f"❌ Error al cargar productos: {error}")
+        self._filtro_mostrado = None
+        self.tabla.mostrar_mensaje("Error al cargar productos", COLORS["danger"])
 
     def agregar_al_carrito(self, producto_id: int, nombre: str, sku: str, precio: float) -> None:
         # Verificar si el producto ya está en el carrito
@@ -432,94 +411,21 @@ class EnviosView(tk.Frame):
                 self._actualizar_botones_accion(producto_id)
                 return
 
-    def _actualizar_botones_accion(self, producto_id: int) -> None:
-        """Actualiza el estado de los botones de acción en la fila del producto."""
-        # Esta función necesitaría acceso a las filas individuales para actualizar los botones
-        # En una implementación más compleja, se podría almacenar referencia a los botones
-        # Por ahora, recargamos la vista completa (simplificado)
+    def _actualizar_botones_accion(self, producto_id: Optional[int]) -> None:
+        """Actualiza el estado de los botones de acción según el carrito."""
+        # Las celdas se recalculan al redibujar: basta con refrescar las filas visibles
+        self.tabla.refrescar()
+
+    def _filtro_actual(self) -> str:
         filtro = self.entry_search.get()
-        if filtro == "Buscar por SKU o nombre...":
-            filtro = ""
-        self.cargar_productos(filtro)
+        return "" if filtro == "Buscar por SKU o nombre..." else filtro
 
     def _renderizar_carrito(self) -> None:
-        # Limpiar contenedor
-        for widget in self.cart_container.winfo_children():
-            widget.destroy()
-        
-        if not self.cart_items:
-            tk.Label(self.cart_container, text="Carrito vacío", 
-                    font=("Segoe UI", 10), fg=COLORS["text_gray"], 
-                    bg="white").pack(expand=True, pady=50)
-            self.lbl_total.config(text="$ 0.00")
-            self.lbl_subtotal.config(text="Subtotal: $ 0.00")
-            self.lbl_iva.config(text="IVA 16%: $ 0.00")
-            self.lbl_item_count.config(text="0 items")
-            return
-        
-        subtotal: float = 0.0
-        
-        for idx, item in enumerate(self.cart_items):
-            subtotal_item = float(item['precio']) * int(item['cantidad'])
-            subtotal += subtotal_item
-            
-            # Frame del item
-            row = tk.Frame(self.cart_container, bg="white", pady=8)
-            row.pack(fill="x", pady=2)
-            
-            # Nombre y SKU
-            tk.Label(row, text=f"{item['nombre']}", 
-                    font=("Segoe UI", 9, "bold"), bg="white", 
-                    anchor="w").pack(anchor="w", padx=5)
-            
-            # Detalles (SKU, cantidad, precio)
-            info = tk.Frame(row, bg="white")
-            info.pack(fill="x", padx=5, pady=2)
-            
-            tk.Label(info, text=f"SKU: {item['sku']}", 
-                    font=("Segoe UI", 8), fg=COLORS["text_gray"], 
-                    bg="white").pack(side="left")
-            
-            # Cantidad con controles
-            qty_frame = tk.Frame(info, bg="white")
-            qty_frame.pack(side="right")
-            
-            # Botón disminuir
-            tk.Button(qty_frame, text="−", font=("Segoe UI", 8), 
-                     bg=COLORS["border"], fg=COLORS["text_dark"],
-                     relief="flat", width=2, cursor="hand2",
-                     command=lambda i=idx: self.ajustar_cantidad(i, -1)).pack(side="left")
-            
-            # Cantidad
-            tk.Label(qty_frame, text=f" {item['cantidad']} ", 
-                    font=("Segoe UI", 9, "bold"), bg="white").pack(side="left")
-            
-            # Botón aumentar
-            tk.Button(qty_frame, text="＋", font=("Segoe UI", 8), 
-                     bg=COLORS["primary"], fg="white",
-                     relief="flat", width=2, cursor="hand2",
-                     command=lambda i=idx: self.ajustar_cantidad(i, 1)).pack(side="left")
-            
-            # Precio y subtotal
-            price_frame = tk.Frame(row, bg="white")
-            price_frame.pack(fill="x", padx=5)
-            
-            tk.Label(price_frame, text=f"${item['precio']:.2f} c/u", 
-                    font=("Segoe UI", 8), fg=COLORS["text_gray"], 
-                    bg="white").pack(side="left")
-            
-            tk.Label(price_frame, text=f"${subtotal_item:.2f}", 
-                    font=("Segoe UI", 9, "bold"), bg="white").pack(side="right")
-            
-            # Botón eliminar
-            tk.Button(row, text="✕ Eliminar", font=("Segoe UI", 8), 
-                     bg=COLORS["error_bg"], fg=COLORS["error_fg"],
-                     relief="flat", cursor="hand2",
-                     command=lambda i=idx: self.eliminar_del_carrito(i)).pack(anchor="e", padx=5, pady=2)
-            
-            # Separador
-            tk.Frame(self.cart_container, bg=COLORS["border"], height=1).pack(fill="x", pady=2)
-        
+        # Solo se crean, actualizan o quitan las filas del carrito que cambiaron
+        self.lista_carrito.reconciliar(self.cart_items)
+
+        subtotal: float = sum(float(item['precio']) * int(item['cantidad']) for item in self.cart_items)
+
         # Calcular totales
         iva = subtotal * 0.16
         total = subtotal + iva
@@ -529,42 +435,31 @@ class EnviosView(tk.Frame):
         self.lbl_subtotal.config(text=f"Subtotal: $ {subtotal:,.2f}")
         self.lbl_iva.config(text=f"IVA 16%: $ {iva:,.2f}")
         self.lbl_item_count.config(text=f"{len(self.cart_items)} items")
-        
-        # Asegurar que el canvas se actualice
-        self.cart_container.update_idletasks()
-        self.canvas_cart.configure(scrollregion=self.canvas_cart.bbox("all"))
-
-    def ajustar_cantidad(self, idx: int, cambio: int) -> None:
-        if 0 <= idx < len(self.cart_items):
-            nueva_cantidad = self.cart_items[idx]['cantidad'] + cambio
-            
-            if nueva_cantidad <= 0:
-                # Eliminar si la cantidad llega a 0
-                self.cart_items.pop(idx)
-                self._actualizar_botones_accion(self.cart_items[idx]['id'] if idx < len(self.cart_items) else None)
-            else:
-                self.cart_items[idx]['cantidad'] = nueva_cantidad
-                self.cart_items[idx]['subtotal'] = nueva_cantidad * self.cart_items[idx]['precio']
-            
-            self._renderizar_carrito()
-
-    def eliminar_del_carrito(self, idx: int) -> None:
-        if 0 <= idx < len(self.cart_items):
-            producto_id = self.cart_items[idx]['id']
-            self.cart_items.pop(idx)
-            self._renderizar_carrito()
-            self._actualizar_botones_accion(producto_id)
+
+    def ajustar_cantidad(self, producto_id: int, cambio: int) -> None:
+        for item in self.cart_items:
+            if item['id'] == producto_id:
+                nueva_cantidad = item['cantidad'] + cambio
+                if nueva_cantidad <= 0:
+                    # Eliminar si la cantidad llega a 0
+                    self.eliminar_del_carrito(producto_id)
+                    return
+                item['cantidad'] = nueva_cantidad
+                item['subtotal'] = nueva_cantidad * item['precio']
+                self._renderizar_carrito()
+                return
+
+    def eliminar_del_carrito(self, producto_id: int) -> None:
+        self.cart_items = [item for item in self.cart_items if item['id'] != producto_id]
+        self._renderizar_carrito()
+        self._actualizar_botones_accion(producto_id)
 
     def vaciar_carrito(self) -> None:
-        # Obtener IDs de productos para actualizar botones
-        productos_ids = [item['id'] for item in self.cart_items]
-        
         self.cart_items.clear()
         self._renderizar_carrito()
         
-        # Actualizar botones de acción para todos los productos afectados
-        for producto_id in productos_ids:
-            self._actualizar_botones_accion(producto_id)
+        # Un solo redibujo de la tabla actualiza los botones de todos los productos afectados
+        self._actualizar_botones_accion(None)
 
     def procesar_venta(self) -> None:
         if not self.cart_items:
@@ -572,76 +467,136 @@ class EnviosView(tk.Frame):
             return
         
         tipo_operacion: str = self.combo_ops.get()
-        
-        # Preparar lista de productos
-        productos_venta: list[dict[str, Any]] = [
-            {
-                'id': item['id'],
-                'nombre': item['nombre'],
-                'precio': item['precio'],
-                'cantidad': item['cantidad']
-            } for item in self.cart_items
-        ]
+        # Copia del carrito: puede cambiar mientras la venta se procesa en segundo plano
+        items: list[dict[str, Any]] = [dict(item) for item in self.cart_items]
+        
+        self.btn_procesar.config(state="disabled")
+        get_executor().enviar(
+            self._procesar_venta_bd, tipo_operacion, items, self.user_id,
+            al_terminar=lambda resultado: self._mostrar_resultado_venta(tipo_operacion, items, resultado),
+            al_fallar=self._mostrar_error_venta
+        )
 
-        try:
-            # 1. Intentar crear la orden
-            orden_id: Optional[int] = crear_orden_venta(
-                tipo_operacion=tipo_operacion,
-                cliente_id=None,
-                usuario_id=self.user_id,
-                productos=productos_venta
+    def _procesar_venta_bd(
+        self, tipo_operacion: str, items: list[dict[str, Any]], user_id: int
+    ) -> ResultadoOrden:
+        """Crea la orden y descuenta el stock en una transacción. Corre en un hilo de trabajo: no toca widgets."""
+        lineas: list[LineaOrden] = [
+            LineaOrden(
+                product_id=item['id'],
+                quantity=item['cantidad'],
+                precio=item['precio'],
+                nombre=item['nombre']
+            ) for item in items
+        ]
+        return colocar_orden(tipo_operacion, lineas, usuario_id=user_id)
+
+    def _mostrar_resultado_venta(
+        self, tipo_operacion: str, items: list[dict[str, Any]], resultado: ResultadoOrden
+    ) -> None:
+        """Resumen de la venta (hilo de Tk)."""
+        self.btn_procesar.config(state="normal")
+        if not resultado.exito:
+            # No se creó la orden ni se tocó el stock: el carrito queda para corregirlo
+            messagebox.showerror(
+                "❌ Venta no procesada",
+                "No se creó la orden. Revise las cantidades:\n\n" + "\n".join(resultado.errores)
             )
-            
-            if not orden_id:
-                messagebox.showerror("❌ Error", "No se pudo crear la orden. Posible duplicado o error de stock.")
-                return
+            self.cargar_productos()
+            return
 
-            # 2. Procesar inventario y recolectar alertas
-            errores_stock: list[str] = []
-            for item in self.cart_items:
-                try:
-                    self.inv_manager.registrar_salida(
-                        product_id=item['id'],
-                        quantity=item['cantidad'],
-                        razon="venta",
-                        razon_detalle=f"Orden #{orden_id} ({tipo_operacion})",
-                        user_id=self.user_id
-                    )
-                except ValueError as ve:
-                    errores_stock.append(f"• {item['nombre']}: {str(ve)}")
-                except Exception:
-                    errores_stock.append(f"• {item['nombre']}: Error inesperado en stock")
-
-            # 3. Calcular totales para el resumen
-            subtotal: float = sum(item['precio'] * item['cantidad'] for item in self.cart_items)
-            iva: float = subtotal * 0.16
-            total: float = subtotal + iva
-            
-            # 4. Construir mensaje UNIFICADO
-            resumen_msg: str = (
-                f"✅ Venta Procesada Correctamente\n"
-                f"{'='*35}\n"
-                f"Orden: #{orden_id}\n"
-                f"Operación: {tipo_operacion}\n\n"
-                f"Subtotal: ${subtotal:,.2f}\n"
-                f"IVA (16%): ${iva:,.2f}\n"
-                f"TOTAL: ${total:,.2f}\n"
-                f"{'='*35}\n"
-                f"Productos procesados: {len(self.cart_items)}"
-            )
+        # 1. Calcular totales para el resumen
+        subtotal: float = sum(item['precio'] * item['cantidad'] for item in items)
+        iva: float = subtotal * 0.16
+        total: float = subtotal + iva
+        
+        # 2. Construir mensaje UNIFICADO
+        if tipo_operacion in TIPOS_CON_RESERVA:
+            titulo: str = "✅ Pedido Registrado (stock reservado hasta despacharlo)"
+        else:
+            titulo = "✅ Venta Procesada Correctamente"
+        resumen_msg: str = (
+            f"{titulo}\n"
+            f"{'='*35}\n"
+            f"Orden: #{resultado.orden_id} ({resultado.numero_orden})\n"
+            f"Operación: {tipo_operacion}\n\n"
+            f"Subtotal: ${subtotal:,.2f}\n"
+            f"IVA (16%): ${iva:,.2f}\n"
+            f"TOTAL: ${total:,.2f}\n"
+            f"{'='*35}\n"
+            f"Productos procesados: {len(items)}"
+        )
+
+        messagebox.showinfo("Éxito", resumen_msg)
+
+        # 3. Finalizar proceso (y recargar el stock que cambió con la venta)
+        self.vaciar_carrito()
+        self.cargar_productos()
+
+    def _mostrar_error_venta(self, error: BaseException) -> None:
+        self.btn_procesar.config(state="normal")
+        messagebox.showerror("❌ Error del Sistema", f"Error crítico al procesar:\n{str(error)}")
+
+    # Pedidos pendientes (stock reservado)
+    def abrir_pedidos_pendientes(self) -> None:
+        """Lista los pedidos pendientes para despacharlos o cancelarlos."""
+        modal = Toplevel(self)
+        modal.title("📋 Pedidos Pendientes")
+        modal.geometry("720x420")
+        modal.configure(bg="white", padx=20, pady=20)
+
+        tk.Label(modal, text="📋 Pedidos Pendientes", font=("Segoe UI", 14, "bold"),
+                 bg="white", fg=COLORS["text_dark"]).pack(anchor="w")
+        tk.Label(modal, text="Su stock queda reservado hasta completarlos o cancelarlos",
+                 font=("Segoe UI", 9), bg="white", fg=COLORS["text_gray"]).pack(anchor="w", pady=(0, 10))
+
+        tabla = TablaVirtual(
+            modal, alto_fila=40, mensaje_vacio="No hay pedidos pendientes", clave_fila=lambda o: o.id,
+            colores={"cabecera_bg": "white", "cabecera_fg": COLORS["text_gray"]},
+            columnas=[
+                Columna("numero_orden", "ORDEN", peso=4, fuente=("Segoe UI", 9, "bold")),
+                Columna("tipo_operacion", "TIPO", peso=3),
+                Columna("total", "TOTAL", peso=2, texto=lambda o: f"${float(o.total):,.2f}"),
+                Columna("fecha_creacion", "FECHA", peso=3, fuente=("Segoe UI", 8), fg=COLORS["text_gray"]),
+                Columna("acciones", "ACCIÓN", peso=3, ordenable=False, acciones=[
+                    AccionFila("✔", lambda o: self._cerrar_pedido(tabla, o, completar=True),
+                               fg="white", bg=COLORS["success"], fuente=("Segoe UI", 10, "bold"), ancho=3),
+                    AccionFila("✖", lambda o: self._cerrar_pedido(tabla, o, completar=False),
+                               fg="white", bg=COLORS["danger"], fuente=("Segoe UI", 10, "bold"), ancho=3),
+                ]),
+            ]
+        )
+        tabla.pack(fill="both", expand=True)
+        self._cargar_pedidos_pendientes(tabla)
+
+    def _cargar_pedidos_pendientes(self, tabla: TablaVirtual) -> None:
+        get_executor().enviar(
+            obtener_ordenes_pendientes,
+            al_terminar=tabla.actualizar_filas,
+            al_fallar=lambda e: tabla.mostrar_mensaje("Error al cargar pedidos", COLORS["error_fg"]),
+            clave="envios.pedidos"
+        )
+
+    def _cerrar_pedido(self, tabla: TablaVirtual, orden: Orden, completar: bool) -> None:
+        """Completa (descuenta lo reservado) o cancela (libera la reserva) un pedido."""
+        accion = "Completar" if completar else "Cancelar"
+        if not messagebox.askyesno(f"{accion} pedido", f"¿{accion} el pedido {orden.numero_orden}?", parent=tabla):
+            return
+        if completar:
+            funcion, args = completar_orden, (orden.id, self.user_id)
+        else:
+            funcion, args = cancelar_orden, (orden.id,)
 
-            # Añadir alertas si existen
-            if errores_stock:
-                resumen_msg += "\n\n⚠️ ALERTAS DE INVENTARIO:\n" + "\n".join(errores_stock)
-                messagebox.showwarning("Procesado con Observaciones", resumen_msg)
-            else:
-                messagebox.showinfo("Éxito", resumen_msg)
+        def al_terminar(_resultado: Any) -> None:
+            # Cambió el stock disponible: recargar pedidos y productos
+            self._cargar_pedidos_pendientes(tabla)
+            self.cargar_productos()
 
-            # 5. Finalizar proceso
-            self.vaciar_carrito()
-            
-        except Exception as e:
-            messagebox.showerror("❌ Error del Sistema", f"Error crítico al procesar:\n{str(e)}")
+        get_executor().enviar(
+            funcion, *args,
+            al_terminar=al_terminar,
+            al_fallar=lambda e: messagebox.showerror("❌ Error", str(e), parent=tabla)
+        )
 
     # Métodos para búsqueda
     def _on_search_focus_in(self, event=None) -> None:
@@ -657,4 +612,4 @@ class EnviosView(tk.Frame):
     def _on_search_key_release(self, event=None) -> None:
         filtro = self.entry_search.get()
         if filtro != "Buscar por SKU o nombre...":
-            self.cargar_productos(filtro)
\ No newline at end of file
+            self.busqueda.escribir(filtro)
\ No newline at end of file
@@ -3,12 +3,16 @@ from tkinter import ttk, messagebox, Toplevel
 from typing import Dict, List, Tuple, Any, Optional, Union
 
 # Importaciones locales actualizadas
-from database.queries import get_all_products, insert_product, buscar_producto_por_sku, obtener_ubicaciones, eliminar_producto, actualizar_producto
+from database.catalogo import get_catalogo
+from database.modelos import Producto, ProductoDetalle
+from gui.components.db_executor import get_executor
+from database.queries import insert_product, buscar_producto_por_sku, obtener_ubicaciones, eliminar_producto, actualizar_producto
 from services.inv_manager import InventoryManager
 from services.auth_service import get_current_user
 
 #Components
-from gui.components.tooltip import ToolTip
+from gui.components.busqueda import ControladorBusqueda
+from gui.components.tabla_virtual import AccionFila, Columna, TablaVirtual
 
 # --- CONFIGURACIÓN DE COLORES Y ESTILOS ---
 COLORS: Dict[str, str] = {
@@ -26,6 +30,13 @@ COLORS: Dict[str, str] = {
 
 COLUMN_WEIGHTS: List[int] = [10, 4, 4, 6, 5, 6]
 
+# Colores (fondo, texto) del badge de estado
+ESTADO_COLORS: Dict[str, Tuple[str, str]] = {
+    "In Stock": (COLORS["success_bg"], COLORS["success_fg"]),
+    "Low Stock": (COLORS["warning_bg"], COLORS["warning_fg"]),
+    "Out of Stock": (COLORS["error_bg"], COLORS["error_fg"])
+}
+
 FONT_H2: Tuple[str, int, str] = ("Segoe UI", 12, "bold")
 FONT_BODY: Tuple[str, int] = ("Segoe UI", 10)
 FONT_SMALL: Tuple[str, int] = ("Segoe UI", 9)
@@ -42,15 +53,22 @@ class InventarioView(tk.Frame):
         # Crear manager de inventario
         self.inv_manager = InventoryManager()
         
-        # Almacenar productos para búsqueda rápida
-        self.productos_cache: List[Dict[str, Any]] = []
-        
         self.main_area: tk.Frame = tk.Frame(self, bg=COLORS["bg_main"])
         self.main_area.pack(fill="both", expand=True)
 
-        self.canvas: Optional[tk.Canvas] = None
-        self.scrollable_frame: Optional[tk.Frame] = None
-        self.scrollbar_horizontal: Optional[ttk.Scrollbar] = None  # Nueva barra horizontal
+        self.tabla: Optional[TablaVirtual] = None
+        # Filtro del resultado que muestra la tabla (None: resultado de otra búsqueda)
+        self._filtro_mostrado: Optional[str] = None
+
+        # Búsqueda mientras se escribe: debounce, índice FTS5 (refinando el resultado
+        # anterior si el texto lo extiende) y filas del catálogo en memoria
+        catalogo = get_catalogo()
+        self.busqueda = ControladorBusqueda(
+            self, buscar=catalogo.filtrar, refinar=catalogo.refinar,
+            al_resultado=lambda texto, productos: self._mostrar_productos(productos, texto),
+            al_fallar=self._mostrar_error_carga,
+            clave="inventario.productos"
+        )
 
         self._construir_topbar()
         self._construir_lista_productos()
@@ -94,210 +112,111 @@ class InventarioView(tk.Frame):
         list_container: tk.Frame = tk.Frame(self.main_area, bg="white")
         list_container.pack(fill="both", expand=True, padx=30, pady=(0, 30))
 
-        list_container.bind("<Enter>", lambda _: self.canvas.bind_all("<MouseWheel>", self._on_mousewheel))
-        list_container.bind("<Leave>", lambda _: self.canvas.unbind_all("<MouseWheel>"))
-
-        # Encabezados de la tabla CON PRECIO
-        header_frame: tk.Frame = tk.Frame(list_container, bg="white")
-        header_frame.pack(fill="x", pady=5)
-        
-        # Cambiado: añadida columna "PRECIO" entre "CANTIDAD" y "UBICACIÓN"
-        headers: List[str] = ["PRODUCTO / SKU", "STOCK", "PRECIO", "UBICACIÓN", "ESTADO", "ACCIONES"]
-        for i, (text, w) in enumerate(zip(headers, COLUMN_WEIGHTS)):
-            header_frame.columnconfigure(i, weight=w, uniform="table_col")
-            tk.Label(header_frame, text=text, font=("Segoe UI", 8, "bold"), 
-                     fg=COLORS["text_gray"], bg="white", anchor="w").grid(row=0, column=i, sticky="we", padx=10, pady=15)
+        # Tabla virtual: solo existen los widgets de las filas visibles, sin importar cuántos productos haya
+        self.tabla = TablaVirtual(
+            list_container, columnas=self._columnas_tabla(), alto_fila=56,
+            mensaje_vacio="No hay productos registrados", ancho_minimo=900,
+            clave_fila=lambda p: p.id
+        )
+        self.tabla.pack(fill="both", expand=True)
 
-        # Contenedor para canvas y scrollbars
-        table_container = tk.Frame(list_container, bg="white")
-        table_container.pack(fill="both", expand=True)
-        
-        # Scrollbar horizontal NUEVA
-        self.scrollbar_horizontal = ttk.Scrollbar(table_container, orient="horizontal")
-        
-        # Canvas con scrollbar vertical
-        self.canvas = tk.Canvas(table_container, bg="white", highlightthickness=0,
-                                xscrollcommand=self.scrollbar_horizontal.set)
-        
-        scrollbar_vertical = ttk.Scrollbar(table_container, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg="white")
-        
-        self.scrollable_frame.bind("<Configure>", lambda e: self.canvas.configure(
-            scrollregion=self.canvas.bbox("all")
-        ))
-        
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar_vertical.set)
-        self.scrollbar_horizontal.configure(command=self.canvas.xview)
-        
-        # Empaquetar widgets
-        self.canvas.pack(side="left", fill="both", expand=True)
-        scrollbar_vertical.pack(side="right", fill="y")
-        self.scrollbar_horizontal.pack(side="bottom", fill="x")
-        
-        # Configurar scroll horizontal
-        self._configurar_scroll_horizontal()
-        
         self.cargar_datos()
 
-    def _configurar_scroll_horizontal(self) -> None:
-        """Configura el comportamiento del scroll horizontal."""
-        def on_frame_configure(event):
-            # Actualizar scrollregion cuando el frame cambia de tamaño
-            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-            
-        def on_canvas_configure(event):
-            # Ajustar el ancho del frame interior al del canvas
-            canvas_width = event.width
-            self.canvas.itemconfig("all", width=canvas_width)
-        
-        self.scrollable_frame.bind("<Configure>", on_frame_configure)
-        self.canvas.bind("<Configure>", on_canvas_configure)
-
-    def cargar_datos(self, filtro: str = "") -> None:
-        """Carga los productos desde la base de datos con filtro opcional."""
-        if not self.scrollable_frame:
-            return
-            
-        # Limpiar frame
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        try:
-            # Obtener productos
-            productos: List[Tuple[Any, ...]] = get_all_products()
-            self.productos_cache = []
-            
-            for p in productos:
-                # Estructura de get_all_products(): (id, name, sku, category, stock, location, precio, proveedor, estado)
-                producto_dict = {
-                    'id': p[0],
-                    'nombre': p[1],
-                    'sku': p[2],
-                    'categoria': p[3],
-                    'stock': p[4],
-                    'unidad_medida': p[5],
-                    'ubicacion': p[6],
-                    'precio': float(p[7]) if p[7] else 0.0,  # Convertir a float
-                    'proveedor': p[8],
-                    'estado': p[9]
-                }
-                self.productos_cache.append(producto_dict)
-                
-                # Aplicar filtro si existe
-                if filtro:
-                    filtro_lower = filtro.lower()
-                    sku_match = filtro_lower in str(producto_dict['sku']).lower()
-                    nombre_match = filtro_lower in str(producto_dict['nombre']).lower()
-                    if not (sku_match or nombre_match):
-                        continue
-                    
-                # Crear fila
-                self._crear_fila_producto(producto_dict)
-
-        except Exception as e:
-            print(f"Error al cargar productos: {e}")
-            tk.Label(self.scrollable_frame, text="Error al cargar productos", 
-                    font=FONT_BODY, fg=COLORS["error_fg"], bg="white").pack(pady=50)
-            return
-
-        # Si no hay productos
-        if not self.scrollable_frame.winfo_children():
-            tk.Label(self.scrollable_frame, text="No hay productos registrados", 
-                    font=FONT_BODY, fg=COLORS["text_gray"], bg="white").pack(pady=50)
-
-    def _crear_fila_producto(self, producto: Dict[str, Any]) -> None:
-        """Crea una fila en la tabla para un producto."""
-        row: tk.Frame = tk.Frame(self.scrollable_frame, bg="white", pady=10)
-        row.pack(fill="x")
-        
-        # Configurar columnas (6 columnas ahora con PRECIO)
-        for i, weight in enumerate(COLUMN_WEIGHTS):
-            row.columnconfigure(i, weight=weight, uniform="table_col")
-
-        # 1. Producto y SKU
-        f_prod: tk.Frame = tk.Frame(row, bg="white")
-        f_prod.grid(row=0, column=0, sticky="w", padx=10)
-
-        tk.Label(f_prod, text="📦", font=("Arial", 14), bg="#F3F4F6", width=3).grid(row=0, column=0, padx=10)
-
-        nombre_display = producto['nombre']
-        if len(nombre_display) > 25:
-            nombre_display = nombre_display[:22] + "..."
-            
-        lbl_name: tk.Label = tk.Label(f_prod, text=nombre_display, font=("Segoe UI", 9, "bold"), bg="white", anchor="w", justify="left", width=25)
-        lbl_name.grid(row=0, column=1, sticky="we")
-
-        if len(nombre_display) > 22: 
-            ToolTip(lbl_name, nombre_display)
-
-        tk.Label(f_prod, text=producto['sku'], font=FONT_SMALL, fg=COLORS["text_gray"], bg="white").grid(row=1, column=1, sticky="w")
-
-        # 2. Cantidad
-        stock = producto['stock']
-        unidad_medida = producto['unidad_medida']
-        tk.Label(row, text=f"{stock} {unidad_medida}", font=("Segoe UI", 9, "bold"), bg="white", anchor="center", justify="left").grid(row=0, column=1, sticky="we", padx=10)
-
-        # 3. PRECIO
-        precio = producto['precio']
-        precio_text = f"${precio:.2f}" if precio > 0 else "$0.00"
-        tk.Label(row, text=precio_text, font=("Segoe UI", 9, "bold"), bg="white", anchor="center", justify="left").grid(row=0, column=2, sticky="we", padx=10)
-
-        # 4. Ubicación
-        ubicacion = producto['ubicacion'] or "Sin ubicación"
-        tk.Label(row, text=f"📍 {ubicacion}", font=FONT_SMALL, bg="#F3F4F6", anchor="w", justify="center").grid(row=0, column=3, sticky="we", padx=10)
+    def _columnas_tabla(self) -> List[Columna]:
+        """Columnas de la tabla de productos (se ordenan haciendo clic en el encabezado)."""
+        acciones: List[AccionFila] = [
+            # Botón Ajustar
+            AccionFila("📊", lambda p: self._abrir_modal_ajuste(p.id, p.nombre),
+                       fg=COLORS["primary"], fuente=("Segoe UI", 14)),
+            # Botón Editar
+            AccionFila("ᴇᴅɪᴛ", lambda p: self.abrir_modal_editar_producto(p.id, p.nombre, p.sku, p.categoria, p.ubicacion),
+                       fg="#2563EB", fuente=("Segoe UI", 14), ancho=3),
+            # Botón Eliminar
+            AccionFila("ᴅᴇʟ", lambda p: self.confirmar_eliminacion(p.id, p.nombre),
+                       fg="#DC2626", fuente=("Segoe UI", 14), ancho=3),
+        ]
 
-        # 5. Estado
-        estado = producto['estado']
-        estado_colors = {
-            "In Stock": (COLORS["success_bg"], COLORS["success_fg"]),
-            "Low Stock": (COLORS["warning_bg"], COLORS["warning_fg"]),
-            "Out of Stock": (COLORS["error_bg"], COLORS["error_fg"])
-        }
-        
-        bg_st, fg_st = estado_colors.get(estado, (COLORS["info_bg"], COLORS["info_fg"]))
-        
-        lbl_st = tk.Label(row, text=estado, font=("Segoe UI", 8, "bold"), anchor="w", justify="center", bg=bg_st, fg=fg_st, padx=8)
-        lbl_st.grid(row=0, column=4, sticky="we", padx=10)
+        # Botón View Details (solo si es admin)
+        current_user = get_current_user()
+        if current_user and current_user.role == 'Administrador':
+            acciones.append(AccionFila("☰", lambda p: self._ver_detalles(p.id),
+                                       fg=COLORS["primary"], fuente=("Segoe UI", 14)))
+
+        return [
+            Columna("nombre", "PRODUCTO / SKU", peso=COLUMN_WEIGHTS[0], icono="📦",
+                    fuente=("Segoe UI", 9, "bold"), secundario=lambda p: p.sku, max_caracteres=25),
+            Columna("stock", "STOCK", peso=COLUMN_WEIGHTS[1], fuente=("Segoe UI", 9, "bold"), anchor="center",
+                    texto=lambda p: f"{p.stock} {p.unidad_medida}"),
+            Columna("precio", "PRECIO", peso=COLUMN_WEIGHTS[2], fuente=("Segoe UI", 9, "bold"), anchor="center",
+                    texto=lambda p: f"${p.precio:.2f}" if p.precio > 0 else "$0.00"),
+            Columna("ubicacion", "UBICACIÓN", peso=COLUMN_WEIGHTS[3], fuente=FONT_SMALL,
+                    texto=lambda p: f"📍 {p.ubicacion or 'Sin ubicación'}", estilo=lambda p: {"bg": "#F3F4F6"}),
+            Columna("estado", "ESTADO", peso=COLUMN_WEIGHTS[4], fuente=("Segoe UI", 8, "bold"),
+                    estilo=self._estilo_estado),
+            Columna("acciones", "ACCIONES", peso=COLUMN_WEIGHTS[5], ordenable=False, acciones=acciones),
+        ]
 
-        # 6. ACCIONES
-        btn_frame = tk.Frame(row, bg="white")
-        btn_frame.grid(row=0, column=5, sticky="we", padx=10)
-        
-        # # Botón Adjust Stock
-        # btn_ajuste = tk.Button(btn_frame, text="Adjust Stock", font=("Segoe UI", 8, "bold"), 
-        #                        fg=COLORS["primary"], bg="white", relief="flat", cursor="hand2",
-        #                        command=lambda pid=producto['id'], pname=producto['nombre']: self._abrir_modal_ajuste(pid, pname))
-        # btn_ajuste.pack(side="left", padx=2)
+    @staticmethod
+    def _estilo_estado(producto: Producto) -> Dict[str, str]:
+        """Colores del badge de estado."""
+        bg_st, fg_st = ESTADO_COLORS.get(producto.estado, (COLORS["info_bg"], COLORS["info_fg"]))
+        return {"bg": bg_st, "fg": fg_st}
+
+    def cargar_datos(self, filtro: Optional[str] = None) -> None:
+        """
+        Carga los productos desde la base de datos (en segundo plano).
+        Sin filtro explícito se recarga con el texto que hay en el buscador.
+        """
+        if not self.tabla:
+            return
+        if filtro is None:
+            filtro = self.entry_search.get()
+            if filtro == "Buscar por SKU, Nombre...":
+                filtro = ""
 
-        # Botón Ajustar
-        tk.Button(btn_frame, text="📊", font=("Segoe UI", 14), fg=COLORS["primary"], bg="white",
-                  relief="flat", cursor="hand2", command=lambda: self._abrir_modal_ajuste(producto['id'], producto['nombre'])).grid(row=0, column=6, sticky="w")
+        # El catálogo compartido se (re)carga en un hilo de trabajo; una carga nueva descarta la anterior
+        self.busqueda.buscar_ahora(filtro)
 
-        # Botón Editar
-        tk.Button(btn_frame, text="ᴇᴅɪᴛ", font=("Segoe UI", 14), fg="#2563EB", bg="white", width=3,
-                  relief="flat", cursor="hand2", command=lambda: self.abrir_modal_editar_producto(producto['id'], producto['nombre'], producto['sku'], producto['categoria'], producto['ubicacion'])).grid(row=0, column=7, sticky="e")
+    def on_activate(self) -> None:
+        """Al volver a la pestaña: recarga el filtro actual (solo cambian las filas afectadas)."""
+        self.cargar_datos()
 
-        # Botón Eliminar
-        tk.Button(btn_frame, text="ᴅᴇʟ", font=("Segoe UI", 14), fg="#DC2626", bg="white", width=3,
-                  relief="flat", cursor="hand2", command=lambda: self.confirmar_eliminacion(producto['id'], producto['nombre'])).grid(row=0, column=8, sticky="e")
-        
-        # Botón View Details (solo si es admin)
-        current_user = get_current_user()
-        if current_user and current_user.role == 'Administrador':
-            btn_detalles = tk.Button(btn_frame, text="☰", font=("Segoe UI", 14),
-                                    fg=COLORS["primary"], bg="white", relief="flat", cursor="hand2",
-                                    command=lambda pid=producto['id']: self._ver_detalles(pid))
-            btn_detalles.grid(row=0, column=9, sticky="w")
+    def _mostrar_productos(self, productos: List[Producto], filtro: Optional[str] = None) -> None:
+        """Muestra en la tabla el resultado de cargar_datos (hilo de Tk)."""
+        if not self.tabla:
+            return
+        self.tabla.set_pie("")
+        if filtro is not None and filtro == self._filtro_mostrado:
+            # Recarga del mismo filtro (tras un ajuste o una edición): solo cambian las filas afectadas
+            self.tabla.actualizar_filas(productos)
+        else:
+            self.tabla.set_filas(productos)
+        self._filtro_mostrado = filtro
 
-        # Separador
-        tk.Frame(self.scrollable_frame, bg=COLORS["border"], height=1).pack(fill="x")
+    def _mostrar_error_carga(self, error: BaseException) -> None:
+        print(f"Error al cargar productos: {error}")
+        if not self.tabla:
+            return
+        self._filtro_mostrado = None
+        self.tabla.set_pie("")
+        self.tabla.mostrar_mensaje("Error al cargar productos", COLORS["error_fg"])
 
     def confirmar_eliminacion(self, p_id: int, name: str) -> None:
-        if messagebox.askyesno("Confirmar", f"¿Eliminar definitivamente '{name}'?"):
-            if eliminar_producto(p_id):
+        if not messagebox.askyesno("Confirmar", f"¿Eliminar definitivamente '{name}'?"):
+            return
+
+        def al_terminar(eliminado: bool) -> None:
+            if eliminado:
                 self.cargar_datos() # Re-dibuja la tabla
                 messagebox.showinfo("✅ Éxito", f"Producto '{name}' eliminado.")
+            else:
+                messagebox.showerror("❌ Error", f"No se pudo eliminar '{name}'.")
+
+        get_executor().enviar(
+            eliminar_producto, p_id,
+            al_terminar=al_terminar,
+            al_fallar=lambda e: messagebox.showerror("❌ Error", f"No se pudo eliminar '{name}':\n\n{str(e)}")
+        )
 
     def abrir_modal_editar_producto(self, p_id: int, name: str, sku: str, cat: str, loc: str) -> None:
         modal = Toplevel(self)
@@ -327,13 +246,31 @@ class InventarioView(tk.Frame):
                 "categoria": entries["category"].get().strip(),
                 "ubicacion": entries["location"].get().strip()
             }
-            if actualizar_producto(p_id, data):
+            btn_guardar.config(state="disabled")
+            get_executor().enviar(
+                actualizar_producto, p_id, data,
+                al_terminar=al_terminar,
+                al_fallar=al_fallar
+            )
+
+        def al_terminar(actualizado: bool) -> None:
+            """Resultado de actualizar_producto (hilo de Tk)."""
+            if not modal.winfo_exists():
+                return
+            btn_guardar.config(state="normal")
+            if actualizado:
                 messagebox.showinfo("Éxito", "Producto actualizado")
                 self.cargar_datos()
                 modal.destroy()
 
-        tk.Button(modal, text="Guardar Cambios", bg=COLORS["primary"], fg="white", font=("Segoe UI", 10, "bold"), 
-                  relief="flat", pady=10, command=actualizar).pack(fill="x", padx=20, pady=25)
+        def al_fallar(error: BaseException) -> None:
+            if modal.winfo_exists():
+                btn_guardar.config(state="normal")
+            messagebox.showerror("❌ Error", f"No se pudo actualizar el producto:\n\n{str(error)}")
+
+        btn_guardar = tk.Button(modal, text="Guardar Cambios", bg=COLORS["primary"], fg="white", font=("Segoe UI", 10, "bold"), 
+                  relief="flat", pady=10, command=actualizar)
+        btn_guardar.pack(fill="x", padx=20, pady=25)
 
     def _abrir_modal_ajuste(self, p_id: int, p_name: str) -> None:
         """Modal para ajustar stock usando el nuevo InventoryManager."""
@@ -368,12 +305,12 @@ class InventarioView(tk.Frame):
         # Ubicación (si hay múltiples)
         tk.Label(modal, text="Ubicación", bg="white", font=FONT_SMALL, fg=COLORS["text_gray"]).pack(anchor="center", pady=(10, 0))
         ubicaciones = obtener_ubicaciones()
-        ubicacion_options = [f"{ub[1]} (ID: {ub[0]})" for ub in ubicaciones] if ubicaciones else ["Predeterminada"]
+        # Automática: las salidas se reparten entre las ubicaciones con stock; lo demás va a la predeterminada
+        ubicacion_options = ["Automática"] + [f"{ub[1]} (ID: {ub[0]})" for ub in ubicaciones]
         
         combo_ubicacion = ttk.Combobox(modal, values=ubicacion_options, state="readonly", font=FONT_SMALL)
         combo_ubicacion.pack(fill="x", pady=5)
-        if ubicacion_options:
-            combo_ubicacion.set(ubicacion_options[0])
+        combo_ubicacion.set(ubicacion_options[0])
 
         # Detalle adicional
         tk.Label(modal, text="Detalle (OPCIONAL)", bg="white", font=FONT_SMALL, fg=COLORS["text_gray"]).pack(anchor="center", pady=(10, 0))
@@ -393,53 +330,69 @@ class InventarioView(tk.Frame):
 
                 # Obtener ID de ubicación
                 ubicacion_id = None
-                if ubicaciones and combo_ubicacion.get():
-                    ubicacion_str = combo_ubicacion.get()
-                    # Extraer ID de la cadena "Código (ID: X)"
-                    if "(ID:" in ubicacion_str:
-                        ubicacion_id = int(ubicacion_str.split("(ID:")[1].strip()[:-1])
-                    else:
-                        # Si no tiene formato con ID, usar la primera ubicación
-                        ubicacion_id = ubicaciones[0][0] if ubicaciones else None
-
-                # Ejecutar según tipo
-                if tipo_str == "Entrada (IN)":
-                    self.inv_manager.registrar_entrada(
-                        product_id=p_id,
-                        quantity=cantidad,
-                        razon=razon,
-                        ubicacion_id=ubicacion_id,
-                        razon_detalle=detalle,
-                        user_id=self.current_user_id
-                    )
-                    
-                elif tipo_str == "Salida (OUT)":
-                    self.inv_manager.registrar_salida(
-                        product_id=p_id,
-                        quantity=cantidad,
-                        razon=razon,
-                        ubicacion_id=ubicacion_id,
-                        razon_detalle=detalle,
-                        user_id=self.current_user_id
-                    )
-                    
-                else:  # Ajuste Manual
-                    self.inv_manager.ajuste_manual(
-                        product_id=p_id,
-                        cantidad_nueva=cantidad,
-                        ubicacion_id=ubicacion_id,
-                        razon_detalle=detalle,
-                        user_id=self.current_user_id
-                    )
-
-                messagebox.showinfo("✅ Éxito", "Stock actualizado correctamente")
-                self.cargar_datos()  # Refrescar tabla
-                modal.destroy()
-                
+                ubicacion_str = combo_ubicacion.get()
+                # Extraer ID de la cadena "Código (ID: X)" ("Automática" queda en None)
+                if "(ID:" in ubicacion_str:
+                    ubicacion_id = int(ubicacion_str.split("(ID:")[1].strip()[:-1])
             except ValueError as e:
                 messagebox.showerror("❌ Error de Validación", str(e))
-            except Exception as e:
-                messagebox.showerror("❌ Error del Sistema", f"No se pudo realizar el ajuste:\n\n{str(e)}")
+                return
+
+            # El movimiento se registra en un hilo de trabajo; el resultado vuelve al hilo de Tk
+            btn_confirmar.config(state="disabled")
+            get_executor().enviar(
+                _ajustar_bd, tipo_str, razon, cantidad, ubicacion_id, detalle,
+                al_terminar=al_terminar,
+                al_fallar=al_fallar
+            )
+
+        def _ajustar_bd(
+            tipo_str: str, razon: str, cantidad: int, ubicacion_id: Optional[int], detalle: str
+        ) -> None:
+            """Registra el ajuste según el tipo. Corre en un hilo de trabajo: no toca widgets."""
+            if tipo_str == "Entrada (IN)":
+                self.inv_manager.registrar_entrada(
+                    product_id=p_id,
+                    quantity=cantidad,
+                    razon=razon,
+                    ubicacion_id=ubicacion_id,
+                    razon_detalle=detalle,
+                    user_id=self.current_user_id
+                )
+
+            elif tipo_str == "Salida (OUT)":
+                self.inv_manager.registrar_salida(
+                    product_id=p_id,
+                    quantity=cantidad,
+                    razon=razon,
+                    ubicacion_id=ubicacion_id,
+                    razon_detalle=detalle,
+                    user_id=self.current_user_id
+                )
+
+            else:  # Ajuste Manual
+                self.inv_manager.ajuste_manual(
+                    product_id=p_id,
+                    cantidad_nueva=cantidad,
+                    ubicacion_id=ubicacion_id,
+                    razon_detalle=detalle,
+                    user_id=self.current_user_id
+                )
+
+        def al_terminar(_: None) -> None:
+            """Ajuste registrado (hilo de Tk)."""
+            messagebox.showinfo("✅ Éxito", "Stock actualizado correctamente")
+            self.cargar_datos()  # Refrescar tabla
+            if modal.winfo_exists():
+                modal.destroy()
+
+        def al_fallar(error: BaseException) -> None:
+            if modal.winfo_exists():
+                btn_confirmar.config(state="normal")
+            if isinstance(error, ValueError):
+                messagebox.showerror("❌ Error de Validación", str(error))
+            else:
+                messagebox.showerror("❌ Error del Sistema", f"No se pudo realizar el ajuste:\n\n{str(error)}")
 
         # Botones
         btn_frame = tk.Frame(modal, bg="white")
@@ -449,18 +402,15 @@ class InventarioView(tk.Frame):
                   font=FONT_BODY, relief="flat", padx=20, pady=8,
                   command=modal.destroy).pack(side="left", padx=5)
         
-        tk.Button(btn_frame, text="✅ Confirmar Ajuste", bg=COLORS["primary"], fg="white",
+        btn_confirmar = tk.Button(btn_frame, text="✅ Confirmar Ajuste", bg=COLORS["primary"], fg="white",
                   font=("Segoe UI", 10, "bold"), relief="flat", padx=20, pady=8,
-                  command=ejecutar_ajuste).pack(side="right", padx=5)
+                  command=ejecutar_ajuste)
+        btn_confirmar.pack(side="right", padx=5)
 
     def _ver_detalles(self, producto_id: int) -> None:
         """Muestra los detalles de un producto."""
-        # Buscar producto en cache
-        producto = None
-        for p in self.productos_cache:
-            if p['id'] == producto_id:
-                producto = p
-                break
+        # Buscar producto en el catálogo compartido
+        producto = get_catalogo().por_id(producto_id)
         
         if not producto:
             messagebox.showwarning("Producto no encontrado", "El producto no existe o ha sido eliminado.")
@@ -468,26 +418,26 @@ class InventarioView(tk.Frame):
             
         # Crear ventana de detalles
         modal = Toplevel(self)
-        modal.title(f"📦 Detalles: {producto['nombre']}")
+        modal.title(f"📦 Detalles: {producto.nombre}")
         modal.geometry("450x350")
         modal.configure(bg="white", padx=25, pady=25)
         modal.resizable(False, False)
         
         # Título
-        tk.Label(modal, text=f"📦 {producto['nombre']}", font=FONT_H2, bg="white").pack(anchor="w")
-        tk.Label(modal, text=f"SKU: {producto['sku']}", font=FONT_BODY, bg="white").pack(anchor="w", pady=(0, 15))
+        tk.Label(modal, text=f"📦 {producto.nombre}", font=FONT_H2, bg="white").pack(anchor="w")
+        tk.Label(modal, text=f"SKU: {producto.sku}", font=FONT_BODY, bg="white").pack(anchor="w", pady=(0, 15))
         
         # Mostrar información
         info_frame = tk.Frame(modal, bg="white")
         info_frame.pack(fill="both", expand=True, pady=10)
         
         detalles = [
-            ("Categoría:", producto['categoria'] or "No especificada"),
-            ("Stock Actual:", f"{producto['stock']} unidades"),
-            ("Ubicación:", producto['ubicacion'] or "No asignada"),
-            ("Precio:", f"${producto['precio']:.2f}" if producto['precio'] else "No definido"),
-            ("Proveedor:", producto['proveedor'] or "No especificado"),
-            ("Estado:", producto['estado'])
+            ("Categoría:", producto.categoria or "No especificada"),
+            ("Stock Actual:", f"{producto.stock} unidades"),
+            ("Ubicación:", producto.ubicacion or "No asignada"),
+            ("Precio:", f"${producto.precio:.2f}" if producto.precio else "No definido"),
+            ("Proveedor:", producto.proveedor or "No especificado"),
+            ("Estado:", producto.estado)
         ]
         
         for label, valor in detalles:
@@ -645,84 +595,103 @@ class InventarioView(tk.Frame):
         
         # Función GUARDAR
         def guardar_producto() -> None:
-            try:
-                # 1. Recuperar y limpiar datos
-                nombre: str = entries["nombre"].get().strip()
-                sku: str = entries["sku"].get().strip()
-                precio_str: str = entries["precio"].get().strip()
-                
-                # 2. Validaciones de interfaz
-                if not nombre or not sku or not precio_str:
-                    messagebox.showwarning("❌ Error", "Complete los campos obligatorios (*)")
-                    return
-
-                try:
-                    precio: float = float(precio_str)
-                    stock_min_str: str = entries["stock_min"].get().strip()
-                    cantidad_inicial: int = int(stock_min_str) if stock_min_str else 0
-                    if precio <= 0: raise ValueError
-                except ValueError:
-                    messagebox.showwarning("❌ Error", "Valores numéricos inválidos")
-                    return
+            # 1. Recuperar y limpiar datos
+            nombre: str = entries["nombre"].get().strip()
+            sku: str = entries["sku"].get().strip()
+            precio_str: str = entries["precio"].get().strip()
 
-                # 3. Preparar datos
-                categoria: str = entries["categoria"].get().strip() or "General"
-                proveedor: str = entries["proveedor"].get().strip() or ""
-                unidad: str = entries["unidad"].get()
-                ubicacion: str = entries["ubicacion"].get().strip() or "Almacén Principal"
+            # 2. Validaciones de interfaz
+            if not nombre or not sku or not precio_str:
+                messagebox.showwarning("❌ Error", "Complete los campos obligatorios (*)")
+                return
 
-                datos_producto: tuple = (
-                    nombre, sku, categoria, precio, 
-                    proveedor, unidad, cantidad_inicial, ubicacion
+            try:
+                precio: float = float(precio_str)
+                stock_min_str: str = entries["stock_min"].get().strip()
+                cantidad_inicial: int = int(stock_min_str) if stock_min_str else 0
+                if precio <= 0: raise ValueError
+            except ValueError:
+                messagebox.showwarning("❌ Error", "Valores numéricos inválidos")
+                return
+
+            # 3. Preparar datos
+            categoria: str = entries["categoria"].get().strip() or "General"
+            proveedor: str = entries["proveedor"].get().strip() or ""
+            unidad: str = entries["unidad"].get()
+            ubicacion: str = entries["ubicacion"].get().strip() or "Almacén Principal"
+
+            datos_producto: tuple = (
+                nombre, sku, categoria, precio, 
+                proveedor, unidad, cantidad_inicial, ubicacion
+            )
+
+            # 4. Inserción en un hilo de trabajo; el resultado vuelve al hilo de Tk
+            btn_guardar.config(state="disabled")
+            get_executor().enviar(
+                _crear_producto_bd, datos_producto, cantidad_inicial,
+                al_terminar=lambda producto_id: al_terminar(producto_id, nombre, sku, precio, ubicacion),
+                al_fallar=al_fallar
+            )
+
+        def _crear_producto_bd(datos_producto: tuple, cantidad_inicial: int) -> Optional[int]:
+            """Inserta el producto y su stock inicial. Corre en un hilo de trabajo: no toca widgets."""
+            # Aquí manejamos el posible SKU duplicado según lo que devuelve tu insert_product
+            producto_id: Optional[int] = insert_product(datos_producto)
+
+            # 5. Registro de Inventario (Solo si se creó el producto)
+            if producto_id is not None and cantidad_inicial > 0:
+                try:
+                    self.inv_manager.registrar_entrada(
+                        product_id=producto_id,
+                        quantity=cantidad_inicial,
+                        razon="ajuste manual",
+                        razon_detalle="Carga inicial de producto nuevo"
+                    )
+                except Exception as e_inv:
+                    # No detenemos el proceso si el producto se creó pero el stock falló
+                    print(f"Aviso: Producto {producto_id} creado pero falló stock: {e_inv}")
+            return producto_id
+
+        def al_terminar(producto_id: Optional[int], nombre: str, sku: str, precio: float, ubicacion: str) -> None:
+            """Resultado de _crear_producto_bd (hilo de Tk)."""
+            if not modal.winfo_exists():
+                self.cargar_datos()
+                return
+            btn_guardar.config(state="normal")
+
+            if producto_id is None:
+                # Si insert_product devolvió None es porque falló el SKU (según tu execute_query)
+                messagebox.showerror("❌ SKU Duplicado", f"El código '{sku}' ya existe.")
+                entries["sku"].focus_set()
+                entries["sku"].selection_range(0, tk.END)
+                return
+
+            # 6. Éxito final
+            messagebox.showinfo(
+                    "✅ Éxito",
+                    f"Producto creado exitosamente!\n\n"
+                    f"📦 Nombre: {nombre}\n"
+                    f"🔢 SKU: {sku}\n"
+                    f"💰 Precio: ${precio:.2f}\n"
+                    f"📍 Ubicación: {ubicacion}"
                 )
 
-                # 4. Intento de inserción (Lógica de Negocio)
-                # Aquí manejamos el posible SKU duplicado según lo que devuelve tu insert_product
-                producto_id: Optional[int] = insert_product(datos_producto)
-
-                if producto_id is None:
-                    # Si insert_product devolvió None es porque falló el SKU (según tu execute_query)
-                    messagebox.showerror("❌ SKU Duplicado", f"El código '{sku}' ya existe.")
+            self.cargar_datos() # Refrescar tabla de la vista principal
+            unbind_mousewheel()
+            modal.destroy()
+
+        def al_fallar(error: BaseException) -> None:
+            # Captura cualquier error no controlado
+            if modal.winfo_exists():
+                btn_guardar.config(state="normal")
+            error_msg: str = str(error)
+            if "UNIQUE constraint failed" in error_msg:
+                messagebox.showerror("❌ Error", "El SKU ya existe.")
+                if modal.winfo_exists():
                     entries["sku"].focus_set()
-                    entries["sku"].selection_range(0, tk.END)
-                    return
-
-                # 5. Registro de Inventario (Solo si se creó el producto)
-                if cantidad_inicial > 0:
-                    try:
-                        self.inv_manager.registrar_entrada(
-                            product_id=producto_id,
-                            quantity=cantidad_inicial,
-                            razon="ajuste manual",
-                            razon_detalle="Carga inicial de producto nuevo"
-                        )
-                    except Exception as e_inv:
-                        # No detenemos el proceso si el producto se creó pero el stock falló
-                        print(f"Aviso: Producto {producto_id} creado pero falló stock: {e_inv}")
-
-                # 6. Éxito final
-                messagebox.showinfo(
-                        "✅ Éxito",
-                        f"Producto creado exitosamente!\n\n"
-                        f"📦 Nombre: {nombre}\n"
-                        f"🔢 SKU: {sku}\n"
-                        f"💰 Precio: ${precio:.2f}\n"
-                        f"📍 Ubicación: {ubicacion}"
-                    )
-                
-                self.cargar_datos() # Refrescar tabla de la vista principal
-                unbind_mousewheel()
-                modal.destroy()
+            else:
+                messagebox.showerror("❌ Error Inesperado", f"Ocurrió un error: {error_msg}")
 
-            except Exception as e:
-                # Captura cualquier error no controlado
-                error_msg: str = str(e)
-                if "UNIQUE constraint failed" in error_msg:
-                    messagebox.showerror("❌ Error", "El SKU ya existe.")
-                    entries["sku"].focus_set()
-                else:
-                    messagebox.showerror("❌ Error Inesperado", f"Ocurrió un error: {error_msg}")
-                
         # Botón Cancelar
         btn_cancelar = tk.Button(
             button_frame,
@@ -804,13 +773,8 @@ class InventarioView(tk.Frame):
     def _on_search_key_release(self, event=None) -> None:
         filtro = self.entry_search.get()
         if filtro != "Buscar por SKU, Nombre...":
-            self.cargar_datos(filtro)
+            self.busqueda.escribir(filtro)
     
-    def _on_mousewheel(self, event: tk.Event) -> None:
-        if self.canvas:
-            # En Windows es event.delta, en Linux suele ser event.num
-            self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
     # NUEVO: Búsqueda por SKU
     def busqueda_sku_rapida(self) -> None:
         """Realiza una búsqueda específica por SKU."""
@@ -819,32 +783,34 @@ class InventarioView(tk.Frame):
             messagebox.showinfo("Búsqueda por SKU", "Ingrese un SKU para buscar")
             return
         
-        # Usar la función de queries para buscar por SKU
-        from database.queries import buscar_producto_por_sku
-        producto = buscar_producto_por_sku(sku_busqueda)
-        
+        # Consulta en segundo plano; reemplaza cualquier carga o búsqueda pendiente de la tabla
+        self.busqueda.cancelar()
+        get_executor().enviar(
+            buscar_producto_por_sku, sku_busqueda,
+            al_terminar=lambda producto: self._mostrar_busqueda_sku(sku_busqueda, producto),
+            al_fallar=self._mostrar_error_carga,
+            clave="inventario.productos"
+        )
+
+    def _mostrar_busqueda_sku(self, sku_busqueda: str, producto: Optional[ProductoDetalle]) -> None:
+        """Muestra el resultado de busqueda_sku_rapida (hilo de Tk)."""
         if producto:
-            # Limpiar la vista
-            for widget in self.scrollable_frame.winfo_children():
-                widget.destroy()
-            
-            # Mostrar el producto encontrado
-            producto_dict = {
-                'id': producto['id'],
-                'nombre': producto['nombre'],
-                'sku': producto['sku'],
-                'categoria': producto['categoria'],
-                'stock': producto['stock_actual'],
-                'ubicacion': producto['ubicacion'],
-                'precio': producto['precio'],
-                'proveedor': producto['proveedor'],
-                'estado': 'In Stock' if producto['stock_actual'] > 0 else 'Out of Stock'
-            }
-            self._crear_fila_producto(producto_dict)
-            
-            # Mostrar mensaje
-            tk.Label(self.scrollable_frame, text=f"✔ Producto encontrado: {producto['nombre']}", 
-                    font=FONT_SMALL, fg=COLORS["success_fg"], bg="white").pack(pady=10)
+            # Mostrar solo el producto encontrado
+            self.tabla.set_filas([Producto(
+                id=producto.id,
+                nombre=producto.nombre,
+                sku=producto.sku,
+                categoria=producto.categoria,
+                stock=producto.stock_actual,
+                unidad_medida=producto.unidad_medida,
+                ubicacion=producto.ubicacion,
+                precio=producto.precio,
+                proveedor=producto.proveedor,
+                estado='In Stock' if producto.stock_actual > 0 else 'Out of Stock',
+                disponible=producto.disponible
+            )])
+            self._filtro_mostrado = None
+            self.tabla.set_pie(f"✔ Producto encontrado: {producto.nombre}", COLORS["success_fg"])
         else:
             messagebox.showinfo("Búsqueda por SKU", f"No se encontró ningún producto con SKU: {sku_busqueda}")
-            self.cargar_datos()  # Restaurar vista normal
+            self.cargar_datos("")  # Restaurar vista normal
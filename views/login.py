@@ -2,8 +2,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Any, Optional, Dict
 
-from services.auth_service import login
-
 class LoginView(tk.Frame):
     def __init__(self, parent: tk.Widget, controller: Any) -> None:
         super().__init__(parent)
@@ -161,6 +159,12 @@ class LoginView(tk.Frame):
             messagebox.showwarning("Datos incompletos", "Por favor ingrese usuario y contraseña")
             return
 
+        # Se importa al ingresar: el login se dibuja sin cargar la capa de datos.
+        # Si la BD todavía se está inicializando en segundo plano, se espera a que termine
+        from database.connection import asegurar_inicializada
+        from services.auth_service import login
+        asegurar_inicializada()
+
         if login(user, password):
             self.controller.show_main_system()
         else:
@@ -1,14 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from typing import Dict, List, Tuple, Optional, Union, Any
 from datetime import datetime
 
 # Importaciones locales
-from database.queries import get_movimientos_history, obtener_movimientos_por_fecha, obtener_ubicaciones
+from database.modelos import Movimiento
+from database.queries import obtener_movimientos_pagina, obtener_ubicaciones
 from services.auth_service import get_current_user
+from services.reportes import exportar_movimientos_csv
+from gui.components.db_executor import get_executor
 
 # Componentes
-from gui.components.tooltip import ToolTip
+from gui.components.busqueda import ControladorBusqueda
+from gui.components.tabla_virtual import AccionFila, Columna, TablaVirtual
 
 # --- CONFIGURACIÓN DE COLORES Y ESTILOS ---
 COLORS: Dict[str, str] = {
@@ -31,12 +35,19 @@ COLORS: Dict[str, str] = {
 
 COLUMN_WEIGHTS: List[int] = [4, 10, 5, 5, 5, 5, 5, 6]
 
+# Filas por página del historial (la siguiente se pide al acercarse al final de la tabla)
+TAMANO_PAGINA: int = 100
+
 FontTuple = Union[Tuple[str, int, str], Tuple[str, int]]
 FONT_TITLE: FontTuple = ("Segoe UI", 16, "bold")
 FONT_HEAD: FontTuple = ("Segoe UI", 8, "bold")
 FONT_BODY: FontTuple = ("Segoe UI", 9)
 FONT_SMALL: FontTuple = ("Segoe UI", 8)
 
+def _es_entrada(mov: Movimiento) -> bool:
+    return mov.tipo.upper() == "IN" or "↑ IN" in mov.tipo
+
+
 class MovimientosView(tk.Frame):
     def __init__(self, parent: tk.Widget) -> None:
         super().__init__(parent)
@@ -46,11 +57,18 @@ class MovimientosView(tk.Frame):
         self.main_content: tk.Frame = tk.Frame(self, bg=COLORS["bg_main"])
         self.main_content.pack(fill="both", expand=True, padx=30, pady=20)
 
-        # Referencias para el área de scroll
-        self.canvas: Optional[tk.Canvas] = None
-        self.scrollable_frame: Optional[tk.Frame] = None
-        self.scrollbar_vertical: Optional[ttk.Scrollbar] = None
-        self.scrollbar_horizontal: Optional[ttk.Scrollbar] = None
+        # Tabla del historial (se crea en _construir_tabla_movimientos)
+        self.tabla: Optional[TablaVirtual] = None
+
+        # Estado de la paginación (token de la siguiente página y filtro de fecha activo)
+        self._cursor_pagina: Optional[str] = None
+        self._filtro_fecha: bool = False
+        self._cargando: bool = False
+
+        # El texto de búsqueda se aplica cuando se deja de escribir (conserva el filtro de fecha)
+        self.busqueda = ControladorBusqueda(
+            self, al_disparar=lambda _texto: self.cargar_datos_historial(filtro_fecha=self._filtro_fecha)
+        )
 
         self._construir_header()
         self._construir_filtros()
@@ -75,6 +93,12 @@ class MovimientosView(tk.Frame):
                   padx=15, pady=6, cursor="hand2", font=("Segoe UI", 9, "bold"),
                   command=self.cargar_datos_historial).pack(side="right", padx=5)
 
+        # Botón Exportar (con los filtros activos)
+        tk.Button(title_row, text="⬇ Exportar CSV", bg=COLORS["white"], fg=COLORS["text_body"],
+                  relief="solid", bd=0, highlightthickness=1, highlightbackground=COLORS["border"],
+                  padx=15, pady=6, cursor="hand2", font=("Segoe UI", 9, "bold"),
+                  command=self.exportar_csv).pack(side="right", padx=5)
+
     def _construir_filtros(self) -> None:
         filter_bar: tk.Frame = tk.Frame(self.main_content, bg=COLORS["white"], padx=15, pady=15)
         filter_bar.pack(fill="x", pady=(0, 20))
@@ -151,262 +175,167 @@ class MovimientosView(tk.Frame):
                                              highlightbackground=COLORS["border"], highlightthickness=1)
         table_container.pack(fill="both", expand=True)
 
-        # Header de Columnas (CAMBIO: USUARIO → PROVEEDOR)
-        headers: List[str] = ["FECHA Y HORA", "PRODUCTO", "TIPO", "CANTIDAD", "RAZÓN", "PROVEEDOR", "UBICACIÓN", "DETALLES"]
-        
-        header_fr: tk.Frame = tk.Frame(table_container, bg="#F9FAFB", height=45)
-        header_fr.pack(fill="x")
-
-        for i, (h_text, w) in enumerate(zip(headers, COLUMN_WEIGHTS)):
-            header_fr.columnconfigure(i, weight=w, uniform="table_col")
-            tk.Label(header_fr, text=h_text, bg="#F9FAFB", fg=COLORS["text_light"],
-                     font=FONT_HEAD, anchor="w").grid(row=0, column=i, sticky="we", padx=8, pady=12)
-
-        # Contenedor principal para canvas y scrollbars
-        canvas_container = tk.Frame(table_container, bg=COLORS["white"])
-        canvas_container.pack(fill="both", expand=True)
-        
-        # Crear canvas
-        self.canvas = tk.Canvas(canvas_container, bg=COLORS["white"], highlightthickness=0)
-        
-        # Scrollbar vertical
-        self.scrollbar_vertical = ttk.Scrollbar(canvas_container, orient="vertical", command=self.canvas.yview)
-        
-        # Scrollbar horizontal (NUEVO)
-        self.scrollbar_horizontal = ttk.Scrollbar(canvas_container, orient="horizontal", command=self.canvas.xview)
-        
-        # Frame scrollable dentro del canvas
-        self.scrollable_frame = tk.Frame(self.canvas, bg=COLORS["white"])
-
-        # Configurar el canvas
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        # Tabla virtual (CAMBIO: USUARIO → PROVEEDOR). Las páginas llegan ordenadas por
+        # fecha desde la BD y se agregan al final, así que las columnas no se reordenan.
+        self.tabla = TablaVirtual(
+            table_container, columnas=self._columnas_tabla(), alto_fila=52,
+            mensaje_vacio="No hay movimientos registrados", ancho_minimo=1000,
+            al_acercarse_al_final=self._on_acercarse_al_final,
+            colores={"cabecera_bg": "#F9FAFB", "cabecera_fg": COLORS["text_light"], "icono_bg": "#EEE"}
         )
-
-        # Crear ventana en el canvas
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        
-        # Configurar el tamaño del canvas window para que se ajuste al contenido
-        self.canvas.bind("<Configure>", self._ajustar_ventana_canvas)
-        
-        # Configurar scrollbars
-        self.canvas.configure(
-            yscrollcommand=self.scrollbar_vertical.set,
-            xscrollcommand=self.scrollbar_horizontal.set  # NUEVO: scroll horizontal
-        )
-        
-        # Usar grid para mejor control
-        self.canvas.grid(row=0, column=0, sticky="nsew")
-        self.scrollbar_vertical.grid(row=0, column=1, sticky="ns")
-        self.scrollbar_horizontal.grid(row=1, column=0, sticky="ew")
-        
-        # Configurar expansión
-        canvas_container.grid_rowconfigure(0, weight=1)
-        canvas_container.grid_columnconfigure(0, weight=1)
+        self.tabla.pack(fill="both", expand=True)
 
         # Cargar datos iniciales
         self.cargar_datos_historial()
 
-    def _ajustar_ventana_canvas(self, event):
-        """Ajusta el ancho de la ventana del canvas al ancho del canvas."""
-        if self.canvas and self.canvas_window:
-            self.canvas.itemconfig(self.canvas_window, width=event.width)
+    def _columnas_tabla(self) -> List[Columna]:
+        """Columnas del historial (mismo contenido que las antiguas filas)."""
+        return [
+            Columna("fecha_movimiento", "FECHA Y HORA", peso=COLUMN_WEIGHTS[0], fuente=FONT_SMALL,
+                    fg=COLORS["text_body"], ordenable=False,
+                    texto=lambda m: str(m.fecha_movimiento)[:19]),
+            Columna("producto", "PRODUCTO", peso=COLUMN_WEIGHTS[1], icono="📦", fuente=("Segoe UI", 9, "bold"),
+                    fg=COLORS["text_header"], max_caracteres=25, ordenable=False,
+                    secundario=lambda m: f"SKU: {m.sku}" if m.sku else ""),
+            # Badge de tipo (IN/OUT)
+            Columna("tipo", "TIPO", peso=COLUMN_WEIGHTS[2], fuente=FONT_HEAD, ordenable=False,
+                    texto=lambda m: "↑ IN" if _es_entrada(m) else "↓ OUT",
+                    estilo=lambda m: {"bg": COLORS["success_bg"], "fg": COLORS["success_fg"]} if _es_entrada(m)
+                    else {"bg": COLORS["warning_bg"], "fg": COLORS["warning_fg"]}),
+            Columna("cantidad", "CANTIDAD", peso=COLUMN_WEIGHTS[3], fuente=("Segoe UI", 9, "bold"),
+                    anchor="center", ordenable=False,
+                    texto=lambda m: f"+{m.cantidad or 0}" if _es_entrada(m) else f"-{m.cantidad or 0}",
+                    estilo=lambda m: {"fg": COLORS["green_text"] if _es_entrada(m) else COLORS["red_text"]}),
+            Columna("razon", "RAZÓN", peso=COLUMN_WEIGHTS[4], fuente=FONT_BODY, fg=COLORS["text_body"],
+                    anchor="center", max_caracteres=20, ordenable=False),
+            Columna("proveedor", "PROVEEDOR", peso=COLUMN_WEIGHTS[5], fuente=FONT_SMALL, fg=COLORS["text_light"],
+                    anchor="center", ordenable=False, texto=lambda m: f"🏢 {m.proveedor or ''}"),
+            Columna("ubicacion", "UBICACIÓN", peso=COLUMN_WEIGHTS[6], fuente=FONT_SMALL, fg=COLORS["text_light"],
+                    anchor="center", ordenable=False, texto=lambda m: f"📍 {m.ubicacion or 'N/A'}"),
+            # Botón Detalles (siempre visible, muestra todos los detalles)
+            Columna("detalles", "DETALLES", peso=COLUMN_WEIGHTS[7], ordenable=False, acciones=[
+                AccionFila("📋 Detalles", self._ver_detalles, fg="white", bg=COLORS["primary"],
+                           fuente=("Segoe UI", 8)),
+            ]),
+        ]
 
-    def cargar_datos_historial(self, filtro_fecha: bool = False) -> None:
-        """Consulta la DB y refresca la lista de movimientos."""
-        if not self.scrollable_frame: 
+    def _on_acercarse_al_final(self) -> None:
+        """Pide la siguiente página cuando el scroll se acerca al final de la tabla."""
+        if self._cursor_pagina and not self._cargando:
+            self._cargando = True
+            self._cargar_pagina()
+
+    def on_activate(self) -> None:
+        """
+        Al volver a la pestaña: consulta solo el movimiento más reciente y
+        recarga el historial si hay movimientos nuevos (conserva filtros y scroll si no).
+        """
+        if not self.tabla or self._cargando:
             return
+        get_executor().enviar(
+            obtener_movimientos_pagina, 1, None, **self._filtros_activos(),
+            al_terminar=self._verificar_novedades,
+            clave="movimientos.novedades"
+        )
 
-        # Limpiar tabla
-        for w in self.scrollable_frame.winfo_children(): 
-            w.destroy()
-
-        try:
-            # Obtener datos de la base de datos
-            if filtro_fecha and self.entry_fecha_desde.get() and self.entry_fecha_hasta.get():
-                movimientos_data = obtener_movimientos_por_fecha(
-                    self.entry_fecha_desde.get(), 
-                    self.entry_fecha_hasta.get()
-                )
-            else:
-                movimientos_data = get_movimientos_history()
-
-            if not movimientos_data:
-                tk.Label(self.scrollable_frame, text="No hay movimientos registrados", 
-                        font=FONT_BODY, fg=COLORS["text_light"], bg=COLORS["white"]).pack(pady=50)
-                return
+    def _verificar_novedades(self, resultado: Tuple[List[Movimiento], Optional[str]]) -> None:
+        if not self.tabla:
+            return
+        recientes, _cursor = resultado
+        mostrado = self.tabla.filas[0].id if self.tabla.filas else None
+        nuevo = recientes[0].id if recientes else None
+        if nuevo != mostrado:
+            self.cargar_datos_historial(filtro_fecha=self._filtro_fecha)
 
-            # Procesar cada movimiento
-            for mov in movimientos_data:
-                # Verificar que el movimiento tenga suficientes elementos
-                if len(mov) < 7:  # Necesitamos al menos 7 elementos
-                    print(f"⚠ Movimiento incompleto: {mov}")
-                    continue
-                    
-                # Estructura esperada de get_movimientos_history():
-                # (fecha_movimiento, producto, tipo, cantidad, razon, usuario, ubicacion, observaciones)
-                fecha_movimiento = str(mov[0])
-                producto = str(mov[1]) if len(mov) > 1 else ""
-                tipo = str(mov[2]) if len(mov) > 2 else "IN"
-                cantidad = int(mov[3]) if len(mov) > 3 and mov[3] is not None else 0
-                razon = str(mov[4]) if len(mov) > 4 else ""
-                # CAMBIO: Usuario → Proveedor (campo 5 ahora es proveedor)
-                proveedor = str(mov[5]) if len(mov) > 5 else ""
-                ubicacion = str(mov[6]) if len(mov) > 6 else ""
-                observaciones = str(mov[7]) if len(mov) > 7 else ""
-                
-                # Extraer SKU si está disponible (algunas consultas pueden tenerlo)
-                sku = str(mov[8]) if len(mov) > 8 else ""
-                
-                # Aplicar filtros (CAMBIO: usuario → proveedor)
-                if self._aplicar_filtros(fecha_movimiento, producto, tipo, razon, proveedor, ubicacion):
-                    self._crear_fila(
-                        fecha_movimiento=fecha_movimiento,
-                        producto=producto,
-                        sku=sku,
-                        tipo=tipo,
-                        cantidad=cantidad,
-                        razon=razon,
-                        proveedor=proveedor,
-                        ubicacion=ubicacion,
-                        observaciones=observaciones
-                    )
+    def cargar_datos_historial(self, filtro_fecha: bool = False) -> None:
+        """Consulta la DB y refresca la lista de movimientos desde la primera página."""
+        if not self.tabla:
+            return
 
-        except Exception as e:
-            print(f"❌ Error al cargar movimientos: {e}")
-            import traceback
-            traceback.print_exc()
-            tk.Label(self.scrollable_frame, text="Error al cargar movimientos", 
-                    font=FONT_BODY, fg=COLORS["error_fg"], bg=COLORS["white"]).pack(pady=50)
+        self._filtro_fecha = bool(filtro_fecha and self.entry_fecha_desde.get() and self.entry_fecha_hasta.get())
+        self._cursor_pagina = None
+        self._cargando = True
+        self._cargar_pagina(primera=True)
 
-    def _aplicar_filtros(self, fecha: str, producto: str, tipo: str, 
-                        razon: str, proveedor: str, ubicacion: str) -> bool:
-        """Aplica todos los filtros activos de manera robusta."""
-        
-        # 1. Filtro de búsqueda (Texto libre)
-        search_text: str = self.search_entry.get().lower().strip()
-        if search_text and search_text != "buscar producto, razón...":
-            # Creamos una cadena con todo el contenido para buscar fácilmente
-            row_content: str = f"{producto} {razon} {proveedor} {fecha}".lower()
-            if search_text not in row_content:
-                return False
-
-        # 2. Filtro por TIPO (CORREGIDO)
+    def _filtros_activos(self) -> Dict[str, Optional[str]]:
+        """Traduce los controles de filtro a los parámetros de obtener_movimientos_pagina."""
+        search_text: str = self.search_entry.get().strip()
         tipo_filtro: str = self.combo_tipo.get() # Valores: "Todos", "IN", "OUT"
-        
-        if tipo_filtro != "Todos":
-            # Normalizamos el valor que viene de la Base de Datos
-            tipo_db_str: str = str(tipo).upper().strip()
-            
-            # Determinamos si el registro en DB es realmente una ENTRADA
-            # Usamos la misma lógica que usaste en _crear_fila para ser consistentes
-            es_entrada_db: bool = "IN" in tipo_db_str
-            
-            # Lógica de filtrado
-            if tipo_filtro == "IN" and not es_entrada_db:
-                return False # El usuario quiere IN, pero esto es OUT
-            
-            if tipo_filtro == "OUT" and es_entrada_db:
-                return False # El usuario quiere OUT, pero esto es IN
-
-        # 3. Filtro por UBICACIÓN
         ubicacion_filtro: str = self.combo_ubicacion.get()
-        if ubicacion_filtro != "Todas":
-            # Normalizamos también la ubicación por seguridad
-            if str(ubicacion_filtro).strip() != str(ubicacion).strip():
-                return False
-
-        return True
-
-    def _crear_fila(self, fecha_movimiento: str, producto: str, sku: str, tipo: str, 
-                   cantidad: int, razon: str, proveedor: str, ubicacion: str, observaciones: str) -> None:  # CAMBIO: usuario → proveedor
-        if not self.scrollable_frame: 
+        return {
+            'fecha_desde': self.entry_fecha_desde.get() if self._filtro_fecha else None,
+            'fecha_hasta': self.entry_fecha_hasta.get() if self._filtro_fecha else None,
+            'tipo': tipo_filtro if tipo_filtro != "Todos" else None,
+            'ubicacion': ubicacion_filtro if ubicacion_filtro != "Todas" else None,
+            'texto': search_text if search_text and search_text != "Buscar producto, razón..." else None,
+        }
+
+    def exportar_csv(self) -> None:
+        """Exporta a CSV todos los movimientos que cumplen los filtros actuales."""
+        ruta = filedialog.asksaveasfilename(
+            parent=self, title="Exportar movimientos", defaultextension=".csv",
+            initialfile=f"movimientos_{datetime.now():%Y%m%d_%H%M}.csv",
+            filetypes=[("CSV", "*.csv")]
+        )
+        if not ruta:
             return
+        # Se escribe en streaming y en un hilo de trabajo: no depende de cuántos movimientos haya
+        get_executor().enviar(
+            exportar_movimientos_csv, ruta, **self._filtros_activos(),
+            al_terminar=lambda filas: messagebox.showinfo("Exportar", f"✅ {filas} movimientos exportados a:\n{ruta}"),
+            al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo exportar: {e}")
+        )
 
-        row: tk.Frame = tk.Frame(self.scrollable_frame, bg=COLORS["white"], pady=10)
-        row.pack(fill="x")
-
-        for i, w in enumerate(COLUMN_WEIGHTS): 
-            row.columnconfigure(i, weight=w, uniform="table_col")
-        
-        # 1. Fecha y Hora
-        fecha_formateada = fecha_movimiento[:19] if len(fecha_movimiento) > 19 else fecha_movimiento
-        lbl_fecha = tk.Label(row, text=fecha_formateada, font=FONT_SMALL, bg=COLORS["white"], 
-                           fg=COLORS["text_body"], anchor="w")
-        lbl_fecha.grid(row=0, column=0, sticky="w", padx=5)
-
-        # 2. Producto (con SKU si está disponible)
-        f_prod: tk.Frame = tk.Frame(row, bg=COLORS['white'])
-        f_prod.grid(row=0, column=1, sticky="nsew", padx=5)
-
-        f_prod.columnconfigure(1, weight=1)        
+    def _cargar_pagina(self, primera: bool = False) -> None:
+        """Pide la siguiente página de movimientos (se agrega al final de la tabla al llegar)."""
+        if not self.tabla:
+            return
 
-        producto_text = producto
-        if sku:
-            producto_text = f"{producto}\nSKU: {sku}"
-        
-        if len(producto_text) > 25:
-            producto_text = producto_text[:22] + "..."        
+        # La consulta corre en un hilo de trabajo; una recarga descarta la página pendiente
+        get_executor().enviar(
+            obtener_movimientos_pagina, TAMANO_PAGINA, self._cursor_pagina,
+            **self._filtros_activos(),
+            al_terminar=lambda resultado: self._mostrar_pagina(resultado, primera),
+            al_fallar=self._mostrar_error_pagina,
+            clave="movimientos.pagina"
+        )
 
-        tk.Label(f_prod, text="📦", font=("Arial", 12), bg="#EEE", width=3).grid(row=0, column=0, padx=(0, 10))
+    def _mostrar_pagina(self, resultado: Tuple[List[Movimiento], Optional[str]], primera: bool) -> None:
+        """Agrega a la tabla la página recibida (hilo de Tk)."""
+        if not self.tabla:
+            return
 
-        lbl_producto = tk.Label(f_prod, text=producto_text, font=("Segoe UI", 9, "bold"), 
-                              bg=COLORS["white"], fg=COLORS["text_header"], justify="center",
-                              anchor="w", width=25)
-        lbl_producto.grid(row=0, column=1, sticky="we")
+        try:
+            movimientos_data, self._cursor_pagina = resultado
 
-        if len(producto_text) > 22:
-            ToolTip(lbl_producto, producto_text)
+            if primera:
+                # Reemplazar la tabla al llegar la primera página (sin parpadeo mientras se consulta)
+                self.tabla.set_filas(movimientos_data)
+            else:
+                self.tabla.agregar_filas(movimientos_data)
 
-        # 3. Tipo Badge (IN/OUT)
-        es_entrada: bool = tipo.upper() == "IN" or "↑ IN" in tipo
-        bg_color: str = COLORS["success_bg"] if es_entrada else COLORS["warning_bg"]
-        fg_color: str = COLORS["success_fg"] if es_entrada else COLORS["warning_fg"]
-        tipo_text: str = "↑ IN" if es_entrada else "↓ OUT"
-        
-        badge_frame = tk.Frame(row, bg=bg_color, padx=8, pady=3)
-        badge_frame.grid(row=0, column=2, sticky="we", padx=8)
-        tk.Label(badge_frame, text=tipo_text, font=FONT_HEAD, bg=bg_color, fg=fg_color, anchor="w", justify="left",).grid(row=0, column=2, sticky="we", padx=8)
-
-        # 4. Cantidad
-        cantidad_text = f"+{cantidad}" if es_entrada else f"-{cantidad}"
-        cantidad_color = COLORS["green_text"] if es_entrada else COLORS["red_text"]
-        lbl_cantidad = tk.Label(row, text=cantidad_text, font=("Segoe UI", 9, "bold"), 
-                              bg=COLORS["white"], fg=cantidad_color, anchor="center", justify="left",)
-        lbl_cantidad.grid(row=0, column=3, sticky="we", padx=5)
-
-        # 5. Razón
-        razon_display = razon
-        if len(razon_display) > 20:
-            razon_display = razon_display[:17] + "..."
-        lbl_razon = tk.Label(row, text=razon_display, font=FONT_BODY, bg=COLORS["white"], 
-                           fg=COLORS["text_body"], anchor="center", justify="left")
-        lbl_razon.grid(row=0, column=4, sticky="we", padx=5)
-
-        # 6. PROVEEDOR (CAMBIO: Usuario → Proveedor)
-        lbl_proveedor = tk.Label(row, text=f"🏢 {proveedor}", font=FONT_SMALL, bg=COLORS["white"], 
-                               fg=COLORS["text_light"], anchor="center", justify="left")
-        lbl_proveedor.grid(row=0, column=5, sticky="we", padx=5)
-
-        # 7. Ubicación
-        ubicacion_display = ubicacion or "N/A"
-        lbl_ubicacion = tk.Label(row, text=f"📍 {ubicacion_display}", font=FONT_SMALL, 
-                               bg=COLORS["white"], fg=COLORS["text_light"], anchor="center", justify="left")
-        lbl_ubicacion.grid(row=0, column=6, sticky="we", padx=5)
-
-        # 8. Botón Detalles (ACTUALIZADO: siempre visible, muestra todos los detalles)
-        btn_detalles = tk.Button(row, text="📋 Detalles", font=("Segoe UI", 8), 
-                                bg=COLORS["primary"], fg="white",
-                                relief="flat", cursor="hand2",
-                                command=lambda: self.mostrar_detalles_completos(
-                                    fecha_movimiento, producto, sku, tipo, 
-                                    cantidad, razon, proveedor, ubicacion, observaciones
-                                ))
-        btn_detalles.grid(row=0, column=7, sticky="we", padx=5)
-
-        # Línea divisoria
-        tk.Frame(self.scrollable_frame, bg=COLORS["border"], height=1).pack(fill="x")
+        except Exception as e:
+            print(f"❌ Error al cargar movimientos: {e}")
+            import traceback
+            traceback.print_exc()
+            self._cursor_pagina = None
+            self.tabla.mostrar_mensaje("Error al cargar movimientos", COLORS["error_fg"])
+        finally:
+            self._cargando = False
+
+    def _mostrar_error_pagina(self, error: BaseException) -> None:
+        print(f"❌ Error al cargar movimientos: {error}")
+        self._cursor_pagina = None
+        self._cargando = False
+        if self.tabla:
+            self.tabla.mostrar_mensaje("Error al cargar movimientos", COLORS["error_fg"])
+
+    def _ver_detalles(self, mov: Movimiento) -> None:
+        self.mostrar_detalles_completos(
+            str(mov.fecha_movimiento), str(mov.producto), str(mov.sku or ""), str(mov.tipo),
+            int(mov.cantidad) if mov.cantidad is not None else 0, str(mov.razon),
+            str(mov.proveedor or ""), str(mov.ubicacion or ""), str(mov.observaciones or "")
+        )
 
     def mostrar_detalles_completos(self, fecha: str, producto: str, sku: str, tipo: str, 
                                  cantidad: int, razon: str, proveedor: str, ubicacion: str, 
@@ -549,6 +478,7 @@ class MovimientosView(tk.Frame):
 
     def limpiar_filtros(self) -> None:
         """Limpia todos los filtros."""
+        self.busqueda.cancelar()
         self.entry_fecha_desde.delete(0, tk.END)
         self.entry_fecha_hasta.delete(0, tk.END)
         self.combo_tipo.set("Todos")
@@ -572,4 +502,4 @@ class MovimientosView(tk.Frame):
     def _on_search_key_release(self, event=None) -> None:
         filtro = self.search_entry.get()
         if filtro != "Buscar producto, razón...":
-            self.cargar_datos_historial()
\ No newline at end of file
+            self.busqueda.escribir(filtro)
\ No newline at end of file
@@ -1,13 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Optional, Union
 
 # Importaciones del sistema
-from database.queries import get_all_products
+from database.catalogo import get_catalogo
+from database.modelos import Producto
+from gui.components.db_executor import get_executor
+from gui.components.lista_clave import ListaConClave
 from gui.components.widgets import EntryWithPlaceholder
 
 # Services
-from services.inv_manager import InventoryManager
+from services.inv_manager import InventoryManager, LineaLote
 
 # --- CONFIGURACIÓN DE ESTILOS (Tema Naranja - Ajustes) ---
 COLORS: Dict[str, str] = {
@@ -22,6 +25,33 @@ COLORS: Dict[str, str] = {
     "danger": "#EF4444"
 }
 
+class FilaManifiesto(tk.Frame):
+    """Fila del manifiesto con la razón y la cantidad a retirar."""
+
+    def __init__(self, parent: tk.Widget, item: Dict[str, Any], vista: "SalidasView") -> None:
+        super().__init__(parent, bg="white", pady=5,
+                         highlightbackground=COLORS["border"], highlightthickness=1)
+
+        tk.Label(self, text=item['name'], font=("Segoe UI", 9, "bold"), bg="white").pack(anchor="w", padx=5)
+
+        opts: tk.Frame = tk.Frame(self, bg="white")
+        opts.pack(fill="x", padx=5)
+
+        # Guardamos el Combobox y el Entry de cantidad en el diccionario del item
+        combo: ttk.Combobox = ttk.Combobox(opts, values=["Dañado", "Vencido", "Robo", "Uso Interno"], width=12, state="readonly")
+        combo.set("Dañado")
+        combo.pack(side="left")
+        item['combo_widget'] = combo # <--- Referencia crítica
+
+        qty_entry: tk.Entry = tk.Entry(opts, width=5, highlightthickness=1)
+        qty_entry.insert(0, "1")
+        qty_entry.pack(side="left", padx=5)
+        item['qty_widget'] = qty_entry # <--- Referencia crítica
+
+        tk.Button(opts, text="X", bg="white", fg="red", bd=0, width=2,
+                  command=lambda: vista.eliminar_del_manifiesto(item)).pack(side="right")
+
+
 class SalidasView(tk.Frame):
     def __init__(self, parent: tk.Widget) -> None:
         super().__init__(parent)
@@ -32,6 +62,9 @@ class SalidasView(tk.Frame):
 
         self.inv_manager = InventoryManager()
 
+        # Productos que muestra la grilla (para no reconstruirla si no cambiaron)
+        self._productos_grid: Optional[List[Producto]] = None
+
         # Estructura Principal
         self.main_area: tk.Frame = tk.Frame(self, bg=COLORS["bg_main"])
         self.main_area.pack(side="left", fill="both", expand=True, padx=20, pady=20)
@@ -62,6 +95,7 @@ class SalidasView(tk.Frame):
             search_fr, placeholder="Escanear producto para añadir...", bg="white", bd=0
         )
         self.entry_search.pack(fill="x")
+        self.entry_search.bind("<KeyRelease>", lambda e: self.cargar_productos_grid(self.entry_search.get_text()))
 
         # Grid Canvas (Para tarjetas de productos)
         self.canvas_grid = tk.Canvas(self.main_area, bg=COLORS["bg_main"], highlightthickness=0)
@@ -93,6 +127,14 @@ class SalidasView(tk.Frame):
         self.items_container: tk.Frame = tk.Frame(self.sidebar, bg="white")
         self.items_container.pack(fill="both", expand=True, padx=15, pady=10)
 
+        # Filas del manifiesto identificadas por producto: se actualizan por diferencias
+        self.lista_manifiesto = ListaConClave(
+            self.items_container,
+            clave=lambda item: item['id'],
+            crear=lambda padre, item: FilaManifiesto(padre, item, self),
+            firma=lambda item: (item['name'], item['sku'])
+        )
+
         # Footer Actions
         footer: tk.Frame = tk.Frame(self.sidebar, bg="white", padx=20, pady=20)
         footer.pack(side="bottom", fill="x")
@@ -102,19 +144,30 @@ class SalidasView(tk.Frame):
         tk.Label(warn, text="⚠ Esta acción descuenta inventario inmediatamente.", 
                  font=("Segoe UI", 8), fg=COLORS["danger"], bg="#FEF2F2", justify="left").pack()
 
-        tk.Button(footer, text="REGISTRAR AJUSTE", bg=COLORS["primary"], fg="white", 
-                  font=("Segoe UI", 10, "bold"), relief="flat", pady=10, cursor="hand2",
-                  command=self.registrar_ajuste).pack(fill="x")
+        self.btn_registrar: tk.Button = tk.Button(
+            footer, text="REGISTRAR AJUSTE", bg=COLORS["primary"], fg="white", 
+            font=("Segoe UI", 10, "bold"), relief="flat", pady=10, cursor="hand2",
+            command=self.registrar_ajuste)
+        self.btn_registrar.pack(fill="x")
+
+    def cargar_productos_grid(self, filtro: str = "") -> None:
+        # Catálogo compartido (filas Producto) buscado con el índice FTS5 en un hilo de trabajo
+        get_executor().enviar(
+            get_catalogo().filtrar, filtro,
+            al_terminar=self._mostrar_productos_grid,
+            al_fallar=lambda e: print(f"Error al obtener productos: {e}"),
+            clave="salidas.productos"
+        )
 
-    def cargar_productos_grid(self) -> None:
-        for w in self.frame_grid.winfo_children(): w.destroy()
+    def on_activate(self) -> None:
+        """Al volver a la pestaña: recarga la grilla con la búsqueda actual."""
+        self.cargar_productos_grid(self.entry_search.get_text())
 
-        try:
-            # get_all_products() suele retornar [(id, nombre, sku, categoria, stock, ubicacion), ...]
-            productos: List[tuple] = get_all_products()
-        except Exception as e:
-            print(f"Error al obtener productos: {e}")
-            productos = []
+    def _mostrar_productos_grid(self, productos: List[Producto]) -> None:
+        if productos == self._productos_grid:
+            return
+        self._productos_grid = productos
+        for w in self.frame_grid.winfo_children(): w.destroy()
 
         row_frame: Union[tk.Frame, None] = None
         
@@ -124,8 +177,7 @@ class SalidasView(tk.Frame):
                 row_frame.pack(fill="x", pady=10)
             
             if row_frame:
-                # PASO CLAVE: p[0] es el ID, p[1] nombre, p[2] sku, p[4] stock
-                self._crear_tarjeta_producto(row_frame, p[0], p[1], p[2], p[4])
+                self._crear_tarjeta_producto(row_frame, p.id, p.nombre, p.sku, p.stock)
 
     def _crear_tarjeta_producto(self, parent: tk.Frame, p_id: int, name: str, sku: str, stock: int) -> None:
         card: tk.Frame = tk.Frame(parent, bg="white", padx=10, pady=10, width=180, height=150,
@@ -156,34 +208,13 @@ class SalidasView(tk.Frame):
         self._renderizar_manifiesto()
 
     def _renderizar_manifiesto(self) -> None:
-        for w in self.items_container.winfo_children():
-            w.destroy()
-        
         self.lbl_total_count.config(text=str(len(self.manifest_items)))
+        # Solo se crean o quitan las filas que cambiaron: las demás conservan razón y cantidad escritas
+        self.lista_manifiesto.reconciliar(self.manifest_items)
 
-        for item in self.manifest_items:
-            fr: tk.Frame = tk.Frame(self.items_container, bg="white", pady=5, 
-                                    highlightbackground=COLORS["border"], highlightthickness=1)
-            fr.pack(fill="x", pady=2)
-            
-            tk.Label(fr, text=item['name'], font=("Segoe UI", 9, "bold"), bg="white").pack(anchor="w", padx=5)
-            
-            opts: tk.Frame = tk.Frame(fr, bg="white")
-            opts.pack(fill="x", padx=5)
-            
-            # Guardamos el Combobox y el Entry de cantidad en el diccionario del item
-            combo: ttk.Combobox = ttk.Combobox(opts, values=["Dañado", "Vencido", "Robo", "Uso Interno"], width=12, state="readonly")
-            combo.set("Dañado")
-            combo.pack(side="left")
-            item['combo_widget'] = combo # <--- Referencia crítica
-
-            qty_entry: tk.Entry = tk.Entry(opts, width=5, highlightthickness=1)
-            qty_entry.insert(0, "1")
-            qty_entry.pack(side="left", padx=5)
-            item['qty_widget'] = qty_entry # <--- Referencia crítica
-            
-            tk.Button(opts, text="X", bg="white", fg="red", bd=0, width=2,
-                      command=lambda i=item: self.eliminar_del_manifiesto(i)).pack(side="right")
+    def eliminar_del_manifiesto(self, item: Dict[str, Any]) -> None:
+        self.manifest_items = [i for i in self.manifest_items if i['id'] != item['id']]
+        self._renderizar_manifiesto()
 
     def registrar_ajuste(self) -> None:
         if not self.manifest_items:
@@ -194,39 +225,56 @@ class SalidasView(tk.Frame):
         if not confirmar:
             return
 
-        exitos: int = 0
         errores: list[str] = []
+        lineas: list[LineaLote] = []
+        nombres: list[str] = []
 
         for item in self.manifest_items:
-            try:
-                # Extraer datos de los widgets guardados en el renderizado
-                p_id: int = item['id']
-                cantidad_str: str = item['qty_widget'].get().strip()
-                razon: str = item['combo_widget'].get().lower()
-                
-                if not cantidad_str.isdigit() or int(cantidad_str) <= 0:
-                    errores.append(f"{item['name']}: Cantidad inválida")
-                    continue
-                
-                cantidad: int = int(cantidad_str)
-
-                # Llamada al manager de base de datos
-                # Nota: Asegúrate que 'inv_manager' esté importado o sea accesible
-                resultado: bool = self.inv_manager.registrar_merma(
-                    product_id=p_id,
-                    cantidad=cantidad,
-                    tipo_merma=razon,
-                    detalle="Ajuste masivo desde Salidas",
-                    user_id=getattr(self, 'user_id', 1) # ID por defecto si no existe
-                )
-
-                if resultado:
-                    exitos += 1
-                else:
-                    errores.append(f"{item['name']}: Error en base de datos")
-
-            except Exception as e:
-                errores.append(f"{item['name']}: {str(e)}")
+            # Extraer datos de los widgets guardados en el renderizado
+            cantidad_str: str = item['qty_widget'].get().strip()
+            razon: str = item['combo_widget'].get().lower()
+
+            if not cantidad_str.isdigit() or int(cantidad_str) <= 0:
+                errores.append(f"{item['name']}: Cantidad inválida")
+                continue
+
+            lineas.append(LineaLote(
+                product_id=item['id'],
+                quantity=int(cantidad_str),
+                tipo="OUT",
+                razon=razon,
+                razon_detalle="Ajuste masivo desde Salidas",
+                observaciones=f"Merma registrada: {razon}"
+            ))
+            nombres.append(item['name'])
+
+        if not lineas:
+            self._mostrar_resultado_ajuste(nombres, errores, [])
+            return
+
+        # Todo el manifiesto en una sola transacción (en un hilo de trabajo); cada línea se reporta por separado
+        self.btn_registrar.config(state="disabled")
+        get_executor().enviar(
+            self.inv_manager.aplicar_lote,
+            lineas,
+            modo="parcial",
+            user_id=getattr(self, 'user_id', 1), # ID por defecto si no existe
+            al_terminar=lambda resultados: self._mostrar_resultado_ajuste(nombres, errores, resultados),
+            al_fallar=lambda e: self._mostrar_resultado_ajuste(
+                nombres, errores + [f"{nombre}: {str(e)}" for nombre in nombres], []
+            )
+        )
+
+    def _mostrar_resultado_ajuste(self, nombres: list[str], errores: list[str], resultados: list) -> None:
+        """Resumen de registrar_ajuste (hilo de Tk)."""
+        self.btn_registrar.config(state="normal")
+        exitos: int = 0
+        errores = list(errores)
+        for nombre, resultado in zip(nombres, resultados):
+            if resultado.exito:
+                exitos += 1
+            else:
+                errores.append(f"{nombre}: {resultado.mensaje}")
 
         # Resumen final
         mensaje: str = f"✅ Procesados: {exitos} productos."